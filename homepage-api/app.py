@@ -6,26 +6,100 @@ Provides custom endpoints for:
 - Traffic conditions (TomTom API)
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
+import errno
 import os
-import json
-from functools import lru_cache, wraps
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from weather_au import api as weather_api
-from traffic_scheduler import get_active_routes, is_route_active
+from traffic_scheduler import get_active_routes, load_route_table, next_active_change
+from cache import (
+    MISSING, SharedCache, StaleWhileRevalidate, TTLCache, ttl_cache, save_snapshot, load_snapshot
+)
+from background import PeriodicTask
+from traffic_history import TrafficHistory
+from docker_client import DockerClient
+from docker_state import ContainerModel
+from netstats import InterfaceSampler
+from wg_netlink import WireGuardNetlink
+import metrics
+import server_timing
+import upstream
 
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
+server_timing.init_app(app)
 
 # Configuration from environment variables
 TRANSPORT_NSW_API_KEY = os.getenv('TRANSPORT_NSW_API_KEY')
 TOMTOM_API_KEY = os.getenv('TOMTOM_API_KEY')
 
+# Persistent data volume (./data/homepage-api); set to "" to run without it
+DATA_DIR = os.getenv('DATA_DIR', '/data')
+
+# Response cache shared by all gunicorn workers so each upstream is hit once per TTL
+shared_cache = SharedCache(os.path.join(DATA_DIR, 'cache.sqlite3') if DATA_DIR else None)
+
+# Snapshot of in-memory caches, reloaded at boot so restarts start warm
+SNAPSHOT_PATH = os.path.join(DATA_DIR, 'cache-snapshot.json') if DATA_DIR else None
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '300'))
+
+# How long each stop's departures are reused across requests (seconds)
+TRANSPORT_CACHE_SECONDS = int(os.getenv('TRANSPORT_CACHE_SECONDS', '30'))
+
+# Geocode cache lifetimes (seconds): matches, addresses TomTom can't match, request errors
+GEOCODE_CACHE_SECONDS = int(os.getenv('GEOCODE_CACHE_SECONDS', str(30 * 86400)))
+GEOCODE_NEGATIVE_SECONDS = int(os.getenv('GEOCODE_NEGATIVE_SECONDS', '3600'))
+GEOCODE_ERROR_SECONDS = 60
+
+# Traffic: how often active routes are polled, and how long results are reused (seconds)
+TRAFFIC_POLL_INTERVAL = int(os.getenv('TRAFFIC_POLL_INTERVAL', '300'))
+TRAFFIC_CACHE_SECONDS = 2 * TRAFFIC_POLL_INTERVAL
+# How long a batch with failed routes is reused before those routes are retried (seconds)
+TRAFFIC_ERROR_SECONDS = int(os.getenv('TRAFFIC_ERROR_SECONDS', '60'))
+# Travel time samples kept for typical-time percentiles (8 weeks in 15 minute buckets)
+traffic_history = TrafficHistory(
+    os.path.join(DATA_DIR, 'traffic-history.sqlite3') if DATA_DIR else None,
+    bucket_minutes=int(os.getenv('TRAFFIC_HISTORY_BUCKET_MINUTES', '15')),
+    retention_days=int(os.getenv('TRAFFIC_HISTORY_DAYS', '56'))
+)
+# Total time a live traffic request may spend on TomTom (seconds), well inside
+# gunicorn's timeout; past it the last known result is served instead
+TRAFFIC_REQUEST_BUDGET = float(os.getenv('TRAFFIC_REQUEST_BUDGET', '8'))
+# Largest synchronous Matrix Routing request (origins x destinations) sent in
+# one call; bigger batches fall back to parallel calculateRoute calls
+TRAFFIC_MATRIX_MAX_CELLS = int(os.getenv('TRAFFIC_MATRIX_MAX_CELLS', '100'))
+
+# WireGuard throughput sampling interval (seconds), and the sysfs directory holding
+# wg0 (the host's /sys/devices/virtual/net, since /sys/class/net entries are symlinks)
+WG_SAMPLE_INTERVAL = float(os.getenv('WG_SAMPLE_INTERVAL', '5'))
+WG_SYSFS_NET = os.getenv('WG_SYSFS_NET', '/sys/class/net')
+# How long per-peer WireGuard stats from netlink are reused (seconds)
+WG_PEERS_CACHE_SECONDS = int(os.getenv('WG_PEERS_CACHE_SECONDS', '10'))
+
+# How often Docker disk usage (/system/df, slow on busy hosts) is recomputed (seconds)
+DOCKER_DF_INTERVAL = int(os.getenv('DOCKER_DF_INTERVAL', '900'))
+# How long per-container resource stats are reused (seconds)
+DOCKER_STATS_CACHE_SECONDS = int(os.getenv('DOCKER_STATS_CACHE_SECONDS', '10'))
+
+# How often each worker copies its cache counters into the /metrics gauges (seconds)
+METRICS_CACHE_INTERVAL = int(os.getenv('METRICS_CACHE_INTERVAL', '15'))
+# How long /api/dashboard waits for its sections, which load concurrently (seconds)
+DASHBOARD_SECTION_TIMEOUT = float(os.getenv('DASHBOARD_SECTION_TIMEOUT', '5'))
+
 # BOM Weather Configuration (using weather-au library)
 # Location search string - suburb name only (e.g., "parramatta", "sydney")
 BOM_LOCATION = os.getenv('BOM_LOCATION', 'parramatta')
+# How long a weather snapshot is served before a background refresh (seconds)
+BOM_CACHE_SECONDS = int(os.getenv('BOM_CACHE_SECONDS', '300'))
+# Shared deadline for the concurrent BOM section fetches (seconds)
+BOM_FETCH_DEADLINE = float(os.getenv('BOM_FETCH_DEADLINE', '10'))
+# Oldest a section may be when a failed refresh reuses it from the last snapshot (seconds)
+BOM_SECTION_MAX_AGE = int(os.getenv('BOM_SECTION_MAX_AGE', str(3 * BOM_CACHE_SECONDS)))
 
 
 @app.route('/api/health')
@@ -43,213 +117,468 @@ def health_check():
     })
 
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Request, upstream and cache metrics in the Prometheus text format.
+    Aggregated over every gunicorn worker, whichever one answers the scrape.
+    """
+    metrics.update_cache_gauges()
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
 # =============================================================================
 # BOM WEATHER (using weather-au library)
 # =============================================================================
 
-# Cache decorator with time-based expiry
-def timed_lru_cache(seconds: int, maxsize: int = 128):
-    """LRU cache with time-based expiry"""
-    def wrapper_cache(func):
-        func = lru_cache(maxsize=maxsize)(func)
-        func.lifetime = timedelta(seconds=seconds)
-        func.expiration = datetime.utcnow() + func.lifetime
+class BomWeatherApi(weather_api.WeatherApi):
+    """
+    WeatherApi whose requests give up after BOM_FETCH_DEADLINE
 
-        @wraps(func)
-        def wrapped_func(*args, **kwargs):
-            if datetime.utcnow() >= func.expiration:
-                func.cache_clear()
-                func.expiration = datetime.utcnow() + func.lifetime
-            return func(*args, **kwargs)
+    weather-au calls urlopen() without a timeout, so a hung BOM connection
+    would otherwise hold its thread forever.
+    """
 
-        wrapped_func.cache_clear = func.cache_clear
-        return wrapped_func
-    return wrapper_cache
+    def _fetch_json(self, url):
+        # Timed as a "bom" call by _bom_call(), so use the pooled session directly
+        response = upstream.session('bom').get(url, timeout=BOM_FETCH_DEADLINE)
+        response.raise_for_status()
+        result = response.json()
+        self.response_timestamp = result['metadata']['response_timestamp']
+        return result
 
 
-@timed_lru_cache(seconds=300, maxsize=1)  # Cache for 5 minutes
+@ttl_cache(seconds=300, maxsize=8)  # Cache for 5 minutes
 def get_weather_api(location):
     """
     Get weather API instance for a location
     Cached to avoid repeated API calls
     """
-    return weather_api.WeatherApi(search=location, debug=0)
+    with metrics.upstream_call('bom'):
+        return BomWeatherApi(search=location, debug=0)
 
 
-@app.route('/api/bom/weather')
-def bom_weather():
+def _bom_call(method):
+    """Call a WeatherApi method, timed as a BOM upstream call"""
+    with metrics.upstream_call('bom'):
+        return method()
+
+
+# WeatherApi methods fetched concurrently for each weather payload, and the
+# payload key each one is served under
+BOM_SECTIONS = ('observations', 'forecasts_daily', 'forecasts_hourly', 'forecast_rain')
+BOM_SECTION_KEYS = {
+    'observations': 'observations',
+    'forecasts_daily': 'forecast_daily',
+    'forecasts_hourly': 'forecast_hourly',
+    'forecast_rain': 'forecast_rain'
+}
+
+
+def _fetch_bom_sections(pool, w, deadline):
     """
-    Fetch comprehensive weather data from Australian BOM using weather-au library
+    Call each BOM_SECTIONS method on a WeatherApi instance concurrently
 
-    Returns:
-        - Current observations (temperature, feels like, wind, rain, humidity)
-        - 7-day daily forecast (temps, rain chance/amount, UV, sunrise/sunset, fire danger)
-        - Hourly forecast (detailed hourly conditions)
-        - Next rain forecast (if available)
+    Args:
+        pool: Executor to run the calls on
+        w: WeatherApi instance with its location already resolved
+        deadline: Seconds to wait for all sections in total
 
-    Uses BOM's official API via weather-au library for accurate, comprehensive data
-    Cached for 5 minutes to respect BOM servers
+    Returns:
+        tuple: (sections, failed, missing) - sections maps method name to its
+        result, failed lists sections whose call raised, missing lists
+        sections that didn't arrive before the deadline
     """
+    futures = {pool.submit(server_timing.propagate(_bom_call), getattr(w, name)): name for name in BOM_SECTIONS}
+
+    sections = {}
+    failed = []
     try:
-        # Get weather API instance
-        w = get_weather_api(BOM_LOCATION)
+        for future in as_completed(futures, timeout=deadline):
+            try:
+                sections[futures[future]] = future.result()
+            except Exception:
+                # Some locations don't have every section (e.g. hourly forecasts)
+                failed.append(futures[future])
+    except FuturesTimeoutError:
+        pass
 
-        # Get location info
-        location_data = w.location()
-        if not location_data:
-            return jsonify({'error': f'Location "{BOM_LOCATION}" not found'}), 404
+    missing = [name for name in BOM_SECTIONS if name not in sections and name not in failed]
+    return sections, failed, missing
 
-        # Get current observations
-        try:
-            observations = w.observations()
-        except Exception:
-            observations = None
 
-        # Get daily forecasts
-        try:
-            forecasts_daily = w.forecasts_daily()
-        except Exception:
-            forecasts_daily = None
+def fetch_bom_weather():
+    """
+    Fetch comprehensive weather data from Australian BOM using weather-au library
 
-        # Get hourly forecasts
-        try:
-            forecasts_hourly = w.forecasts_hourly()
-        except Exception:
-            # Some locations don't have hourly forecasts available
-            forecasts_hourly = None
+    Returns:
+        dict: Weather payload with location, observations, daily/hourly forecasts
+        and rain forecast (sections are None when BOM has no data for them;
+        sections that failed or were slower than BOM_FETCH_DEADLINE are
+        listed in 'missing'). A missing section keeps its value from the
+        previous snapshot while that is younger than BOM_SECTION_MAX_AGE, and
+        is listed in 'stale_sections'; 'section_fetched' holds the wall-clock
+        time each section's value was fetched
+
+    Raises:
+        LookupError: If BOM_LOCATION doesn't resolve to a BOM location
+    """
+    # Get weather API instance
+    w = get_weather_api(BOM_LOCATION)
+
+    # Location info and the four sections are independent, so fetch them all at once.
+    # Each refresh gets its own threads: a call still stuck on BOM when we give up
+    # only holds its own thread until its socket timeout, never a later refresh's
+    pool = ThreadPoolExecutor(max_workers=len(BOM_SECTIONS) + 1, thread_name_prefix='bom')
+    try:
+        started = time.monotonic()
+        location_future = pool.submit(server_timing.propagate(_bom_call), w.location)
+        sections, failed, missing = _fetch_bom_sections(pool, w, BOM_FETCH_DEADLINE)
 
-        # Get rain forecast
+        remaining = BOM_FETCH_DEADLINE - (time.monotonic() - started)
         try:
-            forecast_rain = w.forecast_rain()
-        except Exception:
-            forecast_rain = None
-
-        # Build comprehensive response
-        weather_data = {
-            'location': {
-                'name': location_data.get('name'),
-                'state': location_data.get('state'),
-                'geohash': location_data.get('geohash'),
-                'latitude': location_data.get('latitude'),
-                'longitude': location_data.get('longitude')
+            location_data = location_future.result(timeout=max(remaining, 0))
+        except FuturesTimeoutError:
+            raise TimeoutError(f'BOM location lookup took longer than {BOM_FETCH_DEADLINE}s')
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    if not location_data:
+        raise LookupError(f'Location "{BOM_LOCATION}" not found')
+
+    transform_started = time.perf_counter()
+    observations = sections.get('observations')
+    forecasts_daily = sections.get('forecasts_daily')
+    forecasts_hourly = sections.get('forecasts_hourly')
+    forecast_rain = sections.get('forecast_rain')
+
+    # Build comprehensive response
+    weather_data = {
+        'location': {
+            'name': location_data.get('name'),
+            'state': location_data.get('state'),
+            'geohash': location_data.get('geohash'),
+            'latitude': location_data.get('latitude'),
+            'longitude': location_data.get('longitude')
+        },
+        'observations': None,
+        'forecast_daily': None,
+        'forecast_hourly': None,
+        'forecast_rain': None,
+        'missing': failed + missing,
+        'updated': datetime.now().isoformat()
+    }
+
+    # Process observations
+    if observations:
+        weather_data['observations'] = {
+            'temp': observations.get('temp'),
+            'temp_feels_like': observations.get('temp_feels_like'),
+            'rain_since_9am': observations.get('rain_since_9am'),
+            'humidity': observations.get('humidity'),
+            'wind': {
+                'speed_kmh': observations.get('wind', {}).get('speed_kilometre'),
+                'speed_knot': observations.get('wind', {}).get('speed_knot'),
+                'direction': observations.get('wind', {}).get('direction')
             },
-            'observations': None,
-            'forecast_daily': None,
-            'forecast_hourly': None,
-            'forecast_rain': None,
-            'updated': datetime.now().isoformat()
+            'station': {
+                'bom_id': observations.get('station', {}).get('bom_id'),
+                'name': observations.get('station', {}).get('name'),
+                'distance_m': observations.get('station', {}).get('distance')
+            }
         }
 
-        # Process observations
-        if observations:
-            weather_data['observations'] = {
-                'temp': observations.get('temp'),
-                'temp_feels_like': observations.get('temp_feels_like'),
-                'rain_since_9am': observations.get('rain_since_9am'),
-                'humidity': observations.get('humidity'),
-                'wind': {
-                    'speed_kmh': observations.get('wind', {}).get('speed_kilometre'),
-                    'speed_knot': observations.get('wind', {}).get('speed_knot'),
-                    'direction': observations.get('wind', {}).get('direction')
+    # Process daily forecasts
+    if forecasts_daily:
+        weather_data['forecast_daily'] = []
+        for day in forecasts_daily:
+            rain_data = day.get('rain', {})
+            rain_amount = rain_data.get('amount', {}) if rain_data else {}
+            uv_data = day.get('uv', {})
+            astro_data = day.get('astronomical', {})
+            now_data = day.get('now', {})
+
+            forecast_day = {
+                'date': day.get('date'),
+                'temp_min': day.get('temp_min'),
+                'temp_max': day.get('temp_max'),
+                'extended_text': day.get('extended_text'),
+                'short_text': day.get('short_text'),
+                'icon_descriptor': day.get('icon_descriptor'),
+                'rain': {
+                    'chance': rain_data.get('chance') if rain_data else None,
+                    'amount_min': rain_amount.get('min') if rain_amount else None,
+                    'amount_max': rain_amount.get('max') if rain_amount else None,
+                    'amount_units': rain_amount.get('units') if rain_amount else None
                 },
-                'station': {
-                    'bom_id': observations.get('station', {}).get('bom_id'),
-                    'name': observations.get('station', {}).get('name'),
-                    'distance_m': observations.get('station', {}).get('distance')
+                'uv': {
+                    'category': uv_data.get('category') if uv_data else None,
+                    'max_index': uv_data.get('max_index') if uv_data else None,
+                    'start_time': uv_data.get('start_time') if uv_data else None,
+                    'end_time': uv_data.get('end_time') if uv_data else None
+                },
+                'astronomical': {
+                    'sunrise_time': astro_data.get('sunrise_time') if astro_data else None,
+                    'sunset_time': astro_data.get('sunset_time') if astro_data else None
+                },
+                'fire_danger': day.get('fire_danger'),
+                'now': {
+                    'is_night': now_data.get('is_night') if now_data else None,
+                    'now_label': now_data.get('now_label') if now_data else None,
+                    'temp_now': now_data.get('temp_now') if now_data else None,
+                    'later_label': now_data.get('later_label') if now_data else None,
+                    'temp_later': now_data.get('temp_later') if now_data else None
                 }
             }
-
-        # Process daily forecasts
-        if forecasts_daily:
-            weather_data['forecast_daily'] = []
-            for day in forecasts_daily:
-                rain_data = day.get('rain', {})
-                rain_amount = rain_data.get('amount', {}) if rain_data else {}
-                uv_data = day.get('uv', {})
-                astro_data = day.get('astronomical', {})
-                now_data = day.get('now', {})
-
-                forecast_day = {
-                    'date': day.get('date'),
-                    'temp_min': day.get('temp_min'),
-                    'temp_max': day.get('temp_max'),
-                    'extended_text': day.get('extended_text'),
-                    'short_text': day.get('short_text'),
-                    'icon_descriptor': day.get('icon_descriptor'),
-                    'rain': {
-                        'chance': rain_data.get('chance') if rain_data else None,
-                        'amount_min': rain_amount.get('min') if rain_amount else None,
-                        'amount_max': rain_amount.get('max') if rain_amount else None,
-                        'amount_units': rain_amount.get('units') if rain_amount else None
-                    },
-                    'uv': {
-                        'category': uv_data.get('category') if uv_data else None,
-                        'max_index': uv_data.get('max_index') if uv_data else None,
-                        'start_time': uv_data.get('start_time') if uv_data else None,
-                        'end_time': uv_data.get('end_time') if uv_data else None
-                    },
-                    'astronomical': {
-                        'sunrise_time': astro_data.get('sunrise_time') if astro_data else None,
-                        'sunset_time': astro_data.get('sunset_time') if astro_data else None
-                    },
-                    'fire_danger': day.get('fire_danger'),
-                    'now': {
-                        'is_night': now_data.get('is_night') if now_data else None,
-                        'now_label': now_data.get('now_label') if now_data else None,
-                        'temp_now': now_data.get('temp_now') if now_data else None,
-                        'later_label': now_data.get('later_label') if now_data else None,
-                        'temp_later': now_data.get('temp_later') if now_data else None
-                    }
-                }
-                weather_data['forecast_daily'].append(forecast_day)
-
-        # Process hourly forecasts
-        if forecasts_hourly:
-            weather_data['forecast_hourly'] = []
-            for period in forecasts_hourly:
-                rain_data = period.get('rain', {})
-                rain_amount = rain_data.get('amount', {}) if rain_data else {}
-                wind_data = period.get('wind', {})
-
-                forecast_3h = {
-                    'time': period.get('time'),
-                    'temp': period.get('temp'),
-                    'icon_descriptor': period.get('icon_descriptor'),
-                    'is_night': period.get('is_night'),
-                    'next_forecast_period': period.get('next_forecast_period'),
-                    'rain': {
-                        'chance': rain_data.get('chance') if rain_data else None,
-                        'amount_min': rain_amount.get('min') if rain_amount else None,
-                        'amount_max': rain_amount.get('max') if rain_amount else None,
-                        'amount_units': rain_amount.get('units') if rain_amount else None
-                    },
-                    'wind': {
-                        'speed_kmh': wind_data.get('speed_kilometre') if wind_data else None,
-                        'speed_knot': wind_data.get('speed_knot') if wind_data else None,
-                        'direction': wind_data.get('direction') if wind_data else None
-                    }
+            weather_data['forecast_daily'].append(forecast_day)
+
+    # Process hourly forecasts
+    if forecasts_hourly:
+        weather_data['forecast_hourly'] = []
+        for period in forecasts_hourly:
+            rain_data = period.get('rain', {})
+            rain_amount = rain_data.get('amount', {}) if rain_data else {}
+            wind_data = period.get('wind', {})
+
+            forecast_3h = {
+                'time': period.get('time'),
+                'temp': period.get('temp'),
+                'icon_descriptor': period.get('icon_descriptor'),
+                'is_night': period.get('is_night'),
+                'next_forecast_period': period.get('next_forecast_period'),
+                'rain': {
+                    'chance': rain_data.get('chance') if rain_data else None,
+                    'amount_min': rain_amount.get('min') if rain_amount else None,
+                    'amount_max': rain_amount.get('max') if rain_amount else None,
+                    'amount_units': rain_amount.get('units') if rain_amount else None
+                },
+                'wind': {
+                    'speed_kmh': wind_data.get('speed_kilometre') if wind_data else None,
+                    'speed_knot': wind_data.get('speed_knot') if wind_data else None,
+                    'direction': wind_data.get('direction') if wind_data else None
                 }
-                weather_data['forecast_hourly'].append(forecast_3h)
-
-        # Process rain forecast
-        if forecast_rain:
-            weather_data['forecast_rain'] = {
-                'amount': forecast_rain.get('amount'),
-                'chance': forecast_rain.get('chance'),
-                'start_time': forecast_rain.get('start_time'),
-                'period': forecast_rain.get('period')
             }
+            weather_data['forecast_hourly'].append(forecast_3h)
+
+    # Process rain forecast
+    if forecast_rain:
+        weather_data['forecast_rain'] = {
+            'amount': forecast_rain.get('amount'),
+            'chance': forecast_rain.get('chance'),
+            'start_time': forecast_rain.get('start_time'),
+            'period': forecast_rain.get('period')
+        }
 
-        return jsonify(weather_data)
+    # Don't let one failed section blank out recent data the last snapshot still has,
+    # but never carry a section forward past BOM_SECTION_MAX_AGE
+    now = time.time()
+    previous = bom_weather_cache.dump()
+    previous = previous['value'] if previous else {}
+    previous_fetched = previous.get('section_fetched') or {}
+    weather_data['section_fetched'] = {name: now for name in sections}
+    weather_data['stale_sections'] = []
+    for name in failed + missing:
+        key = BOM_SECTION_KEYS[name]
+        fetched_at = previous_fetched.get(name)
+        if previous.get(key) is not None and fetched_at is not None and now - fetched_at < BOM_SECTION_MAX_AGE:
+            weather_data[key] = previous[key]
+            weather_data['section_fetched'][name] = fetched_at
+            weather_data['stale_sections'].append(name)
+
+    server_timing.record('transform', time.perf_counter() - transform_started)
+    return weather_data
+
+
+# Last good weather payload, refreshed in the background once it goes stale
+bom_weather_cache = StaleWhileRevalidate(
+    fetch_bom_weather, ttl=BOM_CACHE_SECONDS, name=f'bom-weather:{BOM_LOCATION}',
+    shared=shared_cache, persist=True
+)
 
+
+@app.route('/api/bom/weather')
+def bom_weather():
+    """
+    Get comprehensive weather data from Australian BOM
+
+    Returns:
+        - Current observations (temperature, feels like, wind, rain, humidity)
+        - 7-day daily forecast (temps, rain chance/amount, UV, sunrise/sunset, fire danger)
+        - Hourly forecast (detailed hourly conditions)
+        - Next rain forecast (if available)
+        - age_seconds/stale: how old the served snapshot is
+        - section_age_seconds: how old each section's data is (null if it has none)
+
+    Always answers from the last good snapshot; once it is older than
+    BOM_CACHE_SECONDS it is refreshed in the background, and a failed refresh
+    keeps serving the previous snapshot. Only a cold start waits on BOM.
+    """
+    try:
+        return jsonify(weather_payload())
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': f'Failed to fetch BOM weather data: {str(e)}'}), 500
 
 
+def weather_payload():
+    """Build the /api/bom/weather response from the weather snapshot"""
+    weather_data, age = bom_weather_cache.get()
+    now = time.time()
+    fetched = weather_data.get('section_fetched') or {}
+    return {
+        **weather_data,
+        'section_age_seconds': {
+            name: round(now - fetched[name], 1) if name in fetched else None for name in BOM_SECTIONS
+        },
+        'age_seconds': round(age, 1),
+        'stale': age >= bom_weather_cache.ttl or bool(weather_data.get('stale_sections'))
+    }
+
+
 # =============================================================================
 # TRANSPORT NSW
 # =============================================================================
 
+def _parse_departure(event):
+    """Convert a TfNSW stopEvent into a departure dict"""
+    transportation = event.get('transportation', {})
+    location = event.get('location', {})
+    is_realtime = event.get('isRealtimeControlled', False)
+
+    delay_minutes = 0
+    departure_time = event.get('departureTimePlanned')
+    if is_realtime:
+        estimated_str = event.get('departureTimeEstimated')
+        if estimated_str:
+            departure_time = estimated_str
+        try:
+            planned_str = event.get('departureTimePlanned')
+            if planned_str and estimated_str:
+                planned = datetime.fromisoformat(planned_str.replace('Z', '+00:00'))
+                estimated = datetime.fromisoformat(estimated_str.replace('Z', '+00:00'))
+                delay_minutes = int((estimated - planned).total_seconds() / 60)
+        except (ValueError, AttributeError):
+            delay_minutes = 0
+
+    return {
+        'time': departure_time,
+        'destination': transportation.get('destination', {}).get('name', ''),
+        'line': transportation.get('number', ''),
+        'platform': location.get('properties', {}).get('platformName'),
+        'realtime': is_realtime,
+        'delay_minutes': delay_minutes
+    }
+
+
+def _tfnsw_departures(stop_id):
+    """Fetch and parse every non-cancelled departure for a stop from TfNSW departure_mon"""
+    url = 'https://api.transport.nsw.gov.au/v1/tp/departure_mon'
+    params = {
+        'outputFormat': 'rapidJSON',
+        'coordOutputFormat': 'EPSG:4326',
+        'mode': 'direct',
+        'type_dm': 'stop',
+        'name_dm': stop_id,
+        'departureMonitorMacro': 'true',
+        'TfNSWDM': 'true',
+        'version': '10.2.1.42'
+    }
+
+    headers = {
+        'Authorization': f'apikey {TRANSPORT_NSW_API_KEY}'
+    }
+
+    response = upstream.get('tfnsw', url, params=params, headers=headers, timeout=10)
+    response.raise_for_status()
+    with server_timing.span('parse'):
+        data = response.json()
+
+    with server_timing.span('transform'):
+        return [
+            _parse_departure(event)
+            for event in data.get('stopEvents', [])
+            if not event.get('isCancelled')
+        ]
+
+
+# Concurrent departure fetches for batch requests
+TRANSPORT_BATCH_MAX_STOPS = 16
+_transport_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='tfnsw')
+
+
+def _get_shared(local, key, compute, ttl):
+    """
+    Get a value from a worker-local TTLCache, falling back to the shared cache
+
+    The local copy only lives for what's left of the shared entry's ttl, so a
+    value is never served more than ttl seconds after it was computed.
+    """
+    value = local.get(key, MISSING)
+    if value is MISSING:
+        value, age = shared_cache.get_or_compute(key, compute, ttl=ttl)
+        if age < ttl:
+            local.set(key, value, ttl=ttl - age)
+    return value
+
+
+# Each worker's copy of the shared departures, by shared cache key
+_departures_cache = TTLCache(TRANSPORT_CACHE_SECONDS, maxsize=64, name='departures', persist=True)
+
+
+def fetch_departures(stop_id):
+    """
+    Get all upcoming departures for a stop, unfiltered.
+    Cached per stop for TRANSPORT_CACHE_SECONDS and shared between workers,
+    so every filter variant of a stop costs one upstream call per window.
+    """
+    return _get_shared(
+        _departures_cache, f'tfnsw:departures:{stop_id}',
+        lambda: _tfnsw_departures(stop_id), TRANSPORT_CACHE_SECONDS
+    )
+
+
+def filter_departures(departures, destination='', routes=None, limit=15):
+    """
+    Apply the widget filters to a stop's departures
+
+    Args:
+        departures: Parsed departures from fetch_departures()
+        destination: Keep departures whose destination contains this (case-insensitive)
+        routes: Keep departures on these route numbers (all if empty)
+        limit: Maximum number of departures returned
+
+    Returns:
+        list: Matching departures in upstream order
+    """
+    destination = destination.lower()
+    matched = []
+    for departure in departures:
+        if len(matched) >= limit:
+            break
+        if destination and destination not in departure['destination'].lower():
+            continue
+        if routes and departure['line'] not in routes:
+            continue
+        matched.append(departure)
+    return matched
+
+
+def _departure_filters(spec):
+    """
+    Read destination/routes/limit filters from query args or a batch stop spec
+
+    routes may be a comma-separated string or a list of route numbers.
+    """
+    routes = spec.get('routes') or ''
+    if isinstance(routes, str):
+        routes = routes.split(',')
+    return {
+        'destination': spec.get('destination') or '',
+        'routes': [str(r).strip() for r in routes if str(r).strip()],
+        'limit': int(spec.get('limit', 15))
+    }
+
+
 @app.route('/api/transport/departures/<stop_id>')
 def transport_departures(stop_id):
     """
@@ -257,80 +586,16 @@ def transport_departures(stop_id):
     Optional query params:
       destination - filter by destination substring (case-insensitive)
       routes - comma-separated route numbers to include
-      limit - max results (default 5)
+      limit - max results (default 15)
     """
     try:
         if not TRANSPORT_NSW_API_KEY:
             return jsonify({'error': 'Transport NSW API key not configured'}), 503
 
-        dest_filter = request.args.get('destination', '').lower()
-        routes_filter = [r.strip() for r in request.args.get('routes', '').split(',') if r.strip()]
-        limit = int(request.args.get('limit', 15))
-
-        url = 'https://api.transport.nsw.gov.au/v1/tp/departure_mon'
-        params = {
-            'outputFormat': 'rapidJSON',
-            'coordOutputFormat': 'EPSG:4326',
-            'mode': 'direct',
-            'type_dm': 'stop',
-            'name_dm': stop_id,
-            'departureMonitorMacro': 'true',
-            'TfNSWDM': 'true',
-            'version': '10.2.1.42'
-        }
-
-        headers = {
-            'Authorization': f'apikey {TRANSPORT_NSW_API_KEY}'
-        }
-
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        departures = []
-        stop_events = data.get('stopEvents', [])
-        for event in stop_events:
-            if len(departures) >= limit:
-                break
-
-            if event.get('isCancelled'):
-                continue
-
-            transportation = event.get('transportation', {})
-            destination_name = transportation.get('destination', {}).get('name', '')
-            route_number = transportation.get('number', '')
-
-            if dest_filter and dest_filter not in destination_name.lower():
-                continue
-            if routes_filter and route_number not in routes_filter:
-                continue
-
-            location = event.get('location', {})
-            is_realtime = event.get('isRealtimeControlled', False)
-
-            delay_minutes = 0
-            departure_time = event.get('departureTimePlanned')
-            if is_realtime:
-                estimated_str = event.get('departureTimeEstimated')
-                if estimated_str:
-                    departure_time = estimated_str
-                try:
-                    planned_str = event.get('departureTimePlanned')
-                    if planned_str and estimated_str:
-                        planned = datetime.fromisoformat(planned_str.replace('Z', '+00:00'))
-                        estimated = datetime.fromisoformat(estimated_str.replace('Z', '+00:00'))
-                        delay_minutes = int((estimated - planned).total_seconds() / 60)
-                except (ValueError, AttributeError):
-                    delay_minutes = 0
-
-            departures.append({
-                'time': departure_time,
-                'destination': destination_name,
-                'line': route_number,
-                'platform': location.get('properties', {}).get('platformName'),
-                'realtime': is_realtime,
-                'delay_minutes': delay_minutes
-            })
+        filters = _departure_filters(request.args)
+        departures = fetch_departures(stop_id)
+        with server_timing.span('transform'):
+            departures = filter_departures(departures, **filters)
 
         return jsonify({
             'stopId': stop_id,
@@ -344,15 +609,393 @@ def transport_departures(stop_id):
         return jsonify({'error': str(e)}), 500
 
 
+def _departure_board(stop_id, filters, future, timeout=None):
+    """
+    Build one stop's board from its fetch_departures() future
+
+    A failed fetch gives an empty board with an 'error' rather than raising,
+    so one bad stop can't fail a whole batch.
+
+    Raises:
+        concurrent.futures.TimeoutError: If the departures aren't ready within timeout
+    """
+    try:
+        departures = future.result(timeout=timeout)
+        return {'stopId': stop_id, 'departures': filter_departures(departures, **filters)}
+    except FuturesTimeoutError:
+        raise
+    except requests.exceptions.RequestException as e:
+        return {'stopId': stop_id, 'departures': [], 'error': f'Transport API error: {str(e)}'}
+    except Exception as e:
+        return {'stopId': stop_id, 'departures': [], 'error': str(e)}
+
+
+@app.route('/api/transport/batch', methods=['POST'])
+def transport_batch():
+    """
+    Get departure boards for several stops in one request.
+    Stops missing from the cache are fetched from TfNSW concurrently.
+
+    Example request body:
+    {
+        "stops": [
+            {"stop_id": "200060", "destination": "city", "limit": 3},
+            {"stop_id": "2150106", "routes": "600,601"}
+        ]
+    }
+
+    Returns one board per requested stop, in request order. A stop whose
+    upstream call fails gets an 'error' instead of failing the whole batch.
+    """
+    if not TRANSPORT_NSW_API_KEY:
+        return jsonify({'error': 'Transport NSW API key not configured'}), 503
+
+    body = request.get_json(silent=True)
+    stops = body.get('stops') if isinstance(body, dict) else None
+    if not isinstance(stops, list) or not stops:
+        return jsonify({'error': 'stops must be a non-empty list'}), 400
+    if len(stops) > TRANSPORT_BATCH_MAX_STOPS:
+        return jsonify({'error': f'At most {TRANSPORT_BATCH_MAX_STOPS} stops per batch'}), 400
+
+    try:
+        specs = [(str(stop['stop_id']), _departure_filters(stop)) for stop in stops]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Each stop needs a stop_id and valid filters'}), 400
+
+    # One fetch per distinct stop, all in flight at once
+    futures = {
+        stop_id: _transport_pool.submit(server_timing.propagate(fetch_departures), stop_id)
+        for stop_id in dict.fromkeys(stop_id for stop_id, _ in specs)
+    }
+
+    boards = [_departure_board(stop_id, filters, futures[stop_id]) for stop_id, filters in specs]
+
+    return jsonify({
+        'boards': boards,
+        'updated': datetime.now().isoformat()
+    })
+
+
 # =============================================================================
 # TRAFFIC CONDITIONS
 # =============================================================================
 
+class GeocodeError(Exception):
+    """A route address couldn't be geocoded"""
+
+
+class RouteNotFound(Exception):
+    """TomTom found no route between two points"""
+
+
+def _traffic_payload(origin, destination, summary):
+    """Build the traffic response from a TomTom route summary"""
+    traffic_delay = summary.get('trafficDelayInSeconds', 0)
+    travel_time_minutes = summary.get('travelTimeInSeconds', 0) / 60
+
+    return {
+        'origin': origin,
+        'destination': destination,
+        'travelTimeMinutes': round(travel_time_minutes),
+        'trafficDelayMinutes': round(traffic_delay / 60),
+        'distanceKm': round(summary.get('lengthInMeters', 0) / 1000, 1),
+        'status': 'heavy' if traffic_delay > 600 else 'moderate' if traffic_delay > 300 else 'clear',
+        'updated': datetime.now().isoformat()
+    }
+
+
+def _record_traffic(origin, destination, summary):
+    """Add a fresh TomTom route summary to the travel time history"""
+    try:
+        traffic_history.record(
+            _route_key(origin, destination),
+            summary.get('travelTimeInSeconds', 0),
+            summary.get('trafficDelayInSeconds', 0),
+            summary.get('lengthInMeters', 0)
+        )
+    except Exception as e:
+        app.logger.warning('Could not record traffic history: %s', e)
+
+
+_geocode_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='geocode')
+
+
+def _time_left(deadline):
+    """Seconds left before a time.monotonic() deadline, raising TimeoutError once it has passed"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError(f'TomTom took longer than {TRAFFIC_REQUEST_BUDGET}s')
+    return remaining
+
+
+def fetch_traffic(origin, destination, deadline=None):
+    """
+    Fetch current traffic conditions for a route from TomTom
+
+    Both addresses are geocoded at once, then the route is calculated. Each
+    step only gets what's left of the time budget, so a slow TomTom can't
+    hold a worker for a full timeout per call.
+
+    Args:
+        deadline: time.monotonic() value to give up at
+            (default TRAFFIC_REQUEST_BUDGET from now)
+
+    Raises:
+        GeocodeError: If either address can't be geocoded
+        RouteNotFound: If TomTom finds no route between them
+        TimeoutError: If the budget runs out first
+    """
+    if deadline is None:
+        deadline = time.monotonic() + TRAFFIC_REQUEST_BUDGET
+
+    # Geocode addresses to coordinates
+    futures = [
+        _geocode_pool.submit(server_timing.propagate(geocode_address), address, _time_left(deadline))
+        for address in (origin, destination)
+    ]
+    try:
+        origin_coords, destination_coords = [future.result(timeout=_time_left(deadline)) for future in futures]
+    except FuturesTimeoutError:
+        raise TimeoutError(f'TomTom took longer than {TRAFFIC_REQUEST_BUDGET}s')
+
+    if not origin_coords or not destination_coords:
+        _time_left(deadline)  # A geocode that ran out of time is a timeout, not a bad address
+        raise GeocodeError('Could not geocode addresses')
+
+    # Get route with traffic
+    route_url = f"https://api.tomtom.com/routing/1/calculateRoute/{origin_coords}:{destination_coords}/json"
+    params = {
+        'key': TOMTOM_API_KEY,
+        'traffic': 'true',
+        'travelMode': 'car'
+    }
+
+    try:
+        response = upstream.get('tomtom', route_url, params=params, timeout=_time_left(deadline), retry=False)
+    except requests.exceptions.Timeout as e:
+        raise TimeoutError(f'TomTom took longer than {TRAFFIC_REQUEST_BUDGET}s') from e
+    response.raise_for_status()
+    with server_timing.span('parse'):
+        data = response.json()
+
+    if not data.get('routes'):
+        raise RouteNotFound('No route found')
+
+    summary = data['routes'][0]['summary']
+    _record_traffic(origin, destination, summary)
+    return _traffic_payload(origin, destination, summary)
+
+
+# Latest traffic per route, kept fresh by the poller during active windows
+_traffic_cache = TTLCache(TRAFFIC_CACHE_SECONDS, maxsize=64, name='traffic', persist=True)
+
+# Last good traffic per route, served when a live fetch runs out of time
+_last_traffic = TTLCache(86400, maxsize=64, name='traffic-last', persist=True)
+
+
+def _route_key(origin, destination):
+    return f'{_normalize_address(origin)}|{_normalize_address(destination)}'
+
+
+def _store_traffic(key, result):
+    _traffic_cache.set(key, result)
+    _last_traffic.set(key, result)
+
+
+def _refresh_traffic(origin, destination, ttl, deadline=None):
+    """Fetch traffic through the shared cache (one worker per route) and keep it locally"""
+    key = _route_key(origin, destination)
+    result, _ = shared_cache.get_or_compute(
+        f'traffic:{key}', lambda: fetch_traffic(origin, destination, deadline), ttl=ttl,
+        wait=None if deadline is None else _time_left(deadline)
+    )
+    _store_traffic(key, result)
+    return result
+
+
+def get_traffic(origin, destination):
+    """
+    Get traffic for a route, from the poller's latest result if there is one
+
+    Raises:
+        TimeoutError: If a live fetch takes longer than TRAFFIC_REQUEST_BUDGET
+    """
+    result = _traffic_cache.get(_route_key(origin, destination))
+    if result is None:
+        deadline = time.monotonic() + TRAFFIC_REQUEST_BUDGET
+        result = _refresh_traffic(origin, destination, TRAFFIC_CACHE_SECONDS, deadline)
+    return result
+
+
+_traffic_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='tomtom')
+
+
+def _matrix_point(coords):
+    lat, lon = coords.split(',')
+    return {'point': {'latitude': float(lat), 'longitude': float(lon)}}
+
+
+def _tomtom_matrix(pairs):
+    """
+    Route several coordinate pairs with one TomTom Matrix Routing v2 request
+
+    Args:
+        pairs: List of ("lat,lon", "lat,lon") origin/destination tuples
+
+    Returns:
+        list: TomTom route summary per pair, or None where TomTom found no route
+    """
+    origins = list(dict.fromkeys(o for o, _ in pairs))
+    destinations = list(dict.fromkeys(d for _, d in pairs))
+    body = {
+        'origins': [_matrix_point(c) for c in origins],
+        'destinations': [_matrix_point(c) for c in destinations],
+        'options': {'departAt': 'now', 'traffic': 'live', 'travelMode': 'car', 'routeType': 'fastest'}
+    }
+
+    response = upstream.post(
+        'tomtom', 'https://api.tomtom.com/routing/matrix/2',
+        params={'key': TOMTOM_API_KEY}, json=body, timeout=20
+    )
+    response.raise_for_status()
+    with server_timing.span('parse'):
+        data = response.json()
+
+    # Cells that failed carry a detailedError instead of a routeSummary
+    summaries = {
+        (cell['originIndex'], cell['destinationIndex']): cell.get('routeSummary')
+        for cell in data.get('data', [])
+    }
+    return [summaries.get((origins.index(o), destinations.index(d))) for o, d in pairs]
+
+
+def fetch_traffic_batch(routes):
+    """
+    Fetch current traffic for several routes together
+
+    Addresses are geocoded concurrently (normally straight from the geocode
+    cache), then every route is resolved with a single Matrix Routing call.
+    If the matrix call fails or the batch is too big for one, the routes are
+    fetched with calculateRoute in parallel instead.
+
+    Args:
+        routes: List of (origin, destination) address tuples
+
+    Returns:
+        list: Traffic payload per route, or the exception that route raised
+    """
+    addresses = list(dict.fromkeys(address for route in routes for address in route))
+    coords = dict(zip(addresses, _geocode_pool.map(server_timing.propagate(geocode_address), addresses)))
+
+    results = [None] * len(routes)
+    pending = []
+    for i, (origin, destination) in enumerate(routes):
+        if coords[origin] and coords[destination]:
+            pending.append(i)
+        else:
+            results[i] = GeocodeError('Could not geocode addresses')
+
+    pairs = [(coords[routes[i][0]], coords[routes[i][1]]) for i in pending]
+    cells = len({o for o, _ in pairs}) * len({d for _, d in pairs})
+    if pending and cells <= TRAFFIC_MATRIX_MAX_CELLS:
+        try:
+            summaries = _tomtom_matrix(pairs)
+        except Exception as e:
+            app.logger.warning('Matrix routing failed, falling back to calculateRoute: %s', e)
+        else:
+            for i, summary in zip(pending, summaries):
+                origin, destination = routes[i]
+                if summary:
+                    _record_traffic(origin, destination, summary)
+                    results[i] = _traffic_payload(origin, destination, summary)
+                else:
+                    results[i] = RouteNotFound('No route found')
+            pending = []
+
+    futures = {i: _traffic_pool.submit(server_timing.propagate(fetch_traffic), *routes[i]) for i in pending}
+    for i, future in futures.items():
+        try:
+            results[i] = future.result()
+        except Exception as e:
+            results[i] = e
+    return results
+
+
+def _refresh_traffic_batch(routes, ttl):
+    """
+    Fetch traffic for several routes through the shared cache (one worker per
+    batch) and keep each route's result locally
+
+    Returns:
+        dict: Route key -> traffic payload, or {'error': message} for routes that failed
+    """
+    keys = [_route_key(origin, destination) for origin, destination in routes]
+
+    def compute():
+        results = {}
+        for key, result in zip(keys, fetch_traffic_batch(routes)):
+            if isinstance(result, Exception):
+                results[key] = {'error': str(result)}
+            else:
+                shared_cache.set(f'traffic:{key}', result, ttl)
+                results[key] = result
+        return results
+
+    results, _ = shared_cache.get_or_compute(
+        'traffic-batch:' + ';'.join(sorted(set(keys))), compute,
+        # Failed routes are retried on the next request rather than after a full TTL
+        ttl=lambda results: ttl if all('error' not in r for r in results.values()) else TRAFFIC_ERROR_SECONDS
+    )
+    for key, result in results.items():
+        if 'error' not in result:
+            _store_traffic(key, result)
+    return results
+
+
+def poll_traffic():
+    """
+    Refresh traffic for every route inside its scheduled window
+
+    Returns:
+        float: Seconds until the next poll - TRAFFIC_POLL_INTERVAL while any
+        route is active, but never past the next time the active set changes,
+        so polling stops when the last window closes and resumes exactly when
+        the next one opens
+    """
+    if not TOMTOM_API_KEY:
+        return None
+
+    routes = [r for r in get_active_routes() if r['origin'] and r['destination']]
+    if routes:
+        try:
+            # Shared entry expires just before the next poll so every poll fetches
+            results = _refresh_traffic_batch(
+                [(r['origin'], r['destination']) for r in routes], TRAFFIC_POLL_INTERVAL * 0.9
+            )
+            for route in routes:
+                error = results[_route_key(route['origin'], route['destination'])].get('error')
+                if error:
+                    app.logger.warning('Traffic poll failed for %s: %s', route['name'], error)
+        except Exception as e:
+            app.logger.warning('Traffic poll failed: %s', e)
+
+    delay = TRAFFIC_POLL_INTERVAL if routes else 3600
+    next_change = next_active_change()
+    if next_change:
+        delay = min(delay, max((next_change - datetime.now()).total_seconds(), 1))
+    return delay
+
+
 @app.route('/api/traffic/route')
 def traffic_route():
     """
     Get traffic conditions for a route using TomTom API
     Query params: origin, destination (full addresses)
+
+    Scheduled routes are answered from the background poller's latest
+    result; other routes are fetched from TomTom and cached briefly. If
+    TomTom can't answer within TRAFFIC_REQUEST_BUDGET or the request fails,
+    the last known result is returned marked stale (or a 504 if there is none).
     """
     try:
         if not TOMTOM_API_KEY:
@@ -364,69 +1007,185 @@ def traffic_route():
         if not origin or not destination:
             return jsonify({'error': 'origin and destination required'}), 400
 
-        # Geocode addresses to coordinates
-        origin_coords = geocode_address(origin)
-        destination_coords = geocode_address(destination)
+        try:
+            return jsonify(get_traffic(origin, destination))
+        except (TimeoutError, requests.exceptions.RequestException) as e:
+            last = _last_traffic.get(_route_key(origin, destination))
+            if last is None:
+                return jsonify({'error': str(e), 'degraded': True}), 504
+            return jsonify({**last, 'stale': True, 'degraded': True})
+
+    except GeocodeError as e:
+        return jsonify({'error': str(e)}), 400
+    except RouteNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        if not origin_coords or not destination_coords:
-            return jsonify({'error': 'Could not geocode addresses'}), 400
 
-        # Get route with traffic
-        route_url = f"https://api.tomtom.com/routing/1/calculateRoute/{origin_coords}:{destination_coords}/json"
-        params = {
-            'key': TOMTOM_API_KEY,
-            'traffic': 'true',
-            'travelMode': 'car'
-        }
+@app.route('/api/traffic/batch')
+def traffic_batch():
+    """
+    Get traffic conditions for every currently active route in one response
 
-        response = requests.get(route_url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+    Routes the poller has already fetched come from cache; the rest are
+    resolved together with a single TomTom Matrix Routing request.
+    """
+    if not TOMTOM_API_KEY:
+        return jsonify({'error': 'TomTom API key not configured'}), 503
 
-        if 'routes' in data and len(data['routes']) > 0:
-            route = data['routes'][0]['summary']
+    try:
+        routes = [r for r in get_active_routes() if r['origin'] and r['destination']]
+        keys = [_route_key(r['origin'], r['destination']) for r in routes]
+        traffic = {key: _traffic_cache.get(key) for key in keys}
 
-            traffic_delay = route.get('trafficDelayInSeconds', 0)
-            travel_time_minutes = route.get('travelTimeInSeconds', 0) / 60
+        missing = list(dict.fromkeys(
+            (r['origin'], r['destination']) for r, key in zip(routes, keys) if traffic[key] is None
+        ))
+        if missing:
+            traffic.update(_refresh_traffic_batch(missing, TRAFFIC_CACHE_SECONDS))
 
-            return jsonify({
-                'origin': origin,
-                'destination': destination,
-                'travelTimeMinutes': round(travel_time_minutes),
-                'trafficDelayMinutes': round(traffic_delay / 60),
-                'distanceKm': round(route.get('lengthInMeters', 0) / 1000, 1),
-                'status': 'heavy' if traffic_delay > 600 else 'moderate' if traffic_delay > 300 else 'clear',
-                'updated': datetime.now().isoformat()
-            })
-        else:
-            return jsonify({'error': 'No route found'}), 404
+        return jsonify({
+            'routes': [
+                {'name': r['name'], 'route_num': r['route_num'],
+                 'origin': r['origin'], 'destination': r['destination'], **traffic[key]}
+                for r, key in zip(routes, keys)
+            ],
+            'updated': datetime.now().isoformat()
+        })
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-def geocode_address(address):
-    """Helper function to geocode an address using TomTom"""
+@app.route('/api/traffic/typical')
+def traffic_typical():
+    """
+    Get typical travel times for every configured route right now
+
+    Returns the p50/p90 travel time and delay recorded for each route on
+    this weekday in the current time-of-day bucket, from the samples kept
+    by the traffic history. Routes with no samples yet get null values.
+    """
     try:
-        url = 'https://api.tomtom.com/search/2/geocode/' + requests.utils.quote(address) + '.json'
-        params = {
-            'key': TOMTOM_API_KEY,
-            'countrySet': 'AU',  # Limit to Australia
-            'limit': 1
-        }
+        now = datetime.now()
+        start, end = traffic_history.bucket(now)
+
+        routes = []
+        for route in load_route_table().routes:
+            if not route['origin'] or not route['destination']:
+                continue
+            typical = traffic_history.typical(_route_key(route['origin'], route['destination']), now) or {}
+            routes.append({
+                'name': route['name'],
+                'route_num': route['route_num'],
+                'origin': route['origin'],
+                'destination': route['destination'],
+                'p50TravelMinutes': _minutes(typical.get('p50TravelSeconds')),
+                'p90TravelMinutes': _minutes(typical.get('p90TravelSeconds')),
+                'p50DelayMinutes': _minutes(typical.get('p50DelaySeconds')),
+                'p90DelayMinutes': _minutes(typical.get('p90DelaySeconds')),
+                'samples': typical.get('samples', 0)
+            })
+
+        return jsonify({
+            'routes': routes,
+            'weekday': now.strftime('%A'),
+            'bucket': f"{start.strftime('%H:%M')}-{end.strftime('%H:%M')}",
+            'updated': now.isoformat()
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _minutes(seconds):
+    return None if seconds is None else round(seconds / 60)
+
+
+# Geocodes by normalized address; None marks an address TomTom couldn't resolve
+_geocode_cache = TTLCache(GEOCODE_CACHE_SECONDS, maxsize=256, name='geocode', persist=True)
 
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
 
-        if data.get('results'):
-            position = data['results'][0]['position']
-            return f"{position['lat']},{position['lon']}"
+def _normalize_address(address):
+    """Normalize an address for use as a cache key (case and whitespace insensitive)"""
+    return ' '.join(address.split()).lower()
 
+
+def geocode_address(address, timeout=None):
+    """
+    Geocode an address using TomTom, returning "lat,lon" or None.
+    Results are cached by normalized address in memory and in the shared
+    cache on /data for GEOCODE_CACHE_SECONDS. Addresses TomTom can't match
+    are cached as None for GEOCODE_NEGATIVE_SECONDS, and request errors for
+    GEOCODE_ERROR_SECONDS, so a bad address or an outage can't drain quota.
+
+    With a timeout (seconds) the lookup is a single attempt bounded by it,
+    and a failure says nothing about the address, so it isn't cached: running
+    out of time raises TimeoutError and other request errors are re-raised.
+    """
+    key = _normalize_address(address)
+    coords = _geocode_cache.get(key, MISSING)
+    if coords is not MISSING:
+        return coords
+
+    try:
+        coords, _ = shared_cache.get_or_compute(
+            f'geocode:{key}',
+            lambda: _tomtom_geocode(address, timeout),
+            ttl=lambda coords: GEOCODE_CACHE_SECONDS if coords else GEOCODE_NEGATIVE_SECONDS,
+            wait=timeout
+        )
+    except (TimeoutError, requests.exceptions.Timeout) as e:
+        if timeout is not None:
+            raise TimeoutError(f'TomTom took longer than {TRAFFIC_REQUEST_BUDGET}s') from e
+        _geocode_cache.set(key, None, ttl=GEOCODE_ERROR_SECONDS)
+        return None
+    except Exception:
+        if timeout is not None:
+            raise
+        _geocode_cache.set(key, None, ttl=GEOCODE_ERROR_SECONDS)
         return None
-    except:
+
+    _geocode_cache.set(key, coords, ttl=GEOCODE_CACHE_SECONDS if coords else GEOCODE_NEGATIVE_SECONDS)
+    return coords
+
+
+def prewarm_geocodes():
+    """Geocode every configured traffic route address so requests only need the routing call"""
+    if not TOMTOM_API_KEY:
+        return
+    for route in load_route_table().routes:
+        for address in (route['origin'], route['destination']):
+            if address:
+                geocode_address(address)
+
+
+def _tomtom_geocode(address, timeout=None):
+    """
+    Geocode an address with the TomTom Search API (timeout=None allows 10s and retries)
+
+    Returns:
+        str: "lat,lon" of the best match, or None if TomTom has no match
+    """
+    url = 'https://api.tomtom.com/search/2/geocode/' + requests.utils.quote(address) + '.json'
+    params = {
+        'key': TOMTOM_API_KEY,
+        'countrySet': 'AU',  # Limit to Australia
+        'limit': 1
+    }
+
+    response = upstream.get('tomtom', url, params=params, timeout=timeout or 10, retry=timeout is None)
+    response.raise_for_status()
+    with server_timing.span('parse'):
+        data = response.json()
+
+    if not data.get('results'):
         return None
 
+    position = data['results'][0]['position']
+    return f"{position['lat']},{position['lon']}"
+
 
 @app.route('/api/traffic/active-routes')
 def active_routes():
@@ -448,14 +1207,20 @@ def active_routes():
             }
         ],
         "count": 1,
+        "next_change": "2025-10-27T09:01:00",
         "updated": "2025-10-27T08:30:00.123456"
     }
+
+    next_change is when the set of active routes next changes (null if it
+    never does), so callers can cache the response until then.
     """
     try:
         routes = get_active_routes()
+        next_change = next_active_change()
         return jsonify({
             'routes': routes,
             'count': len(routes),
+            'next_change': next_change.isoformat() if next_change else None,
             'updated': datetime.now().isoformat()
         })
     except Exception as e:
@@ -477,6 +1242,10 @@ def _wg_interface_up():
         return False
 
 
+# Recent wg0 traffic counters, sampled every WG_SAMPLE_INTERVAL by the wireguard-sampler task
+wg_sampler = InterfaceSampler('wg0', WG_SAMPLE_INTERVAL, sysfs=WG_SYSFS_NET)
+
+
 @app.route('/api/wireguard/status')
 def wireguard_status():
     """
@@ -484,50 +1253,179 @@ def wireguard_status():
     No systemctl or wg CLI required — works inside a container.
     """
     try:
-        up = _wg_interface_up()
-        if not up:
-            return jsonify({
-                'status': 'Inactive',
-                'interface': 'wg0 (down)',
-                'service_status': 'inactive',
-                'updated': datetime.now().isoformat()
-            })
+        return jsonify(wireguard_payload())
+    except Exception as e:
+        return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
 
-        return jsonify({
-            'status': 'Active',
-            'interface': 'wg0 (up)',
-            'service_status': 'active',
+
+def wireguard_payload():
+    """Build the /api/wireguard/status response"""
+    if not _wg_interface_up():
+        return {
+            'status': 'Inactive',
+            'interface': 'wg0 (down)',
+            'service_status': 'inactive',
             'updated': datetime.now().isoformat()
-        })
+        }
+
+    payload = {
+        'status': 'Active',
+        'interface': 'wg0 (up)',
+        'service_status': 'active',
+        'updated': datetime.now().isoformat()
+    }
+
+    # Current, peak and 1/5/15 minute rates from the background sampler
+    throughput = wg_sampler.stats()
+    if throughput:
+        payload['throughput'] = throughput
+        if throughput['rx_rate'] is not None:
+            payload['rx'] = f"{_fmt_bytes(throughput['rx_rate'])}/s"
+            payload['tx'] = f"{_fmt_bytes(throughput['tx_rate'])}/s"
+
+    return payload
+
+
+# Generic netlink connection to the kernel's WireGuard family, for per-peer stats
+wg_netlink = WireGuardNetlink()
 
+
+@ttl_cache(seconds=WG_PEERS_CACHE_SECONDS, maxsize=1)
+def fetch_wireguard_peers():
+    """
+    Dump wg0 and its peers over netlink.
+    Cached for WG_PEERS_CACHE_SECONDS; a dump is one request to the kernel.
+    """
+    return wg_netlink.get_device('wg0')
+
+
+@app.route('/api/wireguard/peers')
+def wireguard_peers():
+    """
+    Get last handshake, endpoint and transfer totals for every wg0 peer.
+    Read from the kernel over generic netlink, so no wg CLI is needed, but
+    the container must share the host's network namespace with NET_ADMIN.
+    """
+    try:
+        device = fetch_wireguard_peers()
+    except OSError as e:
+        if e.errno == errno.ENODEV:
+            return jsonify({'error': 'wg0 not found'}), 404
+        if e.errno in (errno.EPERM, errno.EACCES, errno.ENOENT, errno.EAFNOSUPPORT):
+            return jsonify({'error': f'WireGuard netlink unavailable: {e.strerror or e}'}), 503
+        return jsonify({'error': str(e)}), 500
     except Exception as e:
-        return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
+        return jsonify({'error': str(e)}), 500
+
+    now = time.time()
+    peers = []
+    for peer in device['peers']:
+        handshake = peer.get('last_handshake')
+        peers.append({
+            'public_key': peer.get('public_key'),
+            'endpoint': peer.get('endpoint'),
+            'allowed_ips': peer.get('allowed_ips', []),
+            'last_handshake': datetime.fromtimestamp(handshake).isoformat() if handshake else None,
+            'handshake_age_seconds': max(round(now - handshake), 0) if handshake else None,
+            'persistent_keepalive': peer.get('persistent_keepalive'),
+            'rx_bytes': peer.get('rx_bytes', 0),
+            'tx_bytes': peer.get('tx_bytes', 0)
+        })
+
+    return jsonify({
+        'interface': device.get('interface', 'wg0'),
+        'public_key': device.get('public_key'),
+        'listen_port': device.get('listen_port'),
+        'peers': peers,
+        'updated': datetime.now().isoformat()
+    })
 
 
 # =============================================================================
 # DOCKER DAEMON STATUS
 # =============================================================================
 
-def _docker_api(path):
+# Keep-alive connections to the Docker socket, shared by this worker's requests
+docker_client = DockerClient()
+_docker_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='docker')
+
+# Container states, kept current from the daemon's /events stream by the docker-events task
+container_model = ContainerModel()
+
+
+# Latest /system/df breakdown, computed by the docker-df background task
+_docker_df_cache = TTLCache(3 * DOCKER_DF_INTERVAL, maxsize=1, name='docker-df', persist=True)
+
+
+def summarize_docker_df(df):
     """
-    Make a GET request to the Docker daemon via its Unix socket.
-    No docker CLI or SDK required.
+    Break a /system/df response down into bytes used and reclaimable
+
+    Reclaimable space follows `docker system df`: images no container uses,
+    stopped containers' writable layers, volumes nothing references and
+    build cache that isn't in use. Sizes the daemon reports as -1 (unknown)
+    count as 0.
+
+    Returns:
+        dict: {images|containers|volumes|build_cache: {count, size, reclaimable}}
+        plus total and reclaimable byte counts across all four
     """
-    import http.client
-    import socket as _socket
+    def size(n):
+        return max(n or 0, 0)
+
+    images = df.get('Images') or []
+    containers = df.get('Containers') or []
+    volumes = df.get('Volumes') or []
+    build_cache = df.get('BuildCache') or []
+
+    parts = {
+        'images': {
+            'count': len(images),
+            'size': size(df.get('LayersSize')) or sum(size(i.get('Size')) for i in images),
+            'reclaimable': sum(
+                size(i.get('Size')) - size(i.get('SharedSize')) for i in images if not i.get('Containers')
+            )
+        },
+        'containers': {
+            'count': len(containers),
+            'size': sum(size(c.get('SizeRw')) for c in containers),
+            'reclaimable': sum(size(c.get('SizeRw')) for c in containers if c.get('State') != 'running')
+        },
+        'volumes': {
+            'count': len(volumes),
+            'size': sum(size((v.get('UsageData') or {}).get('Size')) for v in volumes),
+            'reclaimable': sum(
+                size((v.get('UsageData') or {}).get('Size')) for v in volumes
+                if (v.get('UsageData') or {}).get('RefCount') == 0
+            )
+        },
+        'build_cache': {
+            'count': len(build_cache),
+            'size': sum(size(b.get('Size')) for b in build_cache),
+            'reclaimable': sum(size(b.get('Size')) for b in build_cache if not b.get('InUse'))
+        }
+    }
+    return {
+        **parts,
+        'total': sum(part['size'] for part in parts.values()),
+        'reclaimable': sum(part['reclaimable'] for part in parts.values())
+    }
 
-    class _UnixConn(http.client.HTTPConnection):
-        def connect(self):
-            self.sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
-            self.sock.connect('/var/run/docker.sock')
 
-    conn = _UnixConn('localhost')
-    try:
-        conn.request('GET', path)
-        resp = conn.getresponse()
-        return json.loads(resp.read())
-    finally:
-        conn.close()
+def refresh_docker_df():
+    """
+    Recompute Docker disk usage from /system/df and keep it in memory
+
+    Goes through the shared cache, so only one worker scans per interval and
+    the others pick up its result.
+    """
+    usage, _ = shared_cache.get_or_compute(
+        'docker-df',
+        lambda: {**summarize_docker_df(docker_client.get('/system/df')), 'updated': datetime.now().isoformat()},
+        ttl=DOCKER_DF_INTERVAL * 0.9
+    )
+    _docker_df_cache.set('df', usage)
+    return usage
 
 
 def _fmt_bytes(n):
@@ -545,35 +1443,43 @@ def docker_status():
     Get Docker daemon status via the Unix socket.
     No systemctl or docker CLI required — works inside a container.
     """
+    return jsonify(docker_status_payload())
+
+
+def docker_status_payload():
+    """Build the /api/docker/status response (an Inactive status if the daemon can't be reached)"""
     try:
-        info = _docker_api('/info')
-        version_info = _docker_api('/version')
+        if container_model.live:
+            # Event-driven counts; with /version cached this needs no daemon calls at all
+            running, total = container_model.counts()
+            version_info = docker_client.version()
+        else:
+            # /version is normally cached; when it isn't, fetch it alongside /info
+            version_future = _docker_pool.submit(server_timing.propagate(docker_client.version))
+            info = docker_client.get('/info')
+            version_info = version_future.result()
+            running = info.get('ContainersRunning', 0)
+            total = info.get('Containers', 0)
 
-        running = info.get('ContainersRunning', 0)
-        total = info.get('Containers', 0)
         docker_version = version_info.get('Version', 'Unknown')
 
-        # Disk usage: sum image sizes from /system/df
-        disk_usage = 'Unknown'
-        try:
-            df = _docker_api('/system/df')
-            total_bytes = sum(img.get('Size', 0) for img in df.get('Images', []))
-            disk_usage = _fmt_bytes(total_bytes)
-        except Exception:
-            pass
+        # Disk usage (image sizes) from the docker-df background task, never scanned here
+        df = _docker_df_cache.get('df')
+        disk_usage = _fmt_bytes(df['images']['size']) if df else 'Unknown'
 
         status_text = f'Active ({running}/{total} running)'
-        return jsonify({
+        return {
             'status': status_text,
             'containers': f'{running}/{total}',
             'version': f'v{docker_version}',
             'disk_usage': disk_usage,
+            'disk': df,
             'service_status': 'active',
             'updated': datetime.now().isoformat()
-        })
+        }
 
     except Exception as e:
-        return jsonify({
+        return {
             'status': 'Inactive',
             'containers': 'N/A',
             'version': 'N/A',
@@ -581,12 +1487,326 @@ def docker_status():
             'service_status': 'unknown',
             'error': str(e),
             'updated': datetime.now().isoformat()
+        }
+
+
+# Each stats call blocks for about a second while the daemon takes two CPU samples,
+# so every running container gets its own thread and connection
+_docker_stats_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix='docker-stats')
+
+
+def summarize_container_stats(stats):
+    """
+    Reduce a /containers/{id}/stats response to the figures `docker stats` shows
+
+    CPU % is relative to one core (so 200% means two busy cores), memory
+    excludes the page cache, and I/O counters are totals since start.
+    """
+    cpu = stats.get('cpu_stats') or {}
+    precpu = stats.get('precpu_stats') or {}
+    cpu_usage = cpu.get('cpu_usage') or {}
+    cpu_delta = cpu_usage.get('total_usage', 0) - (precpu.get('cpu_usage') or {}).get('total_usage', 0)
+    system_delta = cpu.get('system_cpu_usage', 0) - precpu.get('system_cpu_usage', 0)
+    online_cpus = cpu.get('online_cpus') or len(cpu_usage.get('percpu_usage') or []) or 1
+    cpu_percent = cpu_delta / system_delta * online_cpus * 100 if cpu_delta > 0 and system_delta > 0 else 0.0
+
+    memory = stats.get('memory_stats') or {}
+    memory_stats = memory.get('stats') or {}
+    # cgroup v1 reports page cache as "cache", v2 as "inactive_file"
+    cache_bytes = memory_stats.get('cache', memory_stats.get('inactive_file', 0))
+    memory_used = max(memory.get('usage', 0) - cache_bytes, 0)
+    memory_limit = memory.get('limit', 0)
+
+    networks = (stats.get('networks') or {}).values()
+    block_io = (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []
+
+    return {
+        'cpu_percent': round(cpu_percent, 2),
+        'memory_bytes': memory_used,
+        'memory_limit_bytes': memory_limit,
+        'memory_percent': round(memory_used / memory_limit * 100, 2) if memory_limit else 0.0,
+        'network_rx_bytes': sum(n.get('rx_bytes', 0) for n in networks),
+        'network_tx_bytes': sum(n.get('tx_bytes', 0) for n in networks),
+        'block_read_bytes': sum(e.get('value', 0) for e in block_io if e.get('op', '').lower() == 'read'),
+        'block_write_bytes': sum(e.get('value', 0) for e in block_io if e.get('op', '').lower() == 'write')
+    }
+
+
+def _running_containers():
+    """(id, name) of every running container, from the live model when there is one"""
+    if container_model.live:
+        containers = container_model.containers()
+    else:
+        containers = [
+            {'id': c['Id'], 'name': (c.get('Names') or ['/' + c['Id'][:12]])[0].lstrip('/'), 'state': c.get('State')}
+            for c in docker_client.get('/containers/json')
+        ]
+    return [(c['id'], c['name']) for c in containers if c['state'] == 'running']
+
+
+def _collect_container_stats():
+    """Fetch one-shot stats for every running container concurrently"""
+    containers = _running_containers()
+    get = server_timing.propagate(docker_client.get)
+    futures = {
+        _docker_stats_pool.submit(get, f'/containers/{container_id}/stats?stream=false'):
+            (container_id, name)
+        for container_id, name in containers
+    }
+
+    results = []
+    for future in as_completed(futures):
+        container_id, name = futures[future]
+        entry = {'name': name, 'id': container_id[:12]}
+        try:
+            entry.update(summarize_container_stats(future.result()))
+        except Exception as e:
+            # The container may have stopped since it was listed
+            entry['error'] = str(e)
+        results.append(entry)
+    return sorted(results, key=lambda entry: entry['name'])
+
+
+# Each worker's copy of the shared container stats
+_container_stats_cache = TTLCache(DOCKER_STATS_CACHE_SECONDS, maxsize=1, name='docker-stats')
+
+
+def fetch_container_stats():
+    """
+    Get resource stats for every running container.
+    Cached for DOCKER_STATS_CACHE_SECONDS and shared between workers, so
+    the daemon collects one set of stats per window however often it's asked.
+    """
+    return _get_shared(
+        _container_stats_cache, 'docker-stats', _collect_container_stats, DOCKER_STATS_CACHE_SECONDS
+    )
+
+
+@app.route('/api/docker/stats')
+def docker_stats():
+    """
+    Get CPU, memory, network and block I/O for every running container.
+    All containers are sampled at once, so the response takes about one
+    stats call however many containers there are.
+    """
+    try:
+        containers = fetch_container_stats()
+        return jsonify({
+            'containers': containers,
+            'cpu_percent': round(sum(c.get('cpu_percent', 0) for c in containers), 2),
+            'memory_bytes': sum(c.get('memory_bytes', 0) for c in containers),
+            'updated': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/docker/containers')
+def docker_containers():
+    """
+    List every container with its state, health and uptime
+
+    Served from the event-driven container model. Until its event stream is
+    connected the model is reloaded from a full listing on each request.
+    """
+    try:
+        if not container_model.live:
+            container_model.resync(docker_client)
+
+        now = time.time()
+        containers = []
+        for container in container_model.containers():
+            started_at = container['started_at'] if container['state'] == 'running' else None
+            containers.append({
+                'name': container['name'],
+                'id': container['id'][:12],
+                'image': container['image'],
+                'state': container['state'],
+                'health': container['health'],
+                'started': datetime.fromtimestamp(started_at).isoformat() if started_at else None,
+                'uptime_seconds': max(round(now - started_at), 0) if started_at else None
+            })
+
+        running, total = container_model.counts()
+        return jsonify({
+            'containers': containers,
+            'running': running,
+            'total': total,
+            'live': container_model.live,
+            'updated': datetime.now().isoformat()
         })
 
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# =============================================================================
+# DASHBOARD
+# =============================================================================
+
+DASHBOARD_SECTIONS = ('weather', 'transport', 'wireguard', 'docker')
+
+# Builders for every section but transport, which fans out per stop on _transport_pool
+_dashboard_builders = {
+    'weather': weather_payload,
+    'wireguard': wireguard_payload,
+    'docker': docker_status_payload
+}
+_dashboard_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dashboard')
+
+
+@app.route('/api/dashboard', methods=['GET', 'POST'])
+def dashboard():
+    """
+    Get every widget's payload in one request.
+    Sections are the same payloads as /api/bom/weather, /api/transport/batch,
+    /api/wireguard/status and /api/docker/status, assembled concurrently
+    and normally straight from their caches.
+
+    GET query params:
+      sections - comma-separated subset of weather,transport,wireguard,docker (default all)
+      stop - stop ID for the transport section; repeat for several stops
+    POST takes {"sections": [...], "stops": [...]} instead, with stops as in
+    /api/transport/batch so each can carry its own filters.
+
+    Partial results: a section that fails carries an 'error', and one that
+    isn't ready within DASHBOARD_SECTION_TIMEOUT is null and listed in
+    'missing' (a transport board as "transport:<stop_id>"). Late sections
+    keep loading, so the next request finds them cached.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        sections = body.get('sections') or list(DASHBOARD_SECTIONS)
+        stops = body.get('stops') or []
+    else:
+        sections = [name for name in request.args.get('sections', '').split(',') if name] or list(DASHBOARD_SECTIONS)
+        stops = [{'stop_id': stop_id} for stop_id in request.args.getlist('stop')]
+
+    if not isinstance(sections, list) or not all(
+        isinstance(name, str) and name in DASHBOARD_SECTIONS for name in sections
+    ):
+        return jsonify({'error': f"sections must be from {', '.join(DASHBOARD_SECTIONS)}"}), 400
+    if not isinstance(stops, list) or len(stops) > TRANSPORT_BATCH_MAX_STOPS:
+        return jsonify({'error': f'stops must be a list of at most {TRANSPORT_BATCH_MAX_STOPS} stops'}), 400
+    try:
+        specs = [(str(stop['stop_id']), _departure_filters(stop)) for stop in stops]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Each stop needs a stop_id and valid filters'}), 400
+
+    deadline = time.monotonic() + DASHBOARD_SECTION_TIMEOUT
+    futures = {
+        name: _dashboard_pool.submit(server_timing.propagate(_dashboard_builders[name]))
+        for name in DASHBOARD_SECTIONS if name in sections and name in _dashboard_builders
+    }
+    transport = 'transport' in sections and TRANSPORT_NSW_API_KEY
+    stop_futures = {
+        stop_id: _transport_pool.submit(server_timing.propagate(fetch_departures), stop_id)
+        for stop_id in dict.fromkeys(stop_id for stop_id, _ in specs)
+    } if transport else {}
+
+    payload = {}
+    missing = []
+    for name, future in futures.items():
+        try:
+            payload[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FuturesTimeoutError:
+            payload[name] = None
+            missing.append(name)
+        except Exception as e:
+            payload[name] = {'error': str(e)}
+
+    if 'transport' in sections:
+        if not TRANSPORT_NSW_API_KEY:
+            payload['transport'] = {'error': 'Transport NSW API key not configured'}
+        else:
+            boards = []
+            for stop_id, filters in specs:
+                try:
+                    boards.append(_departure_board(
+                        stop_id, filters, stop_futures[stop_id], timeout=max(deadline - time.monotonic(), 0)
+                    ))
+                except FuturesTimeoutError:
+                    boards.append({'stopId': stop_id, 'departures': None})
+                    missing.append(f'transport:{stop_id}')
+            payload['transport'] = {'boards': boards}
+
+    return jsonify({
+        **payload,
+        'missing': missing,
+        'updated': datetime.now().isoformat()
+    })
+
+
+# =============================================================================
+# BACKGROUND TASKS
+# =============================================================================
+
+# Periodic jobs run by each worker, started by start_background()
+_background_tasks = []
+
+
+def _save_snapshot():
+    """Write the in-memory caches to SNAPSHOT_PATH if the data volume is available"""
+    if SNAPSHOT_PATH and os.access(DATA_DIR, os.W_OK):
+        save_snapshot(SNAPSHOT_PATH)
+
+
+def start_background():
+    """
+    Restore the cache snapshot and start periodic background tasks.
+    Called once per worker by gunicorn (see gunicorn.conf.py); caches restored
+    from the snapshot are served straight away with their real age and
+    refreshed in the background once stale.
+    """
+    if _background_tasks:
+        return
+
+    if SNAPSHOT_PATH:
+        load_snapshot(SNAPSHOT_PATH)
+
+    _background_tasks.append(PeriodicTask('cache-snapshot', _save_snapshot, SNAPSHOT_INTERVAL))
+    _background_tasks.append(PeriodicTask('geocode-prewarm', prewarm_geocodes, 6 * 3600, run_immediately=True))
+    _background_tasks.append(PeriodicTask('traffic-poller', poll_traffic, TRAFFIC_POLL_INTERVAL, run_immediately=True))
+    _background_tasks.append(PeriodicTask('docker-df', refresh_docker_df, DOCKER_DF_INTERVAL, run_immediately=True))
+    _background_tasks.append(PeriodicTask('cache-metrics', metrics.update_cache_gauges, METRICS_CACHE_INTERVAL))
+    _background_tasks.append(PeriodicTask(
+        'wireguard-sampler', wg_sampler.sample, WG_SAMPLE_INTERVAL, run_immediately=True
+    ))
+    # Runs for as long as the event stream stays connected, then reconnects
+    _background_tasks.append(PeriodicTask(
+        'docker-events', lambda: container_model.watch(docker_client), 1, run_immediately=True
+    ))
+
+    for task in _background_tasks:
+        task.start()
+
+
+def stop_background():
+    """Stop background tasks and write a final cache snapshot on shutdown"""
+    container_model.close()
+    for task in _background_tasks:
+        task.stop(timeout=5)
+    _background_tasks.clear()
+    upstream.close_all()
+    docker_client.close()
+    wg_sampler.close()
+    wg_netlink.close()
+
+    try:
+        _save_snapshot()
+    except OSError as e:
+        app.logger.warning('Could not save cache snapshot: %s', e)
+
 
 if __name__ == '__main__':
-    # Clear weather API cache on startup
-    get_weather_api.cache_clear()
+    import atexit
+
+    # Start warm from the last snapshot and save one on exit
+    start_background()
+    atexit.register(stop_background)
 
     # Run server
     app.run(host='0.0.0.0', port=5200, debug=False)
@@ -0,0 +1,55 @@
+"""
+Background tasks for the Homepage API
+Periodic jobs run in daemon threads inside each gunicorn worker
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Call a function repeatedly in a daemon thread
+
+    func runs every interval seconds. If it returns a number, that is used as
+    the delay before the next run instead, so a task can sleep until exactly
+    when it next has work to do. Exceptions are logged and the task carries on.
+    """
+
+    def __init__(self, name, func, interval, run_immediately=False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.run_immediately = run_immediately
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the task thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the task to stop and wait for the current run to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        delay = 0 if self.run_immediately else self.interval
+        while not self._stop.wait(delay):
+            try:
+                result = self.func()
+            except Exception:
+                logger.exception('Background task %s failed', self.name)
+                result = None
+            delay = self.interval if result is None else max(result, 0)
@@ -0,0 +1,624 @@
+"""
+Caching helpers for the Homepage API
+Keeps upstream payloads warm so widget requests don't wait on slow upstreams
+"""
+
+from collections import OrderedDict
+from functools import wraps
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Every cache created in this process, for clearing and reporting in one go
+_registry = weakref.WeakSet()
+
+# Sentinel default for get() meaning "not cached", since None can be a cached value
+MISSING = object()
+
+
+def registered_caches():
+    """Return every live cache, sorted by name"""
+    return sorted(_registry, key=lambda cache: cache.name)
+
+
+def clear_all():
+    """Drop every cached value in this process"""
+    for cache in list(_registry):
+        cache.clear()
+
+
+def save_snapshot(path):
+    """
+    Write every persistent cache's contents to a JSON file
+
+    Only caches created with persist=True are saved. The file is replaced
+    atomically so a crash mid-write never leaves a truncated snapshot.
+    """
+    snapshot = {
+        'saved_at': time.time(),
+        'caches': {cache.name: cache.dump() for cache in registered_caches() if cache.persist}
+    }
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """
+    Restore persistent caches from a snapshot written by save_snapshot()
+
+    Returns:
+        int: Number of caches restored (0 if there is no usable snapshot)
+    """
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as e:
+        logger.warning('Ignoring unreadable cache snapshot %s: %s', path, e)
+        return 0
+
+    saved = snapshot.get('caches', {})
+    restored = 0
+    for cache in registered_caches():
+        if cache.persist and cache.name in saved:
+            cache.load(saved[cache.name])
+            restored += 1
+    return restored
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache where every entry carries its own expiry
+
+    Each entry expires ttl seconds after it was stored, shortened by a random
+    fraction of up to jitter so entries stored together don't all expire
+    together. Expired entries are dropped one at a time: when they are next
+    looked up, or when they reach the LRU end of the cache during an insert.
+
+    With persist=True the cache is included in save_snapshot(); its keys and
+    values must then be JSON-serialisable (tuple keys are saved as lists).
+    """
+
+    def __init__(self, ttl, maxsize=128, jitter=0.1, name='cache', persist=False):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.jitter = jitter
+        self.name = name
+        self.persist = persist
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value), LRU first
+        _registry.add(self)
+
+    def get(self, key, default=None):
+        """Get a cached value, or default if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store a value, expiring after ttl seconds (defaults to the cache TTL)"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        expires_at = now + ttl * (1 - random.uniform(0, self.jitter))
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+
+            # Opportunistically drop the least recently used entry if it has expired
+            oldest_key, (oldest_expiry, _) = next(iter(self._entries.items()))
+            if oldest_expiry <= now and oldest_key != key:
+                del self._entries[oldest_key]
+                self.expirations += 1
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Get a cached value, calling compute() and storing its result on a miss"""
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key):
+        """Remove a single entry if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def dump(self):
+        """Return live entries as [key, value, expires_at] with wall-clock expiry"""
+        offset = time.time() - time.monotonic()
+        with self._lock:
+            return [
+                [list(key) if isinstance(key, tuple) else key, value, expires_at + offset]
+                for key, (expires_at, value) in self._entries.items()
+            ]
+
+    def load(self, entries):
+        """Restore entries from dump(), skipping any that expired meanwhile"""
+        offset = time.time() - time.monotonic()
+        now = time.monotonic()
+        with self._lock:
+            for key, value, expires_at in entries:
+                expires_at -= offset
+                if expires_at > now:
+                    key = tuple(key) if isinstance(key, list) else key
+                    self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return size and hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key within a process
+
+    do() runs the function for the first caller of a key; threads that call
+    do() with that key while it is running wait for it and share its result,
+    or its exception, instead of calling the function again. Once the call
+    finishes the next caller runs the function afresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in flight
+
+    def do(self, key, func, timeout=None):
+        """
+        Call func(), or wait for the call already running for key
+
+        Args:
+            timeout: Longest a waiting caller waits (seconds); None for as
+                long as the running call takes
+
+        Raises:
+            TimeoutError: If a waiting caller's timeout runs out first
+            Whatever func() raises, in every caller that shared the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f'Timed out waiting for the in-flight call for {key}')
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = func()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def ttl_cache(seconds, maxsize=128, jitter=0.1, cache_none=True, persist=False):
+    """
+    Decorator caching a function's results per argument tuple in a TTLCache
+
+    Args:
+        seconds: How long each result is cached
+        maxsize: Maximum number of distinct argument tuples kept
+        jitter: Fraction of the TTL randomly shaved off each entry
+        cache_none: Whether a None result is cached (False for lookups where
+            None means "failed, try again next time")
+        persist: Whether results are saved in cache snapshots
+
+    Concurrent misses for the same arguments are coalesced: one thread calls
+    func and the others wait for its result.
+
+    The wrapper exposes cache (the TTLCache), cache_clear() and cache_info().
+    """
+    def decorator(func):
+        cache = TTLCache(seconds, maxsize=maxsize, jitter=jitter, name=func.__qualname__, persist=persist)
+        flights = SingleFlight()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args + (MISSING,) + tuple(sorted(kwargs.items())) if kwargs else args
+            value = cache.get(key, MISSING)
+            if value is MISSING:
+                def compute():
+                    result = func(*args, **kwargs)
+                    if result is not None or cache_none:
+                        cache.set(key, result)
+                    return result
+                value = flights.do(key, compute)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        wrapper.cache_info = cache.stats
+        return wrapper
+    return decorator
+
+
+def writable_path(path, what):
+    """
+    Return path if its directory is writable, otherwise None
+
+    Used by the SQLite-backed stores, which are disabled rather than failing
+    when the /data volume is missing; what names the store in the warning.
+    """
+    if path and not os.access(os.path.dirname(path) or '.', os.W_OK):
+        logger.warning('%s disabled: %s is not writable', what, os.path.dirname(path))
+        return None
+    return path
+
+
+def sqlite_connection(local, path, schema):
+    """
+    Get the calling thread's connection to a SQLite file, opening it on first use
+
+    One connection per thread per process, kept on local (a threading.local);
+    SQLite connections can't cross forks. A new connection is switched to WAL
+    with synchronous=NORMAL, then runs the schema statements, which must be
+    idempotent (CREATE ... IF NOT EXISTS).
+    """
+    conn = getattr(local, 'conn', None)
+    if conn is None or local.pid != os.getpid():
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in schema:
+            conn.execute(statement)
+        local.conn = conn
+        local.pid = os.getpid()
+    return conn
+
+
+class SharedCache:
+    """
+    Cache shared by every gunicorn worker, stored in SQLite on the /data volume
+
+    Values must be JSON-serialisable. get_or_compute() takes a short-lived
+    lease on the key before computing, so when several workers miss the same
+    key at once only one of them calls the upstream; the others wait for its
+    result. Within a worker, threads missing the same key are coalesced
+    before they reach SQLite, so only one of them takes part. If path is
+    None, or its directory isn't writable, the cache is disabled and
+    get_or_compute() only coalesces threads.
+    """
+
+    # Rows this long past their expiry are pruned
+    PRUNE_AFTER = 86400
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS entries ('
+        'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+        'stored_at REAL NOT NULL, expires_at REAL NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS leases ('
+        'key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)',
+    )
+
+    def __init__(self, path, lease_seconds=30, poll_interval=0.05):
+        self.path = writable_path(path, 'Shared cache')
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._owner = uuid.uuid4().hex
+        self._local = threading.local()
+        self._writes = 0
+        self._flights = SingleFlight()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def _conn(self):
+        return sqlite_connection(self._local, self.path, self.SCHEMA)
+
+    def get(self, key):
+        """
+        Get a fresh value from the shared cache
+
+        Returns:
+            tuple: (value, age_seconds), or (None, None) if missing or expired
+        """
+        if not self.enabled:
+            return None, None
+        row = self._conn().execute(
+            'SELECT value, stored_at, expires_at FROM entries WHERE key = ?', (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or row[2] <= now:
+            return None, None
+        return json.loads(row[0]), max(now - row[1], 0.0)
+
+    def set(self, key, value, ttl):
+        """Store a value for ttl seconds"""
+        if not self.enabled:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO entries (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), now, now + ttl)
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            conn.execute('DELETE FROM entries WHERE expires_at < ?', (now - self.PRUNE_AFTER,))
+
+    def delete(self, key):
+        """Remove a single entry if present"""
+        if self.enabled:
+            self._conn().execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def clear(self):
+        """Remove every entry and lease"""
+        if self.enabled:
+            conn = self._conn()
+            conn.execute('DELETE FROM entries')
+            conn.execute('DELETE FROM leases')
+
+    def get_or_compute(self, key, compute, ttl, wait=None):
+        """
+        Get a fresh value, computing and storing it on a miss
+
+        Only the worker holding the key's lease calls compute(); any other
+        worker that misses meanwhile waits for the stored result. If the
+        lease holder fails or the lease runs out, the waiter computes itself.
+        ttl may be a function of the computed value, e.g. to keep negative
+        results for less time than positive ones.
+
+        Args:
+            wait: Longest to wait for another worker's result (seconds);
+                None waits as long as its lease lasts
+
+        Returns:
+            tuple: (value, age_seconds)
+
+        Raises:
+            TimeoutError: If another worker (or thread) computes for longer than wait
+            Whatever compute() raises
+        """
+        if not self.enabled:
+            return self._flights.do(key, lambda: (compute(), 0.0), timeout=wait)
+        return self._flights.do(key, lambda: self._get_or_compute(key, compute, ttl, wait), timeout=wait)
+
+    def _get_or_compute(self, key, compute, ttl, wait):
+        value, age = self.get(key)
+        if age is not None:
+            return value, age
+
+        if not self._acquire(key):
+            waited_for = self._wait_for(key, None if wait is None else time.monotonic() + wait)
+            if waited_for is not None:
+                return waited_for
+            # The other worker gave up or died; take over
+            self._acquire(key, force=True)
+
+        try:
+            # Another worker may have stored the value and released its lease since the get() above
+            value, age = self.get(key)
+            if age is not None:
+                return value, age
+            value = compute()
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            return value, 0.0
+        finally:
+            self._release(key)
+
+    def _acquire(self, key, force=False):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT expires_at FROM leases WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[0] > now and not force:
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)',
+                (key, self._owner, now + self.lease_seconds)
+            )
+            return True
+        finally:
+            conn.execute('COMMIT')
+
+    def _release(self, key):
+        self._conn().execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, self._owner))
+
+    def _wait_for(self, key, until=None):
+        """Poll until another worker stores key; None if its lease lapses first"""
+        conn = self._conn()
+        while True:
+            if until is not None and time.monotonic() >= until:
+                raise TimeoutError(f'Timed out waiting for another worker to compute {key}')
+            time.sleep(self.poll_interval)
+            value, age = self.get(key)
+            if age is not None:
+                return value, age
+            row = conn.execute('SELECT expires_at FROM leases WHERE key = ?', (key,)).fetchone()
+            if row is None or row[0] <= time.time():
+                # The holder may have stored and released since the get() above
+                value, age = self.get(key)
+                return (value, age) if age is not None else None
+
+
+class StaleWhileRevalidate:
+    """
+    Serve the last good result of a fetch function, refreshing it in the background
+
+    The first get() blocks on fetch() because there is nothing to serve yet.
+    After that get() always returns the stored value straight away; once the
+    value is older than ttl a single background thread refreshes it. A failed
+    refresh keeps the previous value, so callers see stale data, not an error.
+
+    With a SharedCache, refreshes go through it under the refresher's name, so
+    across all workers only one fetch runs per TTL and every worker reports
+    the value's real age. With persist=True the value (which must be
+    JSON-serialisable) is included in save_snapshot().
+    """
+
+    def __init__(self, fetch, ttl, name=None, shared=None, persist=False):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.name = name or fetch.__name__
+        self.shared = shared
+        self.persist = persist
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._value = None
+        self._fetched_at = None
+        self._thread = None
+        self._flights = SingleFlight()
+        _registry.add(self)
+
+    def get(self):
+        """
+        Get the current value and its age
+
+        Returns:
+            tuple: (value, age_seconds)
+
+        Raises:
+            Whatever fetch() raises, but only when there is no value yet
+        """
+        with self._lock:
+            value, fetched_at = self._value, self._fetched_at
+
+        if fetched_at is None:
+            # Concurrent cold callers (and a running background refresh) share one fetch
+            value = self._flights.do('refresh', self.refresh)
+            with self._lock:
+                return value, time.monotonic() - self._fetched_at
+
+        age = time.monotonic() - fetched_at
+        if age >= self.ttl:
+            self._refresh_in_background()
+        return value, age
+
+    def refresh(self):
+        """Fetch a new value synchronously and store it"""
+        if self.shared is not None:
+            value, age = self.shared.get_or_compute(self.name, self.fetch, self.ttl)
+        else:
+            value, age = self.fetch(), 0.0
+        with self._lock:
+            self._value = value
+            self._fetched_at = time.monotonic() - age
+            self.last_error = None
+        return value
+
+    @property
+    def age(self):
+        """Seconds since the current value was fetched, or None if there is none"""
+        with self._lock:
+            fetched_at = self._fetched_at
+        return None if fetched_at is None else time.monotonic() - fetched_at
+
+    def join(self, timeout=None):
+        """Wait for an in-flight background refresh to finish"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def clear(self):
+        """Drop the stored value so the next get() fetches again"""
+        self.join()
+        with self._lock:
+            self._value = None
+            self._fetched_at = None
+            self.last_error = None
+
+    def dump(self):
+        """Return the current value with its wall-clock fetch time"""
+        with self._lock:
+            if self._fetched_at is None:
+                return None
+            age = time.monotonic() - self._fetched_at
+            return {'value': self._value, 'stored_at': time.time() - age}
+
+    def load(self, saved):
+        """Restore a value from dump(), keeping its real age"""
+        if not saved:
+            return
+        age = max(time.time() - saved['stored_at'], 0.0)
+        with self._lock:
+            if self._fetched_at is None:
+                self._value = saved['value']
+                self._fetched_at = time.monotonic() - age
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._refresh_quietly,
+                name=f'refresh-{self.name}',
+                daemon=True
+            )
+            self._thread.start()
+
+    def _refresh_quietly(self):
+        try:
+            self._flights.do('refresh', self.refresh)
+        except Exception as e:
+            # Keep serving the stale value; surface the failure to callers
+            self.last_error = str(e)
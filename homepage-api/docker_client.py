@@ -0,0 +1,200 @@
+"""
+Keep-alive client for the Docker Engine API on its Unix socket
+Each worker keeps a few idle HTTP/1.1 connections to the daemon, so widget
+refreshes reuse an open socket instead of connecting for every call.
+No docker CLI or SDK required.
+"""
+
+import http.client
+import json
+import os
+import socket
+import threading
+
+import metrics
+
+DOCKER_SOCKET = os.getenv('DOCKER_SOCKET', '/var/run/docker.sock')
+
+
+class DockerError(Exception):
+    """The Docker daemon answered with an error status"""
+
+    def __init__(self, status, message):
+        super().__init__(f'Docker API error {status}: {message}')
+        self.status = status
+
+
+def _error(status, body):
+    try:
+        message = json.loads(body).get('message', '')
+    except ValueError:
+        message = body.decode(errors='replace')
+    return DockerError(status, message)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class DockerClient:
+    """
+    Pooled Docker Engine API client
+
+    Up to pool_size idle connections are kept per process; busier moments
+    open extra ones that are closed after use. A request that fails on a
+    reused connection (the daemon restarted, or closed it while idle) is
+    retried once on a fresh one.
+
+    version() is fetched once per daemon connection: it is forgotten
+    whenever the daemon drops its connections, which is the only time it
+    can have changed.
+    """
+
+    def __init__(self, socket_path=DOCKER_SOCKET, pool_size=4, timeout=10):
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._version = None
+
+    def _acquire(self):
+        """Take an idle connection, or open a new one; returns (conn, reused)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's sockets aren't ours to use
+                self._idle.clear()
+                self._pid = os.getpid()
+                self._version = None
+            if self._idle:
+                return self._idle.pop(), True
+        return UnixHTTPConnection(self.socket_path, timeout=self.timeout), False
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.pool_size and self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _daemon_lost(self):
+        """Drop every idle connection and anything learned over them"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._version = None
+        for conn in idle:
+            conn.close()
+
+    def _request(self, path):
+        conn, reused = self._acquire()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._daemon_lost()
+            if not reused:
+                raise
+            # The pooled connection had gone stale; one retry on a fresh socket
+            return self._request(path)
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        return response.status, body
+
+    def get(self, path):
+        """
+        GET an Engine API path and decode its JSON body
+
+        Raises:
+            DockerError: If the daemon returns an error status
+            OSError: If the socket can't be reached
+        """
+        with metrics.upstream_call('docker') as call:
+            status, body = self._request(path)
+            call.failed = status >= 400
+        if status >= 400:
+            raise _error(status, body)
+        return json.loads(body)
+
+    def stream(self, path):
+        """
+        Open a streaming GET such as /events on a dedicated connection
+
+        Returns:
+            DockerStream: Iterates over the JSON objects the daemon sends
+
+        Raises:
+            DockerError: If the daemon returns an error status
+            OSError: If the socket can't be reached
+        """
+        # No timeout: an event stream can be quiet for hours
+        conn = UnixHTTPConnection(self.socket_path, timeout=None)
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            if response.status >= 400:
+                raise _error(response.status, response.read())
+        except Exception:
+            conn.close()
+            raise
+        return DockerStream(conn, response)
+
+    def version(self):
+        """Get the daemon's /version, cached until the daemon connection is lost"""
+        version = self._version
+        if version is None:
+            version = self._version = self.get('/version')
+        return version
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class DockerStream:
+    """A streaming Engine API response, read as one JSON object per line"""
+
+    def __init__(self, conn, response):
+        self._conn = conn
+        self._response = response
+
+    def __iter__(self):
+        while True:
+            line = self._response.readline()
+            if not line:
+                return
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+    def close(self):
+        """End the stream; safe to call from another thread while it's being read"""
+        sock = self._conn.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._conn.close()
@@ -0,0 +1,187 @@
+"""
+Live model of Docker containers, kept current from the daemon's /events stream
+After one full listing, every state change arrives as an event, so serving
+container counts and listings needs no further calls to the daemon
+"""
+
+from datetime import datetime
+import json
+import logging
+import threading
+import time
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+# Event actions that move a container to a new state
+ACTION_STATES = {
+    'create': 'created',
+    'start': 'running',
+    'restart': 'running',
+    'unpause': 'running',
+    'pause': 'paused',
+    'die': 'exited',
+    'stop': 'exited',
+}
+
+EVENTS_PATH = '/events?filters=' + quote(json.dumps({'type': ['container']}))
+
+# Longest wait between reconnect attempts while the daemon is unreachable (seconds)
+MAX_RECONNECT_DELAY = 60
+
+
+def parse_docker_time(value):
+    """
+    Parse an RFC 3339 timestamp from the Engine API into epoch seconds
+
+    Docker reports nanoseconds, which fromisoformat() doesn't accept, and
+    uses 0001-01-01T00:00:00Z for "never".
+    """
+    if not value or value.startswith('0001-'):
+        return None
+    main, _, fraction = value.rstrip('Z').partition('.')
+    fraction = fraction[:6].ljust(6, '0')
+    return datetime.fromisoformat(f'{main}.{fraction}+00:00').timestamp()
+
+
+class ContainerModel:
+    """
+    In-memory container state for one worker
+
+    resync() loads every container from a full listing; apply() updates the
+    model from a single /events message. watch() does both against a live
+    daemon: it subscribes to the event stream, resyncs, then applies events
+    until the stream ends, so it can be run in a loop by a PeriodicTask.
+    live is True only while that stream is connected, i.e. while the model
+    can be trusted without asking the daemon.
+    """
+
+    def __init__(self):
+        self._containers = {}
+        self._lock = threading.Lock()
+        self._stream = None
+        self._failures = 0
+        self.live = False
+        self.synced_at = None
+
+    def resync(self, client):
+        """Replace the model with a full listing from the daemon"""
+        containers = {}
+        for summary in client.get('/containers/json?all=1'):
+            container = {
+                'id': summary['Id'],
+                'name': (summary.get('Names') or ['/' + summary['Id'][:12]])[0].lstrip('/'),
+                'image': summary.get('Image'),
+                'state': summary.get('State'),
+                'health': None,
+                'started_at': None,
+            }
+            if container['state'] == 'running':
+                # Start time and health are only in the full inspect
+                state = client.get(f"/containers/{summary['Id']}/json").get('State', {})
+                container['started_at'] = parse_docker_time(state.get('StartedAt'))
+                container['health'] = (state.get('Health') or {}).get('Status')
+            containers[container['id']] = container
+
+        with self._lock:
+            self._containers = containers
+            self.synced_at = time.time()
+
+    def apply(self, event):
+        """Update the model from one container event"""
+        if event.get('Type', 'container') != 'container':
+            return
+        action = event.get('Action') or event.get('status') or ''
+        actor = event.get('Actor') or {}
+        container_id = actor.get('ID') or event.get('id')
+        attributes = actor.get('Attributes') or {}
+        when = event.get('timeNano', 0) / 1e9 or event.get('time') or time.time()
+        if not container_id:
+            return
+        if action not in ACTION_STATES and action not in ('destroy', 'rename') \
+                and not action.startswith('health_status'):
+            return  # exec, attach, kill, oom, ... don't change what we report
+
+        with self._lock:
+            if action == 'destroy':
+                self._containers.pop(container_id, None)
+                return
+
+            container = self._containers.setdefault(container_id, {
+                'id': container_id,
+                'name': attributes.get('name', container_id[:12]),
+                'image': attributes.get('image'),
+                'state': 'created',
+                'health': None,
+                'started_at': None,
+            })
+
+            if action.startswith('health_status'):
+                container['health'] = action.partition(':')[2].strip() or attributes.get('health_status')
+            elif action == 'rename':
+                container['name'] = attributes.get('name', container['name'])
+            elif action in ACTION_STATES:
+                state = ACTION_STATES[action]
+                if state == 'running' and container['state'] != 'running' and action != 'unpause':
+                    container['started_at'] = when
+                    # Health checks restart from "starting" on every start
+                    container['health'] = 'starting' if container['health'] else None
+                elif state in ('exited', 'created'):
+                    container['started_at'] = None
+                    container['health'] = None
+                container['state'] = state
+
+    def counts(self):
+        """Return (running, total) container counts"""
+        with self._lock:
+            running = sum(1 for c in self._containers.values() if c['state'] == 'running')
+            return running, len(self._containers)
+
+    def containers(self):
+        """Return a copy of every container, sorted by name"""
+        with self._lock:
+            return sorted((dict(c) for c in self._containers.values()), key=lambda c: c['name'])
+
+    def watch(self, client):
+        """
+        Follow the daemon's event stream until it ends
+
+        The subscription is opened before the resync listing, so nothing that
+        changes in between is missed; events replayed over the fresh listing
+        only move containers to the state they're already in.
+
+        Returns:
+            float: Seconds to wait before reconnecting - quickly after a clean
+            disconnect, backing off while the daemon stays unreachable
+        """
+        try:
+            stream = client.stream(EVENTS_PATH)
+        except Exception as e:
+            self._failures += 1
+            logger.warning('Docker event stream unavailable: %s', e)
+            return min(2 ** self._failures, MAX_RECONNECT_DELAY)
+
+        with self._lock:
+            self._stream = stream
+        try:
+            self.resync(client)
+            self.live = True
+            self._failures = 0
+            for event in stream:
+                self.apply(event)
+        except Exception as e:
+            self._failures += 1
+            logger.warning('Docker event stream lost: %s', e)
+        finally:
+            self.live = False
+            with self._lock:
+                self._stream = None
+            stream.close()
+        return min(2 ** self._failures, MAX_RECONNECT_DELAY)
+
+    def close(self):
+        """End the current watch(), if any"""
+        with self._lock:
+            stream = self._stream
+        if stream is not None:
+            stream.close()
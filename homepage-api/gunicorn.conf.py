@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration for the Homepage API
+Settings can be overridden with the GUNICORN_* environment variables
+"""
+
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+# Threaded workers: each request gets one of `threads` threads, so requests
+# waiting on a slow upstream hold a thread rather than the whole worker and
+# /api/health keeps answering. GUNICORN_WORKER_CLASS=sync serves one request
+# per worker at a time.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+# (gunicorn quietly turns sync workers with more than one thread into gthread)
+threads = int(os.getenv('GUNICORN_THREADS', '8' if worker_class == 'gthread' else '1'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+accesslog = '-'
+
+# Workers share Prometheus metrics through files here; must be set before
+# the app (and prometheus_client) is imported in a worker
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/homepage-api-metrics')
+
+
+def on_starting(server):
+    """Start with no metrics left over from a previous run"""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def post_worker_init(worker):
+    """Restore the cache snapshot and start background tasks in each worker"""
+    from app import start_background
+    start_background()
+
+
+def worker_exit(server, worker):
+    """Save a final cache snapshot when a worker shuts down"""
+    from app import stop_background
+    stop_background()
+
+
+def child_exit(server, worker):
+    """Stop counting a dead worker's in-flight requests and cache gauges"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,178 @@
+"""
+Prometheus metrics for the Homepage API
+Request latency per route, upstream latency and errors, in-flight requests
+and cache effectiveness, served in the Prometheus text format on /metrics.
+
+Under gunicorn every worker writes its samples to memory-mapped files in
+PROMETHEUS_MULTIPROC_DIR (set up in gunicorn.conf.py), and /metrics merges
+them, so a scrape sees totals for the whole server whichever worker answers.
+Without that variable metrics are kept in-process, as in tests or app.run().
+"""
+
+from contextlib import contextmanager
+import os
+import time
+
+from flask import g, request
+import requests
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+
+from cache import registered_caches
+import server_timing
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Widget calls are mostly cache hits (milliseconds), upstream misses take seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    'homepage_api_request_duration_seconds', 'Time spent handling a request',
+    ['route', 'method'], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter(
+    'homepage_api_requests_total', 'Requests handled, by response status',
+    ['route', 'method', 'status']
+)
+IN_PROGRESS = Gauge(
+    'homepage_api_requests_in_progress', 'Requests currently being handled',
+    ['route'], multiprocess_mode='livesum'
+)
+
+UPSTREAM_LATENCY = Histogram(
+    'homepage_api_upstream_request_duration_seconds', 'Time spent on calls to an upstream API',
+    ['upstream'], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_ERRORS = Counter(
+    'homepage_api_upstream_errors_total', 'Failed upstream calls, by kind of failure',
+    ['upstream', 'kind']
+)
+
+# Set from each worker's caches by update_cache_gauges(); summed over live workers
+CACHE_HITS = Gauge(
+    'homepage_api_cache_hits', 'Cache lookups answered from the cache since the worker started',
+    ['cache'], multiprocess_mode='livesum'
+)
+CACHE_MISSES = Gauge(
+    'homepage_api_cache_misses', 'Cache lookups that had to compute a value since the worker started',
+    ['cache'], multiprocess_mode='livesum'
+)
+CACHE_ENTRIES = Gauge(
+    'homepage_api_cache_entries', 'Entries currently held',
+    ['cache'], multiprocess_mode='livesum'
+)
+CACHE_AGE = Gauge(
+    'homepage_api_cache_age_seconds', 'Age of the value a stale-while-revalidate cache is serving',
+    ['cache'], multiprocess_mode='livemax'
+)
+CACHE_REFRESH_FAILING = Gauge(
+    'homepage_api_cache_refresh_failing', '1 while the last background refresh of a cache failed',
+    ['cache'], multiprocess_mode='livemax'
+)
+
+
+def _route():
+    # The URL rule rather than the path, so /departures/<stop_id> is one series
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_route = _route()
+    IN_PROGRESS.labels(g.metrics_route).inc()
+
+
+def _after_request(response):
+    started = g.get('metrics_started')
+    if started is not None:
+        route = g.metrics_route
+        REQUEST_LATENCY.labels(route, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+    return response
+
+
+def _teardown_request(exc):
+    # Runs even when a view raised, so the in-flight count can't drift
+    route = g.pop('metrics_route', None)
+    if route is not None:
+        IN_PROGRESS.labels(route).dec()
+
+
+def init_app(app):
+    """Time and count every request handled by a Flask app"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+
+def _error_kind(exc):
+    if isinstance(exc, (TimeoutError, requests.Timeout)):
+        return 'timeout'
+    if isinstance(exc, (ConnectionError, requests.ConnectionError)):
+        return 'connection'
+    return 'error'
+
+
+class UpstreamCall:
+    """Handle yielded by upstream_call(); set failed for an error response"""
+
+    __slots__ = ('failed',)
+
+    def __init__(self):
+        self.failed = False
+
+
+@contextmanager
+def upstream_call(name):
+    """
+    Time one call to an upstream and count it if it fails
+
+    The time is also added to the current request's Server-Timing spans
+    under the upstream's name.
+
+    An exception is counted by kind (timeout, connection or error) and
+    re-raised. A call that returns an error status instead sets failed on
+    the yielded handle, and is counted as kind "status".
+    """
+    call = UpstreamCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(name, _error_kind(e)).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_LATENCY.labels(name).observe(elapsed)
+        server_timing.record(name, elapsed)
+    if call.failed:
+        UPSTREAM_ERRORS.labels(name, 'status').inc()
+
+
+def update_cache_gauges():
+    """Copy this worker's cache counters into the cache gauges"""
+    for cache in registered_caches():
+        stats = getattr(cache, 'stats', None)
+        if stats is not None:
+            info = stats()
+            CACHE_HITS.labels(cache.name).set(info['hits'])
+            CACHE_MISSES.labels(cache.name).set(info['misses'])
+            CACHE_ENTRIES.labels(cache.name).set(info['size'])
+        else:
+            age = cache.age
+            CACHE_ENTRIES.labels(cache.name).set(0 if age is None else 1)
+            if age is not None:
+                CACHE_AGE.labels(cache.name).set(age)
+            CACHE_REFRESH_FAILING.labels(cache.name).set(1 if cache.last_error else 0)
+
+
+def render():
+    """Return the current metrics in the Prometheus text format"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,121 @@
+"""
+Network interface throughput from sysfs statistics counters
+Counters are read with pread() on file descriptors opened once, so a
+sample is a handful of syscalls and can run every second
+"""
+
+from collections import deque
+import os
+import threading
+import time
+
+COUNTERS = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets', 'rx_errors', 'tx_errors')
+
+# Windows for average rates (label, seconds)
+AVERAGE_WINDOWS = (('1m', 60), ('5m', 300), ('15m', 900))
+
+
+class InterfaceSampler:
+    """
+    Keep recent statistics samples for one interface in a ring buffer
+
+    sample() appends (time, counters) and is meant to be called at a fixed
+    interval; the buffer holds enough samples to cover the longest average
+    window. The counter files stay open between samples. If the interface
+    disappears they are closed and the buffer emptied, and the next sample
+    reopens them, so an interface that is re-created (resetting its
+    counters) starts a fresh history.
+    """
+
+    def __init__(self, interface, interval, sysfs='/sys/class/net'):
+        self.interface = interface
+        self.interval = interval
+        self.directory = os.path.join(sysfs, interface, 'statistics')
+        longest = max(seconds for _, seconds in AVERAGE_WINDOWS)
+        self._samples = deque(maxlen=int(longest / interval) + 2)
+        self._fds = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        fds = []
+        try:
+            for counter in COUNTERS:
+                fds.append(os.open(os.path.join(self.directory, counter), os.O_RDONLY))
+        except OSError:
+            for fd in fds:
+                os.close(fd)
+            return None
+        return fds
+
+    def _close(self):
+        if self._fds is not None:
+            for fd in self._fds:
+                os.close(fd)
+            self._fds = None
+        self._samples.clear()
+
+    def sample(self):
+        """Read every counter once and append the sample (no-op while the interface doesn't exist)"""
+        with self._lock:
+            if self._fds is None:
+                self._fds = self._open()
+                if self._fds is None:
+                    self._samples.clear()
+                    return
+            try:
+                # sysfs regenerates an attribute on every read from offset 0
+                values = tuple(int(os.pread(fd, 32, 0)) for fd in self._fds)
+            except (OSError, ValueError):
+                self._close()
+                return
+
+            if self._samples and values[0] < self._samples[-1][1][0]:
+                self._samples.clear()  # Counters went backwards: interface re-created
+            self._samples.append((time.monotonic(), values))
+
+    def stats(self):
+        """
+        Throughput figures from the samples so far
+
+        Returns:
+            dict: Latest counter totals, current and peak rx/tx rates and
+            average rates over each AVERAGE_WINDOWS window (bytes per second),
+            or None before the first sample. Rates are None until two
+            samples exist; averages cover as much of their window as the
+            buffer holds.
+        """
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return None
+
+        now, latest = samples[-1]
+        rates = [
+            ((b[1][0] - a[1][0]) / (b[0] - a[0]), (b[1][1] - a[1][1]) / (b[0] - a[0]))
+            for a, b in zip(samples, samples[1:]) if b[0] > a[0]
+        ]
+
+        averages = {}
+        for label, seconds in AVERAGE_WINDOWS:
+            # Oldest sample still inside the window
+            start = next((s for s in samples if now - s[0] <= seconds + self.interval / 2), samples[-1])
+            elapsed = now - start[0]
+            averages[label] = {
+                'rx': (latest[0] - start[1][0]) / elapsed if elapsed else None,
+                'tx': (latest[1] - start[1][1]) / elapsed if elapsed else None,
+            }
+
+        return {
+            **dict(zip(COUNTERS, latest)),
+            'rx_rate': rates[-1][0] if rates else None,
+            'tx_rate': rates[-1][1] if rates else None,
+            'rx_peak': max(r[0] for r in rates) if rates else None,
+            'tx_peak': max(r[1] for r in rates) if rates else None,
+            'averages': averages,
+            'samples': len(samples)
+        }
+
+    def close(self):
+        """Close the counter files"""
+        with self._lock:
+            self._close()
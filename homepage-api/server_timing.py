@@ -0,0 +1,157 @@
+"""
+Per-request timing spans, reported in the Server-Timing response header
+Each request collects how long it spent in named phases (upstream calls,
+parse, transform, serialize) so a slow widget call shows where the time
+went in the browser's network panel. Recording a span is a context variable
+lookup and two perf_counter() calls; outside a request it does nothing.
+
+Set SERVER_TIMING_LOG=1 to also log every request's spans as one JSON line.
+"""
+
+from contextlib import contextmanager
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+LOG_SPANS = os.getenv('SERVER_TIMING_LOG', '').lower() in ('1', 'true', 'yes')
+
+_current = contextvars.ContextVar('server_timing', default=None)
+
+
+class Timings:
+    """Span totals for one request: name -> [seconds, count], in first-seen order"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self._lock = threading.Lock()  # Spans can be recorded from pool threads
+
+    def add(self, name, seconds):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                self.spans[name] = [seconds, 1]
+            else:
+                span[0] += seconds
+                span[1] += 1
+
+    def snapshot(self):
+        """Copy of the spans as (name, [seconds, count]) pairs, safe while threads still record"""
+        with self._lock:
+            return [(name, list(span)) for name, span in self.spans.items()]
+
+    def header(self, total):
+        """Format the spans and total (seconds) as a Server-Timing header value"""
+        parts = []
+        for name, (seconds, count) in self.snapshot():
+            part = f'{name};dur={seconds * 1000:.2f}'
+            if count > 1:
+                part += f';desc="{count} calls"'
+            parts.append(part)
+        parts.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def record(name, seconds):
+    """Add a measured duration to the current request's spans, if any"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name):
+    """
+    Time a block as a named span of the current request
+
+    Repeated spans with the same name are summed. Spans in concurrent
+    threads each add their own duration, so a span can exceed the total.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def propagate(func):
+    """
+    Wrap func to record its spans in the current request, for thread pools
+
+    Pool threads don't inherit context variables, so without this spans
+    recorded by work submitted during a request would be lost. The wrapper
+    can run in several threads at once (e.g. with Executor.map).
+    """
+    timings = _current.get()
+    if timings is None:
+        return func
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        token = _current.set(timings)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that times response serialization as the "serialize" span"""
+
+    def response(self, *args, **kwargs):
+        with span('serialize'):
+            return super().response(*args, **kwargs)
+
+
+def _before_request():
+    _current.set(Timings())
+
+
+def _after_request(response):
+    timings = _current.get()
+    if timings is not None:
+        total = time.perf_counter() - timings.started
+        response.headers['Server-Timing'] = timings.header(total)
+        if LOG_SPANS:
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 2),
+                'spans': {name: round(seconds * 1000, 2) for name, (seconds, _) in timings.snapshot()}
+            }))
+    return response
+
+
+def _teardown_request(exc):
+    _current.set(None)
+
+
+def init_app(app):
+    """Collect spans for every request and add the Server-Timing header"""
+    if LOG_SPANS and not logger.handlers:
+        # gunicorn only sets up its own loggers; give the span lines a plain handler
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    app.json_provider_class = TimedJSONProvider
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
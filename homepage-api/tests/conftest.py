@@ -4,6 +4,14 @@ Pytest configuration and fixtures for Homepage API tests
 import pytest
 import sys
 import os
+import json
+import queue
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler
 
 # Add parent directory to path so we can import app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -13,7 +21,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 os.environ['BOM_LOCATION'] = 'parramatta'
 os.environ['TRANSPORT_NSW_API_KEY'] = 'test-api-key'
 os.environ['TOMTOM_API_KEY'] = 'test-tomtom-key'
+# Keep tests off the persistent /data volume
+os.environ['DATA_DIR'] = ''
 
+import cache
+import traffic_scheduler
 from app import app as flask_app
 
 
@@ -30,3 +42,101 @@ def app():
 def client(app):
     """Create test client"""
     return app.test_client()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test with cold caches so upstream data can't leak between tests"""
+    cache.clear_all()
+    traffic_scheduler.load_route_table.cache_clear()
+    yield
+    cache.clear_all()
+    traffic_scheduler.load_route_table.cache_clear()
+
+
+class _DockerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        daemon = self.server
+        daemon.requests.append(self.path)
+        if self.path.startswith('/events'):
+            return self._stream_events(daemon.events)
+        route = daemon.routes.get(self.path.split('?')[0], (404, {'message': 'page not found'}))
+        status, body = route(self.path) if callable(route) else route
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_events(self, events):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.flush()
+        while True:
+            event = events.get()
+            if event is None:
+                self.wfile.write(b'0\r\n\r\n')
+                return
+            data = json.dumps(event).encode() + b'\n'
+            self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDockerDaemon(socketserver.ThreadingUnixStreamServer):
+    """
+    Minimal Docker Engine API on a Unix socket
+
+    routes maps a path to (status, body), or to a function of the full
+    request path returning one. /events streams whatever is put on the
+    events queue until it gets None. Every request path is kept in requests
+    and every accepted connection counted in connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        super().__init__(socket_path, _DockerHandler)
+        self.socket_path = socket_path
+        self.routes = {}
+        self.requests = []
+        self.connections = 0
+        self.events = queue.Queue()
+        self._sockets = []
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.01,), daemon=True)
+        self._thread.start()
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        self._sockets.append(request)
+        super().process_request(request, client_address)
+
+    def stop(self):
+        """Stop like a daemon restart would, dropping every open connection"""
+        self.shutdown()
+        self.server_close()
+        for sock in self._sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        os.unlink(self.socket_path)
+
+
+@pytest.fixture
+def docker_daemon():
+    """A fake Docker daemon listening on a temporary socket"""
+    # Short directory: Unix socket paths are limited to about 100 bytes
+    directory = tempfile.mkdtemp(prefix='docker')
+    daemon = FakeDockerDaemon(os.path.join(directory, 'docker.sock'))
+    yield daemon
+    if os.path.exists(daemon.socket_path):
+        daemon.stop()
+    shutil.rmtree(directory, ignore_errors=True)
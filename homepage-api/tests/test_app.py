@@ -1,10 +1,22 @@
 """
 Unit tests for Homepage API endpoints
 """
+import errno
 import pytest
+import requests
 from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import os
+import threading
+import time
+
+import app as app_module
+import cache
+from traffic_history import TrafficHistory
+from docker_client import DockerClient
+from docker_state import ContainerModel
+from netstats import InterfaceSampler
 
 
 class TestHealthEndpoint:
@@ -20,6 +32,48 @@ class TestHealthEndpoint:
         assert 'timestamp' in data
 
 
+class TestMetricsEndpoint:
+    """Tests for /metrics"""
+
+    def test_prometheus_format(self, client):
+        """Test metrics are served in the Prometheus text format"""
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        assert b'# TYPE homepage_api_request_duration_seconds histogram' in response.data
+
+    def test_requests_labelled_by_route(self, client):
+        """Test requests are counted per URL rule, not per path"""
+        client.get('/api/health')
+
+        data = client.get('/metrics').get_data(as_text=True)
+
+        assert 'homepage_api_requests_total{method="GET",route="/api/health",status="200"}' in data
+        assert 'homepage_api_request_duration_seconds_bucket{le="0.005",method="GET",route="/api/health"}' in data
+
+    def test_in_progress_returns_to_zero(self, client):
+        """Test the in-flight gauge is decremented after each request"""
+        client.get('/api/health')
+
+        data = client.get('/metrics').get_data(as_text=True)
+
+        assert 'homepage_api_requests_in_progress{route="/api/health"} 0.0' in data
+        # The scrape itself is still in flight while it renders
+        assert 'homepage_api_requests_in_progress{route="/metrics"} 1.0' in data
+
+    @patch('app.upstream.session')
+    def test_upstream_errors(self, mock_session, client):
+        """Test failed upstream calls are counted per upstream"""
+        mock_session.return_value.get.side_effect = requests.exceptions.Timeout('slow')
+
+        with pytest.raises(requests.exceptions.Timeout):
+            app_module.upstream.get('tfnsw', 'https://example.com/')
+
+        data = client.get('/metrics').get_data(as_text=True)
+        assert 'homepage_api_upstream_errors_total{kind="timeout",upstream="tfnsw"}' in data
+
+
 class TestBOMWeatherEndpoint:
     """Tests for /api/bom/weather endpoint"""
 
@@ -110,10 +164,6 @@ class TestBOMWeatherEndpoint:
         assert 'error' in data
         assert 'API connection failed' in data['error']
 
-    @pytest.mark.skip(reason="Caching behavior cannot be tested when mocking the cached function itself. "
-                             "The @cached decorator is bypassed when we mock get_weather_api. "
-                             "To properly test caching, we would need to mock the underlying weather_au library "
-                             "instead of the cached wrapper function.")
     @patch('app.get_weather_api')
     def test_bom_weather_caching(self, mock_get_weather_api, client):
         """Test BOM weather endpoint uses caching"""
@@ -139,11 +189,246 @@ class TestBOMWeatherEndpoint:
         # Weather API should only be called once due to caching
         assert mock_get_weather_api.call_count == 1
 
+    @patch('app.get_weather_api')
+    def test_bom_weather_reports_age(self, mock_get_weather_api, client):
+        """Test BOM weather response carries the snapshot age"""
+        mock_weather_api = Mock()
+        mock_weather_api.location.return_value = {'name': 'Parramatta', 'state': 'NSW'}
+        mock_weather_api.observations.return_value = None
+        mock_weather_api.forecasts_daily.return_value = None
+        mock_weather_api.forecasts_hourly.return_value = None
+        mock_weather_api.forecast_rain.return_value = None
+        mock_get_weather_api.return_value = mock_weather_api
+
+        data = client.get('/api/bom/weather').get_json()
+        assert data['age_seconds'] == 0
+        assert data['stale'] is False
+
+    @patch('app.get_weather_api')
+    def test_bom_weather_serves_stale_on_refresh_error(self, mock_get_weather_api, client, monkeypatch):
+        """Test an upstream failure after the first fetch serves the last good snapshot"""
+        mock_weather_api = Mock()
+        mock_weather_api.location.return_value = {'name': 'Parramatta', 'state': 'NSW'}
+        mock_weather_api.observations.return_value = {'temp': 22.5}
+        mock_weather_api.forecasts_daily.return_value = None
+        mock_weather_api.forecasts_hourly.return_value = None
+        mock_weather_api.forecast_rain.return_value = None
+        mock_get_weather_api.return_value = mock_weather_api
+
+        response1 = client.get('/api/bom/weather')
+        assert response1.status_code == 200
+
+        # Expire the snapshot and break the upstream
+        monkeypatch.setattr(app_module.bom_weather_cache, 'ttl', 0)
+        mock_get_weather_api.side_effect = Exception('BOM timed out')
+
+        response2 = client.get('/api/bom/weather')
+        app_module.bom_weather_cache.join(timeout=5)
+        assert response2.status_code == 200
+
+        data = response2.get_json()
+        assert data['stale'] is True
+        assert data['observations']['temp'] == 22.5
+        assert 'BOM timed out' in app_module.bom_weather_cache.last_error
+
+    @patch('app.get_weather_api')
+    def test_bom_weather_sections_fetched_concurrently(self, mock_get_weather_api, client):
+        """Test the BOM sections are in flight at the same time"""
+        # Each section waits for all the others; sequential calls would break the barrier
+        barrier = threading.Barrier(len(app_module.BOM_SECTIONS), timeout=5)
+
+        def section(value):
+            def call():
+                barrier.wait()
+                return value
+            return call
+
+        mock_weather_api = Mock()
+        mock_weather_api.location.return_value = {'name': 'Parramatta', 'state': 'NSW'}
+        mock_weather_api.observations.side_effect = section({'temp': 22.5})
+        mock_weather_api.forecasts_daily.side_effect = section([{'temp_max': 28}])
+        mock_weather_api.forecasts_hourly.side_effect = section([{'temp': 24}])
+        mock_weather_api.forecast_rain.side_effect = section({'chance': '20%'})
+        mock_get_weather_api.return_value = mock_weather_api
+
+        data = client.get('/api/bom/weather').get_json()
+        assert data['missing'] == []
+        assert data['observations']['temp'] == 22.5
+        assert data['forecast_daily'][0]['temp_max'] == 28
+        assert data['forecast_hourly'][0]['temp'] == 24
+        assert data['forecast_rain']['chance'] == '20%'
+
+    @patch('app.get_weather_api')
+    def test_bom_weather_slow_section_marked_missing(self, mock_get_weather_api, client, monkeypatch):
+        """Test a section that misses the deadline doesn't hold up the others"""
+        release = threading.Event()
+
+        def slow_hourly():
+            release.wait(5)
+            return [{'temp': 24}]
+
+        mock_weather_api = Mock()
+        mock_weather_api.location.return_value = {'name': 'Parramatta', 'state': 'NSW'}
+        mock_weather_api.observations.return_value = {'temp': 22.5}
+        mock_weather_api.forecasts_daily.return_value = None
+        mock_weather_api.forecasts_hourly.side_effect = slow_hourly
+        mock_weather_api.forecast_rain.return_value = None
+        mock_get_weather_api.return_value = mock_weather_api
+        monkeypatch.setattr(app_module, 'BOM_FETCH_DEADLINE', 0.2)
+
+        try:
+            response = client.get('/api/bom/weather')
+        finally:
+            release.set()
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['missing'] == ['forecasts_hourly']
+        assert data['forecast_hourly'] is None
+        assert data['observations']['temp'] == 22.5
+
+    @patch('app.get_weather_api')
+    def test_bom_weather_recovers_after_hung_calls(self, mock_get_weather_api, client, monkeypatch):
+        """Test calls still stuck on BOM from a timed out refresh don't block the next one"""
+        release = threading.Event()
+        hung = {'value': True}
+
+        def call(value):
+            def fetch():
+                if hung['value']:
+                    release.wait(5)
+                return value
+            return fetch
+
+        mock_weather_api = Mock()
+        mock_weather_api.location.side_effect = call({'name': 'Parramatta', 'state': 'NSW'})
+        mock_weather_api.observations.side_effect = call({'temp': 22.5})
+        mock_weather_api.forecasts_daily.side_effect = call(None)
+        mock_weather_api.forecasts_hourly.side_effect = call(None)
+        mock_weather_api.forecast_rain.side_effect = call(None)
+        mock_get_weather_api.return_value = mock_weather_api
+        monkeypatch.setattr(app_module, 'BOM_FETCH_DEADLINE', 0.2)
+
+        try:
+            assert client.get('/api/bom/weather').status_code == 500
+
+            hung['value'] = False
+            response = client.get('/api/bom/weather')
+        finally:
+            release.set()
+
+        assert response.status_code == 200
+        assert response.get_json()['observations']['temp'] == 22.5
+
+    @patch('app.get_weather_api')
+    def test_bom_weather_failed_section_keeps_previous(self, mock_get_weather_api, client):
+        """Test a section that fails on refresh keeps the last snapshot's value and is marked stale"""
+        mock_weather_api = Mock()
+        mock_weather_api.location.return_value = {'name': 'Parramatta', 'state': 'NSW'}
+        mock_weather_api.observations.return_value = {'temp': 22.5}
+        mock_weather_api.forecasts_daily.return_value = None
+        mock_weather_api.forecasts_hourly.return_value = None
+        mock_weather_api.forecast_rain.return_value = None
+        mock_get_weather_api.return_value = mock_weather_api
+        assert client.get('/api/bom/weather').get_json()['stale_sections'] == []
+
+        mock_weather_api.observations.side_effect = Exception('BOM returned 500')
+        app_module.bom_weather_cache.refresh()
+
+        data = client.get('/api/bom/weather').get_json()
+        assert data['observations']['temp'] == 22.5
+        assert data['stale_sections'] == ['observations']
+        assert data['missing'] == ['observations']
+        assert data['stale'] is True
+        assert data['section_age_seconds']['observations'] >= 0
+
+    @patch('app.get_weather_api')
+    def test_bom_weather_failed_section_expires(self, mock_get_weather_api, client, monkeypatch):
+        """Test a section isn't carried forward once it is older than BOM_SECTION_MAX_AGE"""
+        mock_weather_api = Mock()
+        mock_weather_api.location.return_value = {'name': 'Parramatta', 'state': 'NSW'}
+        mock_weather_api.observations.return_value = {'temp': 22.5}
+        mock_weather_api.forecasts_daily.return_value = None
+        mock_weather_api.forecasts_hourly.return_value = None
+        mock_weather_api.forecast_rain.return_value = None
+        mock_get_weather_api.return_value = mock_weather_api
+        client.get('/api/bom/weather')
+
+        mock_weather_api.observations.side_effect = Exception('BOM returned 500')
+        monkeypatch.setattr(app_module, 'BOM_SECTION_MAX_AGE', 3600)
+        with patch('app.time.time', return_value=time.time() + 1800):
+            app_module.bom_weather_cache.refresh()
+        with patch('app.time.time', return_value=time.time() + 4000):
+            app_module.bom_weather_cache.refresh()
+            data = client.get('/api/bom/weather').get_json()
+
+        assert data['observations'] is None
+        assert data['stale_sections'] == []
+        assert data['missing'] == ['observations']
+        assert data['section_age_seconds']['observations'] is None
+
+    def test_bom_requests_have_timeout(self, monkeypatch):
+        """Test weather-au requests go through the pooled BOM session with a socket timeout"""
+        session = Mock()
+        session.get.return_value.json.return_value = {'metadata': {'response_timestamp': 'now'}, 'data': []}
+        monkeypatch.setattr(app_module, 'BOM_FETCH_DEADLINE', 3)
+
+        with patch('app.upstream.session', return_value=session) as get_session:
+            app_module.BomWeatherApi(search='parramatta')
+
+        get_session.assert_called_with('bom')
+        assert session.get.call_args.kwargs['timeout'] == 3
+
+    @patch('app.get_weather_api')
+    def test_bom_weather_location_not_found(self, mock_get_weather_api, client):
+        """Test BOM weather returns 404 for an unknown location"""
+        mock_weather_api = Mock()
+        mock_weather_api.location.return_value = None
+        mock_get_weather_api.return_value = mock_weather_api
+
+        response = client.get('/api/bom/weather')
+        assert response.status_code == 404
+        assert 'not found' in response.get_json()['error']
+
+
+class TestCacheSnapshot:
+    """Tests for warm restarts from the cache snapshot"""
+
+    @patch('app.get_weather_api')
+    def test_weather_served_from_snapshot_after_restart(self, mock_get_weather_api, client, tmp_path, monkeypatch):
+        """Test the first weather request after a restart is answered from the snapshot"""
+        monkeypatch.setattr(app_module, 'DATA_DIR', str(tmp_path))
+        monkeypatch.setattr(app_module, 'SNAPSHOT_PATH', str(tmp_path / 'cache-snapshot.json'))
+
+        mock_weather_api = Mock()
+        mock_weather_api.location.return_value = {'name': 'Parramatta', 'state': 'NSW'}
+        mock_weather_api.observations.return_value = {'temp': 22.5}
+        mock_weather_api.forecasts_daily.return_value = None
+        mock_weather_api.forecasts_hourly.return_value = None
+        mock_weather_api.forecast_rain.return_value = None
+        mock_get_weather_api.return_value = mock_weather_api
+
+        client.get('/api/bom/weather')
+        app_module.stop_background()
+
+        # Simulate a restart: cold caches, then boot from the snapshot
+        cache.clear_all()
+        mock_get_weather_api.reset_mock()
+        app_module.start_background()
+        try:
+            response = client.get('/api/bom/weather')
+        finally:
+            app_module.stop_background()
+
+        assert response.status_code == 200
+        assert response.get_json()['observations']['temp'] == 22.5
+        mock_get_weather_api.assert_not_called()
+
 
 class TestTransportNSWEndpoint:
     """Tests for /api/transport/departures endpoint"""
 
-    @patch('app.requests.get')
+    @patch('app.upstream.get')
     def test_transport_departures_success(self, mock_get, client):
         """Test successful transport departures retrieval"""
         # Mock Transport NSW API response
@@ -187,7 +472,7 @@ class TestTransportNSWEndpoint:
         assert departure['realtime'] is True
         assert departure['delay_minutes'] == 0
 
-    @patch('app.requests.get')
+    @patch('app.upstream.get')
     def test_transport_departures_with_delay(self, mock_get, client):
         """Test transport departures correctly calculates delays"""
         mock_response = Mock()
@@ -219,13 +504,13 @@ class TestTransportNSWEndpoint:
         departure = data['departures'][0]
         assert departure['delay_minutes'] == 5  # 5 minutes late
 
-    @patch('app.requests.get')
+    @patch('app.upstream.get')
     def test_transport_departures_missing_stop_id(self, mock_get, client):
         """Test transport departures requires stopId parameter"""
         response = client.get('/api/transport/departures')
         assert response.status_code == 404  # Route not found without stop_id path parameter
 
-    @patch('app.requests.get')
+    @patch('app.upstream.get')
     def test_transport_departures_api_error(self, mock_get, client):
         """Test transport departures handles API errors"""
         mock_get.side_effect = Exception('Network error')
@@ -236,7 +521,7 @@ class TestTransportNSWEndpoint:
         data = response.get_json()
         assert 'error' in data
 
-    @patch('app.requests.get')
+    @patch('app.upstream.get')
     def test_transport_departures_platform_parsing(self, mock_get, client):
         """Test platform is correctly extracted from location.properties.platformName"""
         mock_response = Mock()
@@ -267,7 +552,7 @@ class TestTransportNSWEndpoint:
         # Should use platformName, not the internal platform code
         assert data['departures'][0]['platform'] == 'Platform 3'
 
-    @patch('app.requests.get')
+    @patch('app.upstream.get')
     def test_transport_departures_no_platform(self, mock_get, client):
         """Test transport departures handles missing platform gracefully"""
         mock_response = Mock()
@@ -295,7 +580,7 @@ class TestTransportNSWEndpoint:
         data = response.get_json()
         assert data['departures'][0]['platform'] is None
 
-    @patch('app.requests.get')
+    @patch('app.upstream.get')
     def test_transport_departures_invalid_timestamp(self, mock_get, client):
         """Test transport departures handles invalid timestamps gracefully"""
         mock_response = Mock()
@@ -326,6 +611,247 @@ class TestTransportNSWEndpoint:
         assert data['departures'][0]['delay_minutes'] == 0
 
 
+class TestServerTimingHeader:
+    """Tests for the Server-Timing breakdown on API responses"""
+
+    @patch('app.upstream.session')
+    def test_departures_breakdown(self, mock_session, client):
+        """Test a cold departures request reports upstream, parse, transform and serialize"""
+        mock_session.return_value.get.return_value = Mock(ok=True, json=Mock(return_value={'stopEvents': []}))
+
+        response = client.get('/api/transport/departures/10101229')
+
+        names = [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+        assert names == ['tfnsw', 'parse', 'transform', 'serialize', 'total']
+
+    def test_every_response(self, client):
+        """Test responses without spans still carry the total"""
+        response = client.get('/api/health')
+
+        assert response.headers['Server-Timing'].startswith('serialize;dur=')
+        assert ', total;dur=' in response.headers['Server-Timing']
+
+
+class TestTransportDepartureCache:
+    """Tests for the per-stop departure cache and server-side filtering"""
+
+    STOP_EVENTS = {
+        'stopEvents': [
+            {
+                'departureTimePlanned': '2025-10-27T05:17:00Z',
+                'location': {'properties': {'platformName': 'Platform 1'}},
+                'transportation': {'number': '600', 'destination': {'name': 'Parramatta'}}
+            },
+            {
+                'isCancelled': True,
+                'departureTimePlanned': '2025-10-27T05:19:00Z',
+                'transportation': {'number': '601', 'destination': {'name': 'Parramatta'}}
+            },
+            {
+                'departureTimePlanned': '2025-10-27T05:20:00Z',
+                'transportation': {'number': '601', 'destination': {'name': 'City'}}
+            },
+            {
+                'departureTimePlanned': '2025-10-27T05:25:00Z',
+                'transportation': {'number': '602', 'destination': {'name': 'Parramatta'}}
+            }
+        ]
+    }
+
+    @pytest.fixture
+    def mock_get(self):
+        with patch('app.upstream.get') as mock_get:
+            mock_response = Mock()
+            mock_response.json.return_value = self.STOP_EVENTS
+            mock_get.return_value = mock_response
+            yield mock_get
+
+    def test_filter_variants_share_one_upstream_call(self, client, mock_get):
+        """Test different filters for the same stop reuse one upstream response"""
+        all_deps = client.get('/api/transport/departures/200060').get_json()['departures']
+        to_city = client.get('/api/transport/departures/200060?destination=city').get_json()['departures']
+        route_602 = client.get('/api/transport/departures/200060?routes=602').get_json()['departures']
+
+        assert mock_get.call_count == 1
+        assert [d['line'] for d in all_deps] == ['600', '601', '602']
+        assert [d['destination'] for d in to_city] == ['City']
+        assert [d['line'] for d in route_602] == ['602']
+
+    def test_concurrent_cold_requests_coalesced(self, app, mock_get):
+        """Test simultaneous requests for an uncached stop wait on one upstream call"""
+        release = threading.Event()
+        response = mock_get.return_value
+
+        def slow_get(*args, **kwargs):
+            release.wait(5)
+            return response
+        mock_get.side_effect = slow_get
+
+        results = []
+
+        def request(query):
+            data = app.test_client().get(f'/api/transport/departures/200060{query}').get_json()
+            results.append(len(data['departures']))
+
+        threads = [threading.Thread(target=request, args=(q,)) for q in ('', '?routes=602', '?limit=1', '')]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        assert mock_get.call_count == 1
+        assert sorted(results) == [1, 1, 3, 3]
+
+    def test_stops_cached_separately(self, client, mock_get):
+        """Test each stop gets its own upstream call"""
+        client.get('/api/transport/departures/200060')
+        client.get('/api/transport/departures/200070')
+
+        assert mock_get.call_count == 2
+
+    def test_limit_applied_after_filters(self, client, mock_get):
+        """Test limit counts only departures that pass the filters"""
+        response = client.get('/api/transport/departures/200060?destination=parramatta&limit=1')
+
+        departures = response.get_json()['departures']
+        assert [d['line'] for d in departures] == ['600']
+
+    def test_cancelled_departures_skipped(self, client, mock_get):
+        """Test cancelled services never appear in results"""
+        response = client.get('/api/transport/departures/200060?routes=601')
+
+        departures = response.get_json()['departures']
+        assert [d['destination'] for d in departures] == ['City']
+
+    def test_upstream_error_not_cached(self, client, mock_get):
+        """Test a failed upstream call is retried on the next request"""
+        mock_response = mock_get.return_value
+        mock_get.side_effect = [Exception('Network error'), mock_response]
+
+        assert client.get('/api/transport/departures/200060').status_code == 500
+        assert client.get('/api/transport/departures/200060').status_code == 200
+        assert mock_get.call_count == 2
+
+
+    def test_local_copy_expires_with_shared_entry(self, client, mock_get):
+        """Test a worker doesn't keep an aged shared entry for another full TTL"""
+        ttl = app_module.TRANSPORT_CACHE_SECONDS
+        shared = app_module.shared_cache
+
+        with patch.object(shared, 'get_or_compute', return_value=([], ttl)) as get_or_compute:
+            client.get('/api/transport/departures/200060')
+            client.get('/api/transport/departures/200060')
+        assert get_or_compute.call_count == 2
+
+        with patch.object(shared, 'get_or_compute', return_value=([], ttl - 1)) as get_or_compute, \
+                patch('cache.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 1000.0
+            client.get('/api/transport/departures/200070')
+            mock_monotonic.return_value = 1001.0
+            client.get('/api/transport/departures/200070')
+        assert get_or_compute.call_count == 2
+
+    def test_bad_limit_rejected_before_upstream(self, client, mock_get):
+        """Test invalid filters fail without costing a TfNSW call"""
+        response = client.get('/api/transport/departures/200060?limit=many')
+
+        assert response.status_code == 500
+        mock_get.assert_not_called()
+
+class TestTransportBatchEndpoint:
+    """Tests for /api/transport/batch endpoint"""
+
+    @staticmethod
+    def _response(*events):
+        response = Mock()
+        response.json.return_value = {'stopEvents': [
+            {
+                'departureTimePlanned': '2025-10-27T05:17:00Z',
+                'transportation': {'number': number, 'destination': {'name': destination}}
+            }
+            for number, destination in events
+        ]}
+        return response
+
+    @patch('app.upstream.get')
+    def test_batch_returns_boards_in_order(self, mock_get, client):
+        """Test each stop gets its own filtered board, in request order"""
+        responses = {
+            '200060': self._response(('600', 'City'), ('601', 'Parramatta')),
+            '200070': self._response(('T1', 'Central'))
+        }
+        mock_get.side_effect = lambda name, url, params, **kwargs: responses[params['name_dm']]
+
+        response = client.post('/api/transport/batch', json={'stops': [
+            {'stop_id': '200070'},
+            {'stop_id': '200060', 'destination': 'parra'},
+            {'stop_id': '200060', 'routes': ['600']}
+        ]})
+        assert response.status_code == 200
+
+        boards = response.get_json()['boards']
+        assert [b['stopId'] for b in boards] == ['200070', '200060', '200060']
+        assert [d['line'] for d in boards[0]['departures']] == ['T1']
+        assert [d['line'] for d in boards[1]['departures']] == ['601']
+        assert [d['line'] for d in boards[2]['departures']] == ['600']
+        # Repeated stops share one upstream call
+        assert mock_get.call_count == 2
+
+    @patch('app.upstream.get')
+    def test_batch_fetches_stops_concurrently(self, mock_get, client):
+        """Test distinct stops are fetched at the same time"""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def get(name, url, params, **kwargs):
+            barrier.wait()
+            return self._response(('600', 'City'))
+
+        mock_get.side_effect = get
+
+        response = client.post('/api/transport/batch', json={'stops': [
+            {'stop_id': '1'}, {'stop_id': '2'}, {'stop_id': '3'}
+        ]})
+
+        boards = response.get_json()['boards']
+        assert all('error' not in b for b in boards)
+
+    @patch('app.upstream.get')
+    def test_batch_isolates_stop_errors(self, mock_get, client):
+        """Test one failing stop doesn't fail the batch"""
+        def get(name, url, params, **kwargs):
+            if params['name_dm'] == 'bad':
+                raise Exception('Network error')
+            return self._response(('600', 'City'))
+
+        mock_get.side_effect = get
+
+        response = client.post('/api/transport/batch', json={'stops': [
+            {'stop_id': 'good'}, {'stop_id': 'bad'}
+        ]})
+        assert response.status_code == 200
+
+        boards = response.get_json()['boards']
+        assert len(boards[0]['departures']) == 1
+        assert 'Network error' in boards[1]['error']
+
+    @pytest.mark.parametrize('body', [
+        None,
+        {},
+        {'stops': []},
+        {'stops': [{'destination': 'city'}]},
+        {'stops': [{'stop_id': '1', 'limit': 'many'}]},
+        {'stops': [{'stop_id': str(i)} for i in range(17)]},
+        [{'stop_id': '1'}],
+        'stops',
+    ])
+    def test_batch_rejects_invalid_body(self, client, body):
+        """Test malformed batch requests get a 400"""
+        response = client.post('/api/transport/batch', json=body)
+        assert response.status_code == 400
+
+
 class TestErrorHandling:
     """Tests for error handling across all endpoints"""
 
@@ -346,6 +872,468 @@ class TestErrorHandling:
         assert 'error' in data
 
 
+class TestGeocodeCache:
+    """Tests for the durable geocode cache"""
+
+    @staticmethod
+    def _geocode_response(results):
+        response = Mock()
+        response.json.return_value = {'results': results}
+        return response
+
+    @patch('app.upstream.get')
+    def test_normalized_addresses_share_entry(self, mock_get):
+        """Test case and whitespace variants of an address are geocoded once"""
+        mock_get.return_value = self._geocode_response([{'position': {'lat': -33.8, 'lon': 151.0}}])
+
+        assert app_module.geocode_address('1 Church St, Parramatta') == '-33.8,151.0'
+        assert app_module.geocode_address('  1 church st,  PARRAMATTA ') == '-33.8,151.0'
+        assert mock_get.call_count == 1
+
+    @patch('app.upstream.get')
+    def test_unmatched_address_negatively_cached(self, mock_get):
+        """Test an address TomTom can't match isn't looked up again"""
+        mock_get.return_value = self._geocode_response([])
+
+        assert app_module.geocode_address('Nowhere') is None
+        assert app_module.geocode_address('Nowhere') is None
+        assert mock_get.call_count == 1
+
+    @patch('app.upstream.get')
+    def test_request_error_cached_briefly(self, mock_get):
+        """Test a failed lookup is cached only for the short error TTL"""
+        mock_get.side_effect = Exception('TomTom down')
+
+        assert app_module.geocode_address('1 Church St') is None
+        assert app_module.geocode_address('1 Church St') is None
+        assert mock_get.call_count == 1
+
+        expires_at, _ = app_module._geocode_cache._entries['1 church st']
+        assert expires_at - time.monotonic() <= app_module.GEOCODE_ERROR_SECONDS
+
+    @patch('app.upstream.get')
+    @patch.dict(os.environ, {
+        'TRAFFIC_ROUTE_1_NAME': 'Morning Commute',
+        'TRAFFIC_ROUTE_1_ORIGIN': 'Home',
+        'TRAFFIC_ROUTE_1_DESTINATION': 'Work',
+        'TRAFFIC_ROUTE_1_SCHEDULE': 'Mon-Fri 07:00-09:00',
+        'TRAFFIC_ROUTE_2_NAME': 'Evening Commute',
+        'TRAFFIC_ROUTE_2_ORIGIN': 'Work',
+        'TRAFFIC_ROUTE_2_DESTINATION': 'Home',
+    })
+    def test_prewarm_geocodes_every_configured_address(self, mock_get):
+        """Test prewarming geocodes each distinct route address once, active or not"""
+        mock_get.return_value = self._geocode_response([{'position': {'lat': -33.8, 'lon': 151.0}}])
+
+        app_module.prewarm_geocodes()
+
+        assert mock_get.call_count == 2
+        assert app_module._geocode_cache.get('home') == '-33.8,151.0'
+        assert app_module._geocode_cache.get('work') == '-33.8,151.0'
+
+
+class TomTomMocks:
+    """Fixtures answering TomTom geocode, calculateRoute and Matrix Routing calls"""
+
+    ROUTE_SUMMARY = {'routes': [{'summary': {
+        'travelTimeInSeconds': 1800,
+        'trafficDelayInSeconds': 420,
+        'lengthInMeters': 23456
+    }}]}
+
+    MATRIX_SUMMARY = {
+        'travelTimeInSeconds': 1500,
+        'trafficDelayInSeconds': 0,
+        'lengthInMeters': 12000
+    }
+
+    @pytest.fixture
+    def mock_tomtom(self):
+        """Answer geocode and calculateRoute calls like TomTom would"""
+        def get(name, url, **kwargs):
+            response = Mock()
+            if '/geocode/' in url:
+                # Distinct coordinates per address
+                lat = -33 - sum(map(ord, url)) % 1000 / 1000
+                response.json.return_value = {'results': [{'position': {'lat': lat, 'lon': 151.0}}]}
+            else:
+                response.json.return_value = self.ROUTE_SUMMARY
+            return response
+
+        with patch('app.upstream.get', side_effect=get) as mock_get:
+            yield mock_get
+
+    @pytest.fixture
+    def mock_matrix(self):
+        """Answer Matrix Routing calls with a summary for every cell"""
+        def post(name, url, json=None, **kwargs):
+            response = Mock()
+            response.json.return_value = {'data': [
+                {'originIndex': i, 'destinationIndex': j, 'routeSummary': self.MATRIX_SUMMARY}
+                for i in range(len(json['origins'])) for j in range(len(json['destinations']))
+            ]}
+            return response
+
+        with patch('app.upstream.post', side_effect=post) as mock_post:
+            yield mock_post
+
+    @staticmethod
+    def _routing_calls(mock_get):
+        return [c for c in mock_get.call_args_list if 'calculateRoute' in c.args[1]]
+
+
+class TestTrafficRouteEndpoint(TomTomMocks):
+    """Tests for /api/traffic/route and the background traffic poller"""
+
+    def test_traffic_route_success(self, client, mock_tomtom):
+        """Test a route request returns the travel time summary"""
+        response = client.get('/api/traffic/route?origin=Home&destination=Work')
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert data['travelTimeMinutes'] == 30
+        assert data['trafficDelayMinutes'] == 7
+        assert data['distanceKm'] == 23.5
+        assert data['status'] == 'moderate'
+
+    def test_traffic_route_missing_params(self, client):
+        """Test origin and destination are required"""
+        response = client.get('/api/traffic/route?origin=Home')
+        assert response.status_code == 400
+
+    def test_traffic_route_geocode_failure(self, client):
+        """Test an address TomTom can't match gives a 400"""
+        response = Mock()
+        response.json.return_value = {'results': []}
+        with patch('app.upstream.get', return_value=response):
+            response = client.get('/api/traffic/route?origin=Nowhere&destination=Work')
+
+        assert response.status_code == 400
+        assert 'geocode' in response.get_json()['error']
+
+    def test_traffic_route_no_route(self, client, mock_tomtom):
+        """Test a 404 when TomTom finds no route"""
+        self.ROUTE_SUMMARY = {'routes': []}
+
+        response = client.get('/api/traffic/route?origin=Home&destination=Island')
+        assert response.status_code == 404
+
+    @patch('app.get_active_routes')
+    @patch('app.next_active_change')
+    def test_poller_results_served_without_upstream(self, mock_next_change, mock_active, client,
+                                                    mock_tomtom, mock_matrix):
+        """Test route requests read the poller's result instead of calling TomTom"""
+        mock_active.return_value = [
+            {'name': 'Morning Commute', 'origin': 'Home', 'destination': 'Work', 'route_num': 1,
+             'schedule': 'Mon-Fri 07:00-09:00'}
+        ]
+        mock_next_change.return_value = None
+        app_module.poll_traffic()
+        assert mock_matrix.call_count == 1
+
+        response = client.get('/api/traffic/route?origin=home&destination=WORK')
+        assert response.status_code == 200
+        assert response.get_json()['travelTimeMinutes'] == 25
+        assert mock_matrix.call_count == 1
+        assert self._routing_calls(mock_tomtom) == []
+
+    @patch('app.get_active_routes')
+    @patch('app.next_active_change')
+    def test_poller_idle_outside_windows(self, mock_next_change, mock_active, mock_tomtom):
+        """Test no upstream calls outside active windows, sleeping until the next one opens"""
+        mock_active.return_value = []
+        mock_next_change.return_value = datetime.now() + timedelta(minutes=30)
+
+        delay = app_module.poll_traffic()
+
+        assert mock_tomtom.call_count == 0
+        assert 1790 <= delay <= 1800
+
+    @patch('app.get_active_routes')
+    @patch('app.next_active_change')
+    def test_poller_interval_capped_at_window_end(self, mock_next_change, mock_active, mock_tomtom, mock_matrix):
+        """Test an active poller wakes when the window closes if that is sooner"""
+        mock_active.return_value = [
+            {'name': 'Morning Commute', 'origin': 'Home', 'destination': 'Work', 'route_num': 1,
+             'schedule': 'Mon-Fri 07:00-09:00'}
+        ]
+        mock_next_change.return_value = datetime.now() + timedelta(seconds=60)
+
+        delay = app_module.poll_traffic()
+        assert 50 <= delay <= 60
+
+        mock_next_change.return_value = None
+        assert app_module.poll_traffic() == app_module.TRAFFIC_POLL_INTERVAL
+
+
+class TestTrafficRequestBudget(TomTomMocks):
+    """Tests for the deadline-bounded live traffic pipeline"""
+
+    @pytest.fixture(autouse=True)
+    def short_budget(self):
+        with patch('app.TRAFFIC_REQUEST_BUDGET', 0.3):
+            yield
+
+    def test_geocodes_run_concurrently(self, client, mock_tomtom):
+        """Test origin and destination are geocoded at the same time"""
+        barrier = threading.Barrier(2, timeout=2)
+        answer = mock_tomtom.side_effect
+
+        def get(name, url, **kwargs):
+            if '/geocode/' in url:
+                barrier.wait()  # Breaks (and fails the geocode) unless both run at once
+            return answer(name, url, **kwargs)
+
+        mock_tomtom.side_effect = get
+        with patch('app.TRAFFIC_REQUEST_BUDGET', 5):
+            response = client.get('/api/traffic/route?origin=Home&destination=Work')
+
+        assert response.status_code == 200
+
+    def test_steps_share_remaining_budget(self, client, mock_tomtom):
+        """Test the routing call only gets what's left of the budget and isn't retried"""
+        client.get('/api/traffic/route?origin=Home&destination=Work')
+
+        routing = self._routing_calls(mock_tomtom)[0]
+        assert 0 < routing.kwargs['timeout'] <= 0.3
+        assert routing.kwargs['retry'] is False
+
+    def test_slow_geocode_fails_fast(self, client):
+        """Test a hung geocode gives a quick 504 instead of holding the worker"""
+        release = threading.Event()
+
+        def get(name, url, **kwargs):
+            release.wait(5)
+            raise requests.exceptions.Timeout('read timed out')
+
+        started = time.monotonic()
+        with patch('app.upstream.get', side_effect=get):
+            response = client.get('/api/traffic/route?origin=Home&destination=Work')
+            release.set()
+
+        assert time.monotonic() - started < 1
+        assert response.status_code == 504
+        assert response.get_json()['degraded'] is True
+
+    def test_geocode_timeout_not_cached(self, client):
+        """Test a geocode that ran out of budget isn't remembered as a bad address"""
+        def get(name, url, **kwargs):
+            raise requests.exceptions.Timeout('read timed out')
+
+        with patch('app.upstream.get', side_effect=get):
+            first = client.get('/api/traffic/route?origin=Home&destination=Work')
+            second = client.get('/api/traffic/route?origin=Home&destination=Work')
+
+        assert first.status_code == 504
+        assert second.status_code == 504
+        assert second.get_json()['degraded'] is True
+
+    def test_geocode_error_serves_last_known(self, client, mock_tomtom):
+        """Test a failed geocode in a live request takes the stale path, not a 400"""
+        client.get('/api/traffic/route?origin=Home&destination=Work')
+        app_module._traffic_cache.clear()
+        app_module._geocode_cache.clear()
+        mock_tomtom.side_effect = requests.exceptions.ConnectionError('connection reset')
+
+        response = client.get('/api/traffic/route?origin=Home&destination=Work')
+
+        assert response.status_code == 200
+        assert response.get_json()['stale'] is True
+        assert app_module._geocode_cache.get('home', cache.MISSING) is cache.MISSING
+
+    def test_timeout_serves_last_known(self, client, mock_tomtom):
+        """Test a timed out request falls back to the last good result, marked stale"""
+        client.get('/api/traffic/route?origin=Home&destination=Work')
+        app_module._traffic_cache.clear()
+        answer = mock_tomtom.side_effect
+
+        def get(name, url, **kwargs):
+            if 'calculateRoute' in url:
+                raise requests.exceptions.ReadTimeout('read timed out')
+            return answer(name, url, **kwargs)
+
+        mock_tomtom.side_effect = get
+        response = client.get('/api/traffic/route?origin=Home&destination=Work')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['travelTimeMinutes'] == 30
+        assert data['stale'] is True
+        assert data['degraded'] is True
+
+
+class TestTrafficHistory(TomTomMocks):
+    """Tests for recording traffic samples and /api/traffic/typical"""
+
+    @pytest.fixture(autouse=True)
+    def history(self, tmp_path):
+        history = TrafficHistory(str(tmp_path / 'history.sqlite3'))
+        with patch('app.traffic_history', history):
+            yield history
+
+    def test_live_fetch_recorded(self, client, history, mock_tomtom):
+        """Test each fresh TomTom result is kept as a sample, but cached answers aren't"""
+        client.get('/api/traffic/route?origin=Home&destination=Work')
+        client.get('/api/traffic/route?origin=Home&destination=Work')
+
+        typical = history.typical('home|work')
+        assert typical['samples'] == 1
+        assert typical['p50TravelSeconds'] == 1800
+        assert typical['p50DelaySeconds'] == 420
+
+    @patch('app.get_active_routes')
+    def test_matrix_results_recorded(self, mock_active, client, history, mock_tomtom, mock_matrix):
+        """Test batch results are recorded per route"""
+        mock_active.return_value = [
+            {'name': 'Morning Commute', 'origin': 'Home', 'destination': 'Work', 'route_num': 1,
+             'schedule': 'Mon-Fri 07:00-09:00'}
+        ]
+        client.get('/api/traffic/batch')
+
+        assert history.typical('home|work')['p50TravelSeconds'] == 1500
+
+    @patch.dict(os.environ, {
+        'TRAFFIC_ROUTE_1_NAME': 'Morning Commute',
+        'TRAFFIC_ROUTE_1_ORIGIN': 'Home',
+        'TRAFFIC_ROUTE_1_DESTINATION': 'Work',
+        'TRAFFIC_ROUTE_2_NAME': 'Evening Commute',
+        'TRAFFIC_ROUTE_2_ORIGIN': 'Work',
+        'TRAFFIC_ROUTE_2_DESTINATION': 'Home',
+    })
+    def test_typical_endpoint(self, client, history):
+        """Test p50/p90 per configured route for the current bucket"""
+        for minutes in (20, 25, 30, 40):
+            history.record('home|work', minutes * 60, 120, 23000)
+
+        response = client.get('/api/traffic/typical')
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert data['weekday'] == datetime.now().strftime('%A')
+        assert len(data['bucket']) == 11
+
+        morning, evening = data['routes']
+        assert morning['name'] == 'Morning Commute'
+        assert morning['p50TravelMinutes'] == 25
+        assert morning['p90TravelMinutes'] == 40
+        assert morning['p50DelayMinutes'] == 2
+        assert morning['samples'] == 4
+        assert evening['p50TravelMinutes'] is None
+        assert evening['samples'] == 0
+
+
+class TestTrafficBatchEndpoint(TomTomMocks):
+    """Tests for /api/traffic/batch (all active routes in one matrix call)"""
+
+    ROUTES = [
+        {'name': 'Morning Commute', 'origin': 'Home', 'destination': 'Work', 'route_num': 1,
+         'schedule': 'Mon-Fri 07:00-09:00'},
+        {'name': 'School Run', 'origin': 'Home', 'destination': 'School', 'route_num': 2,
+         'schedule': 'Mon-Fri 08:00-09:00'},
+        {'name': 'Gym', 'origin': 'Work', 'destination': 'Gym', 'route_num': 3,
+         'schedule': 'Mon-Fri 08:00-09:00'},
+    ]
+
+    @pytest.fixture(autouse=True)
+    def active_routes(self):
+        with patch('app.get_active_routes', return_value=[dict(r) for r in self.ROUTES]) as mock_active:
+            yield mock_active
+
+    def test_batch_single_matrix_call(self, client, mock_tomtom, mock_matrix):
+        """Test every active route is resolved by one Matrix Routing request"""
+        response = client.get('/api/traffic/batch')
+        assert response.status_code == 200
+
+        routes = response.get_json()['routes']
+        assert [r['name'] for r in routes] == ['Morning Commute', 'School Run', 'Gym']
+        assert all(r['travelTimeMinutes'] == 25 for r in routes)
+        assert mock_matrix.call_count == 1
+        assert self._routing_calls(mock_tomtom) == []
+
+        body = mock_matrix.call_args.kwargs['json']
+        assert len(body['origins']) == 2  # Home and Work, deduplicated
+        assert len(body['destinations']) == 3
+        assert body['options']['traffic'] == 'live'
+
+    def test_batch_served_from_cache(self, client, mock_tomtom, mock_matrix):
+        """Test a second request is answered without any upstream call"""
+        client.get('/api/traffic/batch')
+        calls = mock_tomtom.call_count
+
+        response = client.get('/api/traffic/batch')
+        assert response.status_code == 200
+        assert mock_matrix.call_count == 1
+        assert mock_tomtom.call_count == calls
+
+    def test_batch_falls_back_to_parallel_routes(self, client, mock_tomtom):
+        """Test a failed matrix call falls back to one calculateRoute per route"""
+        with patch('app.upstream.post', side_effect=requests.exceptions.HTTPError('403 Forbidden')):
+            response = client.get('/api/traffic/batch')
+
+        assert response.status_code == 200
+        assert all(r['travelTimeMinutes'] == 30 for r in response.get_json()['routes'])
+        assert len(self._routing_calls(mock_tomtom)) == 3
+
+    def test_batch_too_large_for_matrix(self, client, mock_tomtom, mock_matrix):
+        """Test batches over TRAFFIC_MATRIX_MAX_CELLS skip the matrix call"""
+        with patch('app.TRAFFIC_MATRIX_MAX_CELLS', 4):
+            response = client.get('/api/traffic/batch')
+
+        assert response.status_code == 200
+        assert mock_matrix.call_count == 0
+        assert len(self._routing_calls(mock_tomtom)) == 3
+
+    def test_batch_per_route_errors(self, client, mock_tomtom):
+        """Test a route without a matrix result reports an error alongside the others"""
+        def post(name, url, json=None, **kwargs):
+            response = Mock()
+            response.json.return_value = {'data': [
+                {'originIndex': 0, 'destinationIndex': 0, 'routeSummary': self.MATRIX_SUMMARY},
+                {'originIndex': 0, 'destinationIndex': 1, 'detailedError': {'code': 'NO_ROUTE_FOUND'}},
+                {'originIndex': 1, 'destinationIndex': 2, 'routeSummary': self.MATRIX_SUMMARY},
+            ]}
+            return response
+
+        with patch('app.upstream.post', side_effect=post):
+            response = client.get('/api/traffic/batch')
+
+        routes = response.get_json()['routes']
+        assert routes[0]['travelTimeMinutes'] == 25
+        assert routes[1]['error'] == 'No route found'
+        assert routes[2]['travelTimeMinutes'] == 25
+
+    def test_batch_geocode_failure(self, client, mock_matrix):
+        """Test a route whose address can't be geocoded reports an error"""
+        def get(name, url, **kwargs):
+            response = Mock()
+            results = [] if 'School' in url else [{'position': {'lat': -33 - sum(map(ord, url)) % 1000 / 1000, 'lon': 151.0}}]
+            response.json.return_value = {'results': results}
+            return response
+
+        with patch('app.upstream.get', side_effect=get):
+            response = client.get('/api/traffic/batch')
+
+        routes = response.get_json()['routes']
+        assert routes[1]['error'] == 'Could not geocode addresses'
+        assert 'error' not in routes[0] and 'error' not in routes[2]
+        assert len(mock_matrix.call_args.kwargs['json']['destinations']) == 2
+
+    def test_batch_no_active_routes(self, client, active_routes, mock_matrix):
+        """Test an empty batch when nothing is scheduled"""
+        active_routes.return_value = []
+
+        response = client.get('/api/traffic/batch')
+        assert response.status_code == 200
+        assert response.get_json()['routes'] == []
+        assert mock_matrix.call_count == 0
+
+    def test_batch_no_api_key(self, client):
+        """Test 503 without a TomTom API key"""
+        with patch('app.TOMTOM_API_KEY', None):
+            response = client.get('/api/traffic/batch')
+        assert response.status_code == 503
+
+
 class TestTrafficActiveRoutes:
     """Tests for /api/traffic/active-routes endpoint"""
 
@@ -393,6 +1381,16 @@ class TestTrafficActiveRoutes:
         assert data['count'] == 0
         assert data['routes'] == []
 
+    @patch('app.get_active_routes')
+    @patch('app.next_active_change')
+    def test_active_routes_next_change(self, mock_next_change, mock_get_active_routes, client):
+        """Test active routes reports when the active set next changes"""
+        mock_get_active_routes.return_value = []
+        mock_next_change.return_value = datetime(2025, 10, 27, 17, 0)
+
+        data = client.get('/api/traffic/active-routes').get_json()
+        assert data['next_change'] == '2025-10-27T17:00:00'
+
     @patch('app.get_active_routes')
     def test_active_routes_error(self, mock_get_active_routes, client):
         """Test active routes handles errors"""
@@ -415,3 +1413,548 @@ class TestCORSHeaders:
         # CORS headers should be present (handled by flask-cors)
         # The exact header name might vary, so we just check the response is successful
         assert response.status_code == 200
+
+
+class TestDockerStatus:
+    """Tests for /api/docker/status over the pooled Docker socket client"""
+
+    GB = 1024 ** 3
+    SYSTEM_DF = {
+        'LayersSize': 2 * GB,
+        'Images': [
+            {'Id': 'sha256:a', 'Size': GB, 'SharedSize': 0, 'Containers': 2},
+            {'Id': 'sha256:b', 'Size': GB, 'SharedSize': GB // 4, 'Containers': 0},
+        ],
+        'Containers': [
+            {'Id': 'c1', 'SizeRw': 100, 'State': 'running'},
+            {'Id': 'c2', 'SizeRw': 50, 'State': 'exited'},
+        ],
+        'Volumes': [
+            {'Name': 'used', 'UsageData': {'Size': 1000, 'RefCount': 1}},
+            {'Name': 'dangling', 'UsageData': {'Size': 400, 'RefCount': 0}},
+            {'Name': 'unknown', 'UsageData': {'Size': -1, 'RefCount': -1}},
+        ],
+        'BuildCache': [
+            {'ID': 'b1', 'Size': 300, 'InUse': False},
+            {'ID': 'b2', 'Size': 200, 'InUse': True},
+        ],
+    }
+
+    @pytest.fixture
+    def docker(self, docker_daemon):
+        docker_daemon.routes.update({
+            '/info': (200, {'Containers': 5, 'ContainersRunning': 3}),
+            '/version': (200, {'Version': '27.1.1'}),
+            '/system/df': (200, self.SYSTEM_DF),
+        })
+        client = DockerClient(docker_daemon.socket_path, timeout=5)
+        with patch('app.docker_client', client):
+            yield docker_daemon
+        client.close()
+
+    def test_docker_status(self, client, docker):
+        """Test the status summary from /info, /version and the background df"""
+        app_module.refresh_docker_df()
+        response = client.get('/api/docker/status')
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert data['status'] == 'Active (3/5 running)'
+        assert data['version'] == 'v27.1.1'
+        assert data['disk_usage'] == '2.0 GB'
+        assert data['service_status'] == 'active'
+
+    def test_status_never_scans_df(self, client, docker):
+        """Test status requests don't call /system/df, even before the first scan"""
+        for _ in range(3):
+            data = client.get('/api/docker/status').get_json()
+
+        assert '/system/df' not in docker.requests
+        assert data['disk_usage'] == 'Unknown'
+        assert data['disk'] is None
+
+    def test_disk_breakdown(self, client, docker):
+        """Test the df breakdown of used and reclaimable space per category"""
+        app_module.refresh_docker_df()
+        disk = client.get('/api/docker/status').get_json()['disk']
+
+        assert disk['images'] == {'count': 2, 'size': 2 * self.GB, 'reclaimable': self.GB * 3 // 4}
+        assert disk['containers'] == {'count': 2, 'size': 150, 'reclaimable': 50}
+        assert disk['volumes'] == {'count': 3, 'size': 1400, 'reclaimable': 400}
+        assert disk['build_cache'] == {'count': 2, 'size': 500, 'reclaimable': 300}
+        assert disk['total'] == 2 * self.GB + 2050
+        assert disk['reclaimable'] == self.GB * 3 // 4 + 750
+        assert 'updated' in disk
+
+    def test_df_scanned_once_per_interval(self, docker, tmp_path):
+        """Test repeat refreshes within the interval reuse the shared result"""
+        with patch('app.shared_cache', cache.SharedCache(str(tmp_path / 'cache.sqlite3'))):
+            app_module.refresh_docker_df()
+            app_module.refresh_docker_df()
+
+        assert docker.requests.count('/system/df') == 1
+
+    def test_info_and_version_concurrent(self, client, docker):
+        """Test /info and /version are requested at the same time"""
+        barrier = threading.Barrier(2, timeout=2)
+
+        def together(body):
+            def route(path):
+                barrier.wait()  # Breaks unless the other request is in flight
+                return 200, body
+            return route
+
+        docker.routes['/info'] = together({'Containers': 1, 'ContainersRunning': 1})
+        docker.routes['/version'] = together({'Version': '27.1.1'})
+
+        data = client.get('/api/docker/status').get_json()
+        assert data['status'] == 'Active (1/1 running)'
+
+    def test_connections_and_version_reused(self, client, docker):
+        """Test repeat refreshes reuse sockets and don't re-read /version"""
+        client.get('/api/docker/status')
+        connections = docker.connections
+        client.get('/api/docker/status')
+
+        assert docker.requests.count('/version') == 1
+        assert docker.connections == connections
+
+    def test_daemon_unreachable(self, client, tmp_path):
+        """Test an inactive status when the socket is missing"""
+        with patch('app.docker_client', DockerClient(str(tmp_path / 'missing.sock'))):
+            data = client.get('/api/docker/status').get_json()
+
+        assert data['status'] == 'Inactive'
+        assert 'error' in data
+
+    def test_live_model_skips_info(self, client, docker):
+        """Test counts come from the event-driven model while its stream is live"""
+        model = ContainerModel()
+        model.apply({'Type': 'container', 'Action': 'start', 'Actor': {'ID': 'abc', 'Attributes': {'name': 'web'}}})
+        model.live = True
+
+        with patch('app.container_model', model):
+            client.get('/api/docker/status')
+            data = client.get('/api/docker/status').get_json()
+
+        assert data['containers'] == '1/1'
+        assert '/info' not in docker.requests
+        assert docker.requests == ['/version']
+
+
+class TestDockerContainers:
+    """Tests for /api/docker/containers"""
+
+    @pytest.fixture
+    def docker(self, docker_daemon):
+        docker_daemon.routes.update({
+            '/containers/json': (200, [
+                {'Id': 'abc123abc123abc123', 'Names': ['/web'], 'Image': 'nginx', 'State': 'running'},
+                {'Id': 'def456def456def456', 'Names': ['/backup'], 'Image': 'restic', 'State': 'exited'},
+            ]),
+            '/containers/abc123abc123abc123/json': (200, {
+                'State': {'StartedAt': '2025-01-06T08:00:00.5Z', 'Health': {'Status': 'healthy'}}
+            }),
+        })
+        client = DockerClient(docker_daemon.socket_path, timeout=5)
+        model = ContainerModel()
+        with patch('app.docker_client', client), patch('app.container_model', model):
+            yield docker_daemon, model
+        client.close()
+
+    def test_listing(self, client, docker):
+        """Test each container's name, state, health and uptime"""
+        response = client.get('/api/docker/containers')
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert data['running'] == 1
+        assert data['total'] == 2
+        backup, web = data['containers']
+        assert web['name'] == 'web'
+        assert web['id'] == 'abc123abc123'
+        assert web['state'] == 'running'
+        assert web['health'] == 'healthy'
+        assert web['uptime_seconds'] > 0
+        assert backup['state'] == 'exited'
+        assert backup['uptime_seconds'] is None
+
+    def test_live_model_served_without_daemon_calls(self, client, docker):
+        """Test a live model answers straight from memory"""
+        daemon, model = docker
+        model.resync(app_module.docker_client)
+        model.live = True
+        daemon.requests.clear()
+
+        data = client.get('/api/docker/containers').get_json()
+
+        assert data['live'] is True
+        assert data['total'] == 2
+        assert daemon.requests == []
+
+    def test_daemon_unreachable(self, client, tmp_path):
+        """Test a 500 when there is no model and no daemon"""
+        with patch('app.docker_client', DockerClient(str(tmp_path / 'missing.sock'))), \
+                patch('app.container_model', ContainerModel()):
+            response = client.get('/api/docker/containers')
+
+        assert response.status_code == 500
+
+
+class TestDockerStats:
+    """Tests for /api/docker/stats"""
+
+    STATS = {
+        'cpu_stats': {'cpu_usage': {'total_usage': 400_000_000}, 'system_cpu_usage': 20_000_000_000, 'online_cpus': 4},
+        'precpu_stats': {'cpu_usage': {'total_usage': 300_000_000}, 'system_cpu_usage': 18_000_000_000},
+        'memory_stats': {'usage': 300 * 1024 ** 2, 'limit': 1024 ** 3, 'stats': {'inactive_file': 44 * 1024 ** 2}},
+        'networks': {'eth0': {'rx_bytes': 1000, 'tx_bytes': 200}, 'eth1': {'rx_bytes': 24, 'tx_bytes': 56}},
+        'blkio_stats': {'io_service_bytes_recursive': [
+            {'major': 8, 'minor': 0, 'op': 'read', 'value': 4096},
+            {'major': 8, 'minor': 0, 'op': 'write', 'value': 8192},
+            {'major': 8, 'minor': 16, 'op': 'Read', 'value': 4096},
+        ]},
+    }
+
+    @pytest.fixture
+    def docker(self, docker_daemon):
+        docker_daemon.routes['/containers/json'] = (200, [
+            {'Id': f'{n:012d}', 'Names': [f'/app{n}'], 'State': 'running'} for n in range(3)
+        ])
+        for n in range(3):
+            docker_daemon.routes[f'/containers/{n:012d}/stats'] = (200, self.STATS)
+        client = DockerClient(docker_daemon.socket_path, timeout=5)
+        with patch('app.docker_client', client), patch('app.container_model', ContainerModel()):
+            yield docker_daemon
+        client.close()
+
+    def test_summarize_stats(self):
+        """Test CPU, memory and I/O figures match `docker stats`"""
+        summary = app_module.summarize_container_stats(self.STATS)
+
+        assert summary['cpu_percent'] == 20.0
+        assert summary['memory_bytes'] == 256 * 1024 ** 2
+        assert summary['memory_percent'] == 25.0
+        assert summary['network_rx_bytes'] == 1024
+        assert summary['network_tx_bytes'] == 256
+        assert summary['block_read_bytes'] == 8192
+        assert summary['block_write_bytes'] == 8192
+
+    def test_summarize_without_previous_sample(self):
+        """Test CPU is 0 rather than an error when there is no earlier sample"""
+        stats = dict(self.STATS, precpu_stats={})
+        stats['cpu_stats'] = dict(stats['cpu_stats'], system_cpu_usage=0)
+
+        assert app_module.summarize_container_stats(stats)['cpu_percent'] == 0.0
+
+    def test_stats_for_running_containers(self, client, docker):
+        """Test one entry per running container, sorted by name"""
+        response = client.get('/api/docker/stats')
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert [c['name'] for c in data['containers']] == ['app0', 'app1', 'app2']
+        assert data['containers'][0]['cpu_percent'] == 20.0
+        assert data['cpu_percent'] == 60.0
+        assert all('stream=false' in path for path in docker.requests if '/stats' in path)
+
+    def test_stats_fetched_concurrently(self, client, docker):
+        """Test every container's stats call is in flight at once"""
+        barrier = threading.Barrier(3, timeout=2)
+
+        def slow_stats(path):
+            barrier.wait()  # Breaks unless all three calls overlap
+            return 200, self.STATS
+
+        for n in range(3):
+            docker.routes[f'/containers/{n:012d}/stats'] = slow_stats
+
+        data = client.get('/api/docker/stats').get_json()
+        assert all('error' not in c for c in data['containers'])
+
+    def test_stats_cached(self, client, docker):
+        """Test repeat requests within the TTL reuse the last sample"""
+        client.get('/api/docker/stats')
+        requests_made = len(docker.requests)
+        client.get('/api/docker/stats')
+
+        assert len(docker.requests) == requests_made
+
+    def test_local_copy_expires_with_shared_entry(self, client):
+        """Test a worker doesn't keep an aged shared sample for another full TTL"""
+        ttl = app_module.DOCKER_STATS_CACHE_SECONDS
+
+        with patch.object(app_module.shared_cache, 'get_or_compute', return_value=([], ttl - 1)) as get_or_compute, \
+                patch('cache.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 1000.0
+            client.get('/api/docker/stats')
+            mock_monotonic.return_value = 1001.0
+            client.get('/api/docker/stats')
+
+        assert get_or_compute.call_count == 2
+
+    def test_stopped_container_reports_error(self, client, docker):
+        """Test a container that vanished mid-sample gets an error entry"""
+        docker.routes['/containers/000000000001/stats'] = (404, {'message': 'No such container'})
+
+        containers = client.get('/api/docker/stats').get_json()['containers']
+        assert 'No such container' in containers[1]['error']
+        assert containers[0]['cpu_percent'] == 20.0
+
+
+class TestWireguardStatus:
+    """Tests for /api/wireguard/status"""
+
+    @pytest.fixture
+    def sampler(self, tmp_path):
+        statistics = tmp_path / 'wg0' / 'statistics'
+        statistics.mkdir(parents=True)
+        sampler = InterfaceSampler('wg0', 1, sysfs=str(tmp_path))
+
+        def write(rx_bytes, tx_bytes):
+            for counter in ('rx_packets', 'tx_packets', 'rx_errors', 'tx_errors'):
+                (statistics / counter).write_text('0\n')
+            (statistics / 'rx_bytes').write_text(f'{rx_bytes}\n')
+            (statistics / 'tx_bytes').write_text(f'{tx_bytes}\n')
+
+        sampler.write = write
+        with patch('app.wg_sampler', sampler):
+            yield sampler
+        sampler.close()
+
+    @patch('app._wg_interface_up', return_value=False)
+    def test_interface_down(self, mock_up, client):
+        """Test an inactive status when wg0 doesn't exist"""
+        data = client.get('/api/wireguard/status').get_json()
+
+        assert data['status'] == 'Inactive'
+        assert 'throughput' not in data
+
+    @patch('app._wg_interface_up', return_value=True)
+    def test_throughput_from_sampler(self, mock_up, client, sampler):
+        """Test current rates and totals come from the background sampler"""
+        for when, rx_bytes, tx_bytes in ((100, 0, 0), (101, 2048, 1024)):
+            sampler.write(rx_bytes, tx_bytes)
+            with patch('netstats.time.monotonic', return_value=when):
+                sampler.sample()
+
+        data = client.get('/api/wireguard/status').get_json()
+
+        assert data['status'] == 'Active'
+        assert data['rx'] == '2.0 KB/s'
+        assert data['tx'] == '1.0 KB/s'
+        assert data['throughput']['rx_bytes'] == 2048
+        assert data['throughput']['averages']['1m']['rx'] == 2048
+
+    @patch('app._wg_interface_up', return_value=True)
+    def test_no_samples_yet(self, mock_up, client, sampler):
+        """Test an active status without throughput before the first sample"""
+        data = client.get('/api/wireguard/status').get_json()
+
+        assert data['status'] == 'Active'
+        assert 'rx' not in data
+
+
+class TestWireguardPeers:
+    """Tests for /api/wireguard/peers"""
+
+    DEVICE = {
+        'interface': 'wg0',
+        'public_key': 'c2VydmVy',
+        'listen_port': 51820,
+        'peers': [
+            {'public_key': 'cGhvbmU=', 'endpoint': '203.0.113.5:51820', 'allowed_ips': ['10.13.13.2/32'],
+             'last_handshake': 1700000000.0, 'persistent_keepalive': 25,
+             'rx_bytes': 1024, 'tx_bytes': 2048},
+            {'public_key': 'bGFwdG9w', 'endpoint': None, 'allowed_ips': ['10.13.13.3/32'],
+             'last_handshake': None, 'persistent_keepalive': None, 'rx_bytes': 0, 'tx_bytes': 0},
+        ]
+    }
+
+    @patch('app.time.time', return_value=1700000090.0)
+    @patch('app.wg_netlink')
+    def test_peers(self, mock_netlink, mock_time, client):
+        """Test per-peer handshake age and transfer totals"""
+        mock_netlink.get_device.return_value = self.DEVICE
+
+        response = client.get('/api/wireguard/peers')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['listen_port'] == 51820
+        assert data['peers'][0]['handshake_age_seconds'] == 90
+        assert data['peers'][0]['rx_bytes'] == 1024
+        assert data['peers'][0]['endpoint'] == '203.0.113.5:51820'
+        assert data['peers'][1]['last_handshake'] is None
+        assert data['peers'][1]['handshake_age_seconds'] is None
+        mock_netlink.get_device.assert_called_once_with('wg0')
+
+    @patch('app.wg_netlink')
+    def test_cached(self, mock_netlink, client):
+        """Test repeat requests inside the cache window reuse one dump"""
+        mock_netlink.get_device.return_value = self.DEVICE
+
+        client.get('/api/wireguard/peers')
+        client.get('/api/wireguard/peers')
+
+        assert mock_netlink.get_device.call_count == 1
+
+    @patch('app.wg_netlink')
+    def test_interface_missing(self, mock_netlink, client):
+        """Test a 404 when wg0 doesn't exist"""
+        mock_netlink.get_device.side_effect = OSError(errno.ENODEV, 'No such device')
+
+        response = client.get('/api/wireguard/peers')
+
+        assert response.status_code == 404
+
+    @patch('app.wg_netlink')
+    def test_not_permitted(self, mock_netlink, client):
+        """Test a 503 when the container can't reach WireGuard over netlink"""
+        mock_netlink.get_device.side_effect = PermissionError(errno.EPERM, 'Operation not permitted')
+
+        response = client.get('/api/wireguard/peers')
+
+        assert response.status_code == 503
+        assert 'unavailable' in response.get_json()['error']
+
+
+
+class TestDashboardEndpoint:
+    """Tests for /api/dashboard"""
+
+    STOP_EVENTS = {
+        'stopEvents': [
+            {
+                'departureTimePlanned': '2025-10-27T05:17:00Z',
+                'transportation': {'number': '600', 'destination': {'name': 'Parramatta'}}
+            },
+            {
+                'departureTimePlanned': '2025-10-27T05:20:00Z',
+                'transportation': {'number': '601', 'destination': {'name': 'City'}}
+            }
+        ]
+    }
+
+    @pytest.fixture
+    def sections(self):
+        """Stand-in payloads for the cache-backed sections"""
+        builders = {
+            'weather': Mock(return_value={'observations': {'temp': 21.5}, 'stale': False}),
+            'wireguard': Mock(return_value={'status': 'Active'}),
+            'docker': Mock(return_value={'status': 'Active (3/4 running)'})
+        }
+        with patch.dict('app._dashboard_builders', builders):
+            yield builders
+
+    @pytest.fixture
+    def mock_get(self):
+        with patch('app.upstream.get') as mock_get:
+            mock_get.return_value = Mock(json=Mock(return_value=self.STOP_EVENTS))
+            yield mock_get
+
+    def test_all_sections(self, client, sections, mock_get):
+        """Test every widget's payload comes back in one response"""
+        data = client.get('/api/dashboard?stop=200060&stop=200070').get_json()
+
+        assert data['weather']['observations']['temp'] == 21.5
+        assert data['wireguard']['status'] == 'Active'
+        assert data['docker']['status'] == 'Active (3/4 running)'
+        assert [b['stopId'] for b in data['transport']['boards']] == ['200060', '200070']
+        assert len(data['transport']['boards'][0]['departures']) == 2
+        assert data['missing'] == []
+        assert mock_get.call_count == 2
+
+    def test_post_stop_filters(self, client, sections, mock_get):
+        """Test POSTed stops carry their own filters, sharing one fetch per stop"""
+        response = client.post('/api/dashboard', json={
+            'sections': ['transport'],
+            'stops': [{'stop_id': '200060', 'destination': 'city'}, {'stop_id': '200060', 'routes': '600'}]
+        })
+
+        boards = response.get_json()['transport']['boards']
+        assert [d['line'] for d in boards[0]['departures']] == ['601']
+        assert [d['line'] for d in boards[1]['departures']] == ['600']
+        assert mock_get.call_count == 1
+
+    def test_sections_subset(self, client, sections):
+        """Test only the requested sections are built"""
+        data = client.get('/api/dashboard?sections=wireguard,docker').get_json()
+
+        assert 'wireguard' in data and 'docker' in data
+        assert 'weather' not in data and 'transport' not in data
+        sections['weather'].assert_not_called()
+
+    def test_unknown_section(self, client):
+        """Test a 400 for a section that doesn't exist"""
+        response = client.get('/api/dashboard?sections=weather,calendar')
+
+        assert response.status_code == 400
+
+    def test_invalid_stops(self, client):
+        """Test a 400 for stops without a stop_id"""
+        response = client.post('/api/dashboard', json={'stops': [{'destination': 'city'}]})
+
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('body', [
+        ['weather'],
+        {'sections': [['weather']]},
+        {'sections': [{'name': 'weather'}]},
+        {'sections': 'weather'},
+    ])
+    def test_invalid_post_body(self, client, body):
+        """Test a 400 for a POST body that isn't an object or has non-string sections"""
+        response = client.post('/api/dashboard', json=body)
+
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+
+    def test_section_error(self, client, sections):
+        """Test a failing section carries its error without failing the others"""
+        sections['weather'].side_effect = LookupError('Location "nowhere" not found')
+
+        data = client.get('/api/dashboard').get_json()
+
+        assert data['weather'] == {'error': 'Location "nowhere" not found'}
+        assert data['docker']['status'] == 'Active (3/4 running)'
+
+    def test_slow_section_missing(self, client, sections):
+        """Test a section past the timeout is null and listed as missing"""
+        release = threading.Event()
+        sections['weather'].side_effect = lambda: release.wait(5) and {}
+
+        try:
+            with patch('app.DASHBOARD_SECTION_TIMEOUT', 0.1):
+                started = time.monotonic()
+                data = client.get('/api/dashboard?sections=weather,docker').get_json()
+            assert time.monotonic() - started < 1
+        finally:
+            release.set()
+
+        assert data['weather'] is None
+        assert data['missing'] == ['weather']
+        assert data['docker']['status'] == 'Active (3/4 running)'
+
+    def test_slow_stop_missing(self, client, sections, mock_get):
+        """Test a stop whose departures aren't ready in time is listed as missing"""
+        release = threading.Event()
+        response = mock_get.return_value
+        mock_get.side_effect = lambda *args, **kwargs: release.wait(5) and response
+
+        try:
+            with patch('app.DASHBOARD_SECTION_TIMEOUT', 0.1):
+                data = client.get('/api/dashboard?sections=transport&stop=200060').get_json()
+        finally:
+            release.set()
+
+        assert data['transport']['boards'] == [{'stopId': '200060', 'departures': None}]
+        assert data['missing'] == ['transport:200060']
+
+    @patch('app.TRANSPORT_NSW_API_KEY', '')
+    def test_transport_not_configured(self, client, sections):
+        """Test the transport section reports a missing API key"""
+        data = client.get('/api/dashboard?stop=200060').get_json()
+
+        assert data['transport'] == {'error': 'Transport NSW API key not configured'}
+        assert data['weather']['stale'] is False
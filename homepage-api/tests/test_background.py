@@ -0,0 +1,77 @@
+"""
+Unit tests for background task helpers
+"""
+import threading
+
+from background import PeriodicTask
+
+
+class TestPeriodicTask:
+    """Tests for the periodic daemon-thread runner"""
+
+    def test_runs_repeatedly_until_stopped(self):
+        """Test the function is called on every interval until stop()"""
+        calls = []
+        third_call = threading.Event()
+
+        def func():
+            calls.append(1)
+            if len(calls) == 3:
+                third_call.set()
+
+        task = PeriodicTask('test', func, interval=0.01, run_immediately=True)
+        task.start()
+        assert third_call.wait(5)
+        task.stop(timeout=5)
+
+        assert not task.running
+        count = len(calls)
+        third_call.clear()
+        assert not third_call.wait(0.05)
+        assert len(calls) == count
+
+    def test_return_value_sets_next_delay(self):
+        """Test a returned number overrides the interval before the next run"""
+        calls = []
+        second_call = threading.Event()
+
+        def func():
+            calls.append(1)
+            if len(calls) == 2:
+                second_call.set()
+            return 0.01
+
+        task = PeriodicTask('test', func, interval=3600, run_immediately=True)
+        task.start()
+        try:
+            assert second_call.wait(5)
+        finally:
+            task.stop(timeout=5)
+
+    def test_exceptions_do_not_stop_task(self):
+        """Test a failing run is logged and the task keeps going"""
+        calls = []
+        second_call = threading.Event()
+
+        def func():
+            calls.append(1)
+            if len(calls) == 2:
+                second_call.set()
+            raise RuntimeError('boom')
+
+        task = PeriodicTask('test', func, interval=0.01, run_immediately=True)
+        task.start()
+        try:
+            assert second_call.wait(5)
+        finally:
+            task.stop(timeout=5)
+
+    def test_waits_before_first_run_by_default(self):
+        """Test the first run happens after one interval unless run_immediately"""
+        called = threading.Event()
+        task = PeriodicTask('test', called.set, interval=3600)
+        task.start()
+        try:
+            assert not called.wait(0.05)
+        finally:
+            task.stop(timeout=5)
@@ -0,0 +1,616 @@
+"""
+Unit tests for cache helpers
+"""
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from cache import (
+    SharedCache, SingleFlight, StaleWhileRevalidate, TTLCache, ttl_cache, clear_all, save_snapshot, load_snapshot,
+    sqlite_connection, writable_path
+)
+
+
+def run_concurrently(func, count, started, release):
+    """
+    Call func from count threads, the first of them alone until started is set
+
+    The rest are given a moment to reach func before release is set.
+    Returns each thread's result (or exception) in start order.
+    """
+    results = [None] * count
+
+    def call(i):
+        try:
+            results[i] = func()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+class TestStaleWhileRevalidate:
+    """Tests for the background-refreshing snapshot cache"""
+
+    def test_cold_get_fetches(self):
+        """Test first get blocks on fetch and reports zero age"""
+        swr = StaleWhileRevalidate(lambda: 'fresh', ttl=60)
+
+        value, age = swr.get()
+        assert value == 'fresh'
+        assert age < 1
+
+    def test_cold_get_raises_fetch_error(self):
+        """Test a failed cold fetch propagates since there is nothing to serve"""
+        def fetch():
+            raise RuntimeError('upstream down')
+
+        swr = StaleWhileRevalidate(fetch, ttl=60)
+        with pytest.raises(RuntimeError):
+            swr.get()
+
+    def test_concurrent_cold_gets_share_fetch(self):
+        """Test callers arriving before the first value exists wait for one fetch"""
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'fresh'
+
+        swr = StaleWhileRevalidate(fetch, ttl=60)
+        results = run_concurrently(lambda: swr.get()[0], 4, started, release)
+
+        assert results == ['fresh'] * 4
+        assert len(calls) == 1
+
+    def test_fresh_value_not_refetched(self):
+        """Test gets within the TTL don't call fetch again"""
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return len(calls)
+
+        swr = StaleWhileRevalidate(fetch, ttl=60)
+        swr.get()
+        value, _ = swr.get()
+        assert value == 1
+        assert len(calls) == 1
+
+    def test_stale_value_served_while_refreshing(self):
+        """Test a stale get returns immediately and refreshes in the background"""
+        release = threading.Event()
+        values = iter(['first', 'second'])
+
+        def fetch():
+            value = next(values)
+            if value == 'second':
+                release.wait(5)
+            return value
+
+        swr = StaleWhileRevalidate(fetch, ttl=0)
+        swr.get()
+
+        value, _ = swr.get()
+        assert value == 'first'
+
+        release.set()
+        swr.join(timeout=5)
+        swr.ttl = 60
+        value, _ = swr.get()
+        assert value == 'second'
+
+    def test_failed_refresh_keeps_stale_value(self):
+        """Test a refresh error keeps the previous value and records the error"""
+        results = iter([lambda: 'good', lambda: 1 / 0])
+        swr = StaleWhileRevalidate(lambda: next(results)(), ttl=0)
+        swr.get()
+
+        value, _ = swr.get()
+        swr.join(timeout=5)
+        assert value == 'good'
+        assert 'division by zero' in swr.last_error
+
+        value, _ = swr.get()
+        assert value == 'good'
+
+    def test_shared_refresh_reports_real_age(self, tmp_path):
+        """Test a value another worker stored is served with its stored age"""
+        shared = SharedCache(str(tmp_path / 'cache.sqlite3'))
+        shared.set('weather', 'from-other-worker', ttl=60)
+
+        with patch('cache.time.time', return_value=time.time() + 20):
+            swr = StaleWhileRevalidate(lambda: 'own-fetch', ttl=60, name='weather', shared=shared)
+            value, age = swr.get()
+
+        assert value == 'from-other-worker'
+        assert 19 <= age <= 30
+
+    def test_clear_forces_fetch(self):
+        """Test clear drops the stored value"""
+        calls = []
+        swr = StaleWhileRevalidate(lambda: calls.append(1) or len(calls), ttl=60)
+        swr.get()
+        swr.clear()
+
+        value, _ = swr.get()
+        assert value == 2
+
+
+class TestTTLCache:
+    """Tests for the per-entry TTL/LRU cache"""
+
+    def test_get_set(self):
+        """Test stored values are returned and counted as hits"""
+        cache = TTLCache(ttl=60)
+        cache.set('a', 1)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    @patch('cache.time.monotonic')
+    def test_entries_expire_individually(self, mock_monotonic):
+        """Test each entry expires on its own schedule without flushing the rest"""
+        mock_monotonic.return_value = 1000.0
+        cache = TTLCache(ttl=60, jitter=0)
+        cache.set('short', 1, ttl=10)
+        cache.set('long', 2)
+
+        mock_monotonic.return_value = 1030.0
+        assert cache.get('short') is None
+        assert cache.get('long') == 2
+        assert cache.stats()['expirations'] == 1
+
+    @patch('cache.time.monotonic')
+    def test_jitter_shortens_ttl(self, mock_monotonic):
+        """Test jitter only ever brings expiry forward, within the jitter fraction"""
+        mock_monotonic.return_value = 0.0
+        cache = TTLCache(ttl=100, jitter=0.2)
+        for i in range(50):
+            cache.set(i, i)
+
+        expiries = [expires_at for expires_at, _ in cache._entries.values()]
+        assert all(80 <= e <= 100 for e in expiries)
+        assert len(set(expiries)) > 1
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = TTLCache(ttl=60, maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats()['evictions'] == 1
+
+    @patch('cache.time.monotonic')
+    def test_expired_lru_entry_dropped_on_insert(self, mock_monotonic):
+        """Test an insert drops one expired entry from the LRU end"""
+        mock_monotonic.return_value = 0.0
+        cache = TTLCache(ttl=10, jitter=0)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        mock_monotonic.return_value = 20.0
+        cache.set('c', 3)
+        assert len(cache) == 2
+        assert cache.stats()['expirations'] == 1
+
+    def test_none_is_cacheable(self):
+        """Test None values are cached and distinguished from misses"""
+        calls = []
+        cache = TTLCache(ttl=60)
+
+        cache.get_or_compute('k', lambda: calls.append(1))
+        cache.get_or_compute('k', lambda: calls.append(1))
+        assert len(calls) == 1
+
+
+class TestSingleFlight:
+    """Tests for coalescing concurrent calls per key"""
+
+    def test_concurrent_calls_share_one(self):
+        """Test callers arriving during a call wait for it and get its result"""
+        flights = SingleFlight()
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = run_concurrently(lambda: flights.do('k', fetch), 4, started, release)
+
+        assert results == ['value'] * 4
+        assert len(calls) == 1
+
+    def test_error_shared(self):
+        """Test every waiting caller sees the running call's exception"""
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise RuntimeError('upstream down')
+
+        results = run_concurrently(lambda: flights.do('k', fail), 3, started, release)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_sequential_calls_not_shared(self):
+        """Test a finished call isn't reused by later callers"""
+        flights = SingleFlight()
+        calls = []
+
+        flights.do('k', lambda: calls.append(1))
+        flights.do('k', lambda: calls.append(1))
+
+        assert len(calls) == 2
+
+    def test_keys_independent(self):
+        """Test a call for one key doesn't hold up another"""
+        flights = SingleFlight()
+        release = threading.Event()
+        thread = threading.Thread(target=flights.do, args=('slow', lambda: release.wait(5)))
+        thread.start()
+
+        assert flights.do('fast', lambda: 'done', timeout=1) == 'done'
+        release.set()
+        thread.join(5)
+
+    def test_waiter_timeout(self):
+        """Test a waiting caller gives up after its timeout"""
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=flights.do, args=('k', slow))
+        thread.start()
+        started.wait(5)
+        with pytest.raises(TimeoutError):
+            flights.do('k', slow, timeout=0.05)
+        release.set()
+        thread.join(5)
+
+
+class TestTTLCacheDecorator:
+    """Tests for the ttl_cache decorator"""
+
+    def test_caches_per_arguments(self):
+        """Test results are cached per argument tuple"""
+        calls = []
+
+        @ttl_cache(seconds=60)
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        assert double(2) == 4
+        assert double(2) == 4
+        assert double(3) == 6
+        assert calls == [2, 3]
+        assert double.cache_info()['hits'] == 1
+
+    def test_concurrent_misses_coalesced(self):
+        """Test threads missing the same arguments at once share one call"""
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        @ttl_cache(seconds=60)
+        def fetch(x):
+            calls.append(x)
+            started.set()
+            release.wait(5)
+            return x * 2
+
+        results = run_concurrently(lambda: fetch(2), 4, started, release)
+
+        assert results == [4] * 4
+        assert calls == [2]
+        assert fetch(2) == 4
+
+    def test_cache_none_false(self):
+        """Test None results are retried when cache_none is False"""
+        calls = []
+
+        @ttl_cache(seconds=60, cache_none=False)
+        def lookup(x):
+            calls.append(x)
+            return None
+
+        lookup('a')
+        lookup('a')
+        assert calls == ['a', 'a']
+
+    def test_cache_clear(self):
+        """Test cache_clear forces the next call through"""
+        calls = []
+
+        @ttl_cache(seconds=60)
+        def value():
+            calls.append(1)
+            return len(calls)
+
+        value()
+        value.cache_clear()
+        assert value() == 2
+
+    def test_clear_all(self):
+        """Test clear_all empties every registered cache"""
+        cache = TTLCache(ttl=60)
+        cache.set('a', 1)
+
+        clear_all()
+        assert cache.get('a') is None
+
+
+class TestSharedCache:
+    """Tests for the SQLite-backed cache shared between workers"""
+
+    @pytest.fixture
+    def shared(self, tmp_path):
+        return SharedCache(str(tmp_path / 'cache.sqlite3'), lease_seconds=5, poll_interval=0.01)
+
+    def test_get_set(self, shared):
+        """Test values round-trip through JSON with their age"""
+        shared.set('k', {'a': [1, 2]}, ttl=60)
+
+        value, age = shared.get('k')
+        assert value == {'a': [1, 2]}
+        assert age < 5
+
+    def test_expired_entry_missing(self, shared):
+        """Test expired entries are treated as missing"""
+        shared.set('k', 'v', ttl=-1)
+        assert shared.get('k') == (None, None)
+
+    def test_visible_to_other_connections(self, tmp_path):
+        """Test a value stored by one worker is read by another"""
+        path = str(tmp_path / 'cache.sqlite3')
+        SharedCache(path).set('k', 'v', ttl=60)
+
+        value, _ = SharedCache(path).get('k')
+        assert value == 'v'
+
+    def test_stored_before_lease_taken(self, tmp_path, shared):
+        """Test a value another worker stores just before this one takes the lease isn't recomputed"""
+        other = SharedCache(shared.path)
+        acquire = shared._acquire
+
+        def late_acquire(key, force=False):
+            # The other worker finishes between our miss and our lease
+            other.set(key, 'theirs', ttl=60)
+            return acquire(key, force)
+
+        calls = []
+        with patch.object(shared, '_acquire', side_effect=late_acquire):
+            value, _ = shared.get_or_compute('k', lambda: calls.append(1) or 'ours', ttl=60)
+
+        assert value == 'theirs'
+        assert calls == []
+        assert shared._acquire('k')  # The lease was released
+
+    def test_get_or_compute_single_flight(self, tmp_path):
+        """Test concurrent misses on one key compute it only once"""
+        path = str(tmp_path / 'cache.sqlite3')
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+
+        def worker():
+            # Separate SharedCache instances stand in for separate gunicorn workers
+            cache = SharedCache(path, lease_seconds=5, poll_interval=0.01)
+            results.append(cache.get_or_compute('k', compute, ttl=60)[0])
+
+        first = threading.Thread(target=worker)
+        first.start()
+        started.wait(5)
+        others = [threading.Thread(target=worker) for _ in range(3)]
+        for t in others:
+            t.start()
+        release.set()
+        for t in [first] + others:
+            t.join(5)
+
+        assert results == ['value'] * 4
+        assert len(calls) == 1
+
+    def test_threads_in_one_worker_coalesced(self, shared):
+        """Test threads sharing one SharedCache compute a missing key once"""
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = run_concurrently(lambda: shared.get_or_compute('k', compute, ttl=60)[0], 4, started, release)
+
+        assert results == ['value'] * 4
+        assert len(calls) == 1
+
+    def test_failed_compute_releases_lease(self, shared):
+        """Test an error releases the lease so the next caller can compute"""
+        def fail():
+            raise RuntimeError('upstream down')
+
+        with pytest.raises(RuntimeError):
+            shared.get_or_compute('k', fail, ttl=60)
+
+        value, age = shared.get_or_compute('k', lambda: 'ok', ttl=60)
+        assert value == 'ok'
+        assert age == 0.0
+
+    def test_expired_lease_taken_over(self, shared):
+        """Test a lease left by a dead worker doesn't block forever"""
+        shared.lease_seconds = 0.05
+        assert shared._acquire('k')
+
+        other = SharedCache(shared.path, poll_interval=0.01)
+        value, _ = other.get_or_compute('k', lambda: 'ok', ttl=60)
+        assert value == 'ok'
+
+    def test_wait_bounded(self, shared):
+        """Test a waiter with a wait limit gives up instead of sitting out the lease"""
+        assert shared._acquire('k')
+
+        other = SharedCache(shared.path, poll_interval=0.01)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            other.get_or_compute('k', lambda: 'ok', ttl=60, wait=0.1)
+        assert time.monotonic() - started < 1
+
+    def test_disabled_without_path(self):
+        """Test a cache without a path just calls compute"""
+        shared = SharedCache(None)
+
+        assert not shared.enabled
+        assert shared.get_or_compute('k', lambda: 'v', ttl=60) == ('v', 0.0)
+        assert shared.get('k') == (None, None)
+
+    def test_disabled_still_coalesces_threads(self):
+        """Test a disabled cache still shares one compute between concurrent threads"""
+        shared = SharedCache(None)
+        calls = []
+        started, release = threading.Event(), threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'v'
+
+        results = run_concurrently(lambda: shared.get_or_compute('k', compute, ttl=60), 3, started, release)
+
+        assert results == [('v', 0.0)] * 3
+        assert len(calls) == 1
+
+    def test_disabled_when_directory_not_writable(self, tmp_path):
+        """Test an unusable data directory disables the cache instead of failing"""
+        shared = SharedCache(str(tmp_path / 'missing' / 'cache.sqlite3'))
+        assert not shared.enabled
+
+
+class TestSqliteHelpers:
+    """Tests for the connection and path helpers shared by the SQLite stores"""
+
+    SCHEMA = ('CREATE TABLE IF NOT EXISTS t (x INTEGER)',)
+
+    def test_connection_per_thread(self, tmp_path):
+        """Test each thread gets its own connection, reused on later calls"""
+        local = threading.local()
+        path = str(tmp_path / 'db.sqlite3')
+        conn = sqlite_connection(local, path, self.SCHEMA)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(sqlite_connection(local, path, self.SCHEMA)))
+        thread.start()
+        thread.join()
+
+        assert sqlite_connection(local, path, self.SCHEMA) is conn
+        assert other[0] is not conn
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        conn.execute('INSERT INTO t VALUES (1)')
+
+    def test_reopened_after_fork(self, tmp_path):
+        """Test a connection inherited from another process isn't reused"""
+        local = threading.local()
+        path = str(tmp_path / 'db.sqlite3')
+        conn = sqlite_connection(local, path, self.SCHEMA)
+
+        with patch('cache.os.getpid', return_value=-1):
+            assert sqlite_connection(local, path, self.SCHEMA) is not conn
+
+    def test_writable_path(self, tmp_path):
+        """Test a path in a missing directory is refused"""
+        path = str(tmp_path / 'db.sqlite3')
+        assert writable_path(path, 'Test store') == path
+        assert writable_path(str(tmp_path / 'missing' / 'db.sqlite3'), 'Test store') is None
+        assert writable_path(None, 'Test store') is None
+
+
+class TestSnapshot:
+    """Tests for saving and restoring caches across restarts"""
+
+    def test_round_trip(self, tmp_path):
+        """Test persistent caches are restored with their remaining TTL and real age"""
+        path = str(tmp_path / 'snapshot.json')
+        ttl = TTLCache(ttl=600, jitter=0, name='test-ttl', persist=True)
+        ttl.set(('a', 1), 'coords')
+        swr = StaleWhileRevalidate(lambda: 'payload', ttl=300, name='test-swr', persist=True)
+        swr.get()
+        save_snapshot(path)
+
+        ttl.clear()
+        swr.clear()
+        with patch('cache.time.time', return_value=time.time() + 100):
+            assert load_snapshot(path) >= 2
+            value, age = swr.get()
+
+        assert ttl.get(('a', 1)) == 'coords'
+        assert value == 'payload'
+        assert 99 <= age <= 110
+
+    def test_non_persistent_caches_skipped(self, tmp_path):
+        """Test caches without persist=True are neither saved nor restored"""
+        path = str(tmp_path / 'snapshot.json')
+        cache = TTLCache(ttl=600, name='test-volatile')
+        cache.set('k', 'v')
+        save_snapshot(path)
+
+        cache.clear()
+        load_snapshot(path)
+        assert cache.get('k') is None
+
+    def test_expired_entries_not_restored(self, tmp_path):
+        """Test entries that expired while the service was down are dropped"""
+        path = str(tmp_path / 'snapshot.json')
+        cache = TTLCache(ttl=10, jitter=0, name='test-expiring', persist=True)
+        cache.set('k', 'v')
+        save_snapshot(path)
+
+        cache.clear()
+        with patch('cache.time.time', return_value=time.time() + 60):
+            load_snapshot(path)
+        assert cache.get('k') is None
+
+    def test_missing_or_corrupt_snapshot(self, tmp_path):
+        """Test a missing or unreadable snapshot is ignored"""
+        assert load_snapshot(str(tmp_path / 'missing.json')) == 0
+
+        corrupt = tmp_path / 'corrupt.json'
+        corrupt.write_text('{not json')
+        assert load_snapshot(str(corrupt)) == 0
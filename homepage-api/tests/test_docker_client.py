@@ -0,0 +1,121 @@
+"""
+Unit tests for the pooled Docker socket client
+"""
+import pytest
+import threading
+from unittest.mock import patch
+
+from docker_client import DockerClient, DockerError
+
+
+@pytest.fixture
+def daemon(docker_daemon):
+    docker_daemon.routes.update({
+        '/info': (200, {'Containers': 5, 'ContainersRunning': 3}),
+        '/version': (200, {'Version': '27.1.1'}),
+    })
+    return docker_daemon
+
+
+@pytest.fixture
+def client(daemon):
+    client = DockerClient(daemon.socket_path, pool_size=2, timeout=5)
+    yield client
+    client.close()
+
+
+class TestDockerClient:
+    """Tests for keep-alive requests to the Docker socket"""
+
+    def test_get_decodes_json(self, client):
+        """Test responses come back as parsed JSON"""
+        assert client.get('/info') == {'Containers': 5, 'ContainersRunning': 3}
+
+    def test_connection_reused(self, client, daemon):
+        """Test sequential calls share one keep-alive connection"""
+        for _ in range(3):
+            client.get('/info')
+
+        assert daemon.connections == 1
+        assert daemon.requests == ['/info'] * 3
+
+    def test_pool_bounded(self, client, daemon):
+        """Test concurrent calls open extra connections but only pool_size stay idle"""
+        barrier = threading.Barrier(4, timeout=5)
+
+        def slow_info(path):
+            barrier.wait()
+            return 200, {}
+
+        daemon.routes['/info'] = slow_info
+        threads = [threading.Thread(target=client.get, args=('/info',)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        assert daemon.connections == 4
+        assert len(client._idle) == 2
+
+    def test_error_status(self, client):
+        """Test daemon errors raise DockerError with the daemon's message"""
+        with pytest.raises(DockerError) as excinfo:
+            client.get('/nope')
+
+        assert excinfo.value.status == 404
+        assert 'page not found' in str(excinfo.value)
+
+    def test_version_cached(self, client, daemon):
+        """Test /version is fetched once per daemon connection"""
+        assert client.version()['Version'] == '27.1.1'
+        assert client.version()['Version'] == '27.1.1'
+
+        assert daemon.requests.count('/version') == 1
+
+    def test_daemon_restart(self, client, daemon):
+        """Test a restarted daemon is reconnected to and its version re-read"""
+        client.version()
+        daemon.stop()
+
+        restarted = type(daemon)(daemon.socket_path)
+        restarted.routes.update({
+            '/info': (200, {'Containers': 0}),
+            '/version': (200, {'Version': '28.0.0'}),
+        })
+        try:
+            assert client.get('/info') == {'Containers': 0}
+            assert client.version()['Version'] == '28.0.0'
+        finally:
+            restarted.stop()
+
+    def test_socket_unavailable(self, tmp_path):
+        """Test a missing socket raises instead of hanging"""
+        client = DockerClient(str(tmp_path / 'missing.sock'))
+
+        with pytest.raises(OSError):
+            client.get('/info')
+
+    def test_new_process_opens_new_connections(self, client, daemon):
+        """Test a forked worker doesn't reuse its parent's sockets"""
+        client.get('/info')
+
+        with patch('docker_client.os.getpid', return_value=-1):
+            client.get('/info')
+
+        assert daemon.connections == 2
+
+    def test_stream(self, client, daemon):
+        """Test a streaming endpoint yields each JSON object as it arrives"""
+        daemon.events.put({'Action': 'start'})
+        daemon.events.put({'Action': 'die'})
+        daemon.events.put(None)
+
+        stream = client.stream('/events')
+        assert list(stream) == [{'Action': 'start'}, {'Action': 'die'}]
+        stream.close()
+
+    def test_stream_error_status(self, client):
+        """Test a stream the daemon refuses raises DockerError"""
+        with pytest.raises(DockerError):
+            client.stream('/nope')
+
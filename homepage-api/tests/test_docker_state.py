@@ -0,0 +1,185 @@
+"""
+Unit tests for the event-driven container model
+"""
+import pytest
+import threading
+import time
+from datetime import datetime, timezone
+
+from docker_client import DockerClient
+from docker_state import ContainerModel, parse_docker_time
+
+STARTED = '2025-01-06T08:00:00.123456789Z'
+
+
+def wait_for(condition, timeout=5):
+    """Poll until condition() is true"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting'
+        time.sleep(0.01)
+
+
+def event(action, container_id='abc123', **attributes):
+    return {
+        'Type': 'container',
+        'Action': action,
+        'Actor': {'ID': container_id, 'Attributes': {'name': 'web', 'image': 'nginx', **attributes}},
+        'time': 1736150400,
+        'timeNano': 1736150400 * 10 ** 9,
+    }
+
+
+@pytest.fixture
+def daemon(docker_daemon):
+    docker_daemon.routes.update({
+        '/containers/json': (200, [
+            {'Id': 'abc123', 'Names': ['/web'], 'Image': 'nginx', 'State': 'running'},
+            {'Id': 'def456', 'Names': ['/backup'], 'Image': 'restic', 'State': 'exited'},
+        ]),
+        '/containers/abc123/json': (200, {'State': {'StartedAt': STARTED, 'Health': {'Status': 'healthy'}}}),
+    })
+    return docker_daemon
+
+
+@pytest.fixture
+def client(daemon):
+    client = DockerClient(daemon.socket_path, timeout=5)
+    yield client
+    client.close()
+
+
+class TestParseDockerTime:
+    """Tests for Engine API timestamps"""
+
+    def test_nanoseconds(self):
+        """Test nanosecond timestamps are parsed to microseconds"""
+        expected = datetime(2025, 1, 6, 8, 0, 0, 123456, tzinfo=timezone.utc).timestamp()
+        assert parse_docker_time(STARTED) == expected
+
+    def test_never(self):
+        """Test Docker's zero time and empty values mean None"""
+        assert parse_docker_time('0001-01-01T00:00:00Z') is None
+        assert parse_docker_time('') is None
+
+
+class TestContainerModel:
+    """Tests for applying listings and events"""
+
+    def test_resync(self, client):
+        """Test a full listing loads states, health and start times"""
+        model = ContainerModel()
+        model.resync(client)
+
+        backup, web = model.containers()
+        assert web['name'] == 'web'
+        assert web['state'] == 'running'
+        assert web['health'] == 'healthy'
+        assert web['started_at'] == parse_docker_time(STARTED)
+        assert backup['state'] == 'exited'
+        assert backup['started_at'] is None
+        assert model.counts() == (1, 2)
+
+    def test_lifecycle_events(self):
+        """Test create/start/die/destroy move a container through its states"""
+        model = ContainerModel()
+
+        model.apply(event('create'))
+        assert model.containers()[0]['state'] == 'created'
+
+        model.apply(event('start'))
+        web = model.containers()[0]
+        assert web['state'] == 'running'
+        assert web['started_at'] == 1736150400
+        assert model.counts() == (1, 1)
+
+        model.apply(event('die', exitCode='0'))
+        assert model.containers()[0]['state'] == 'exited'
+        assert model.counts() == (0, 1)
+
+        model.apply(event('destroy'))
+        assert model.containers() == []
+
+    def test_health_and_rename(self):
+        """Test health_status and rename events update the container"""
+        model = ContainerModel()
+        model.apply(event('start'))
+
+        model.apply(event('health_status: unhealthy'))
+        assert model.containers()[0]['health'] == 'unhealthy'
+
+        model.apply(event('rename', name='frontend', oldName='/web'))
+        assert model.containers()[0]['name'] == 'frontend'
+
+    def test_pause_keeps_start_time(self):
+        """Test pausing and unpausing doesn't reset uptime"""
+        model = ContainerModel()
+        model.apply(event('start'))
+        later = dict(event('unpause'), timeNano=(1736150400 + 60) * 10 ** 9)
+
+        model.apply(event('pause'))
+        assert model.containers()[0]['state'] == 'paused'
+        model.apply(later)
+
+        assert model.containers()[0]['started_at'] == 1736150400
+
+    def test_other_event_types_ignored(self):
+        """Test network, image and exec events don't touch the model"""
+        model = ContainerModel()
+        model.apply({'Type': 'network', 'Action': 'connect', 'Actor': {'ID': 'net1'}})
+        model.apply(event('exec_start: sh'))
+
+        assert model.containers() == []
+
+
+class TestWatch:
+    """Tests for following the daemon's event stream"""
+
+    @pytest.fixture
+    def watching(self, client, daemon):
+        model = ContainerModel()
+        result = []
+        thread = threading.Thread(target=lambda: result.append(model.watch(client)), daemon=True)
+        thread.start()
+        wait_for(lambda: model.live)
+        yield model, result, thread
+        model.close()
+        thread.join(5)
+
+    def test_events_update_model(self, watching, daemon):
+        """Test events arriving on the stream are applied after the resync"""
+        model, _, _ = watching
+        assert model.counts() == (1, 2)
+
+        daemon.events.put(event('start', 'def456', name='backup', image='restic'))
+        wait_for(lambda: model.counts() == (2, 2))
+
+        assert daemon.requests[0].startswith('/events?filters=')
+
+    def test_stream_end_reconnects_quickly(self, watching, daemon):
+        """Test a clean end of stream returns a short reconnect delay"""
+        model, result, thread = watching
+
+        daemon.events.put(None)
+        thread.join(5)
+
+        assert result == [1]
+        assert not model.live
+
+    def test_close_ends_watch(self, watching):
+        """Test close() unblocks a watch waiting on a quiet stream"""
+        model, _, thread = watching
+
+        model.close()
+        thread.join(5)
+
+        assert not thread.is_alive()
+
+    def test_backoff_while_unreachable(self, tmp_path):
+        """Test reconnect delays grow while the daemon can't be reached"""
+        model = ContainerModel()
+        client = DockerClient(str(tmp_path / 'missing.sock'))
+
+        assert model.watch(client) == 2
+        assert model.watch(client) == 4
+        assert not model.live
@@ -0,0 +1,82 @@
+"""
+Tests for serving the app under gunicorn with gunicorn.conf.py
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import pytest
+import requests
+
+HERE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server(tmp_path, docker_daemon):
+    """One gunicorn worker using the repo config, talking to the fake Docker daemon"""
+    port = free_port()
+    env = {
+        key: value for key, value in os.environ.items()
+        # No API keys: background tasks mustn't reach real upstreams
+        if key not in ('TOMTOM_API_KEY', 'TRANSPORT_NSW_API_KEY')
+    }
+    env.update({
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_WORKERS': '1',
+        'DATA_DIR': '',
+        'DOCKER_SOCKET': docker_daemon.socket_path,
+        'PROMETHEUS_MULTIPROC_DIR': str(tmp_path / 'metrics'),
+    })
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            requests.get(f'{url}/api/health', timeout=1)
+            break
+        except requests.ConnectionError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                pytest.fail('gunicorn did not start')
+            time.sleep(0.1)
+
+    yield url
+    process.terminate()
+    process.wait(10)
+
+
+class TestThreadedWorkers:
+    """Tests for the default gthread worker mode"""
+
+    def test_health_answers_while_upstream_blocks(self, server, docker_daemon):
+        """Test a request stuck on an upstream doesn't hold up /api/health in the same worker"""
+        release = threading.Event()
+        blocked = threading.Event()
+
+        def slow_listing(path):
+            if 'all=1' not in path:  # The stats listing, not the event watcher's resync
+                blocked.set()
+                release.wait(10)
+            return 200, []
+        docker_daemon.routes['/containers/json'] = slow_listing
+
+        slow = threading.Thread(target=requests.get, args=(f'{server}/api/docker/stats',), kwargs={'timeout': 15})
+        slow.start()
+        try:
+            assert blocked.wait(10)
+            response = requests.get(f'{server}/api/health', timeout=2)
+            assert response.status_code == 200
+        finally:
+            release.set()
+            slow.join(15)
@@ -0,0 +1,116 @@
+"""
+Unit tests for the Prometheus metrics helpers
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+import requests
+from prometheus_client import REGISTRY
+
+import metrics
+from cache import StaleWhileRevalidate, TTLCache
+
+HERE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestUpstreamCall:
+    """Tests for timing and counting upstream calls"""
+
+    def test_success_is_timed(self):
+        """Test a successful call is observed without counting an error"""
+        before = sample('homepage_api_upstream_request_duration_seconds_count', upstream='test-ok')
+
+        with metrics.upstream_call('test-ok'):
+            pass
+
+        assert sample('homepage_api_upstream_request_duration_seconds_count', upstream='test-ok') == before + 1
+        assert sample('homepage_api_upstream_errors_total', upstream='test-ok', kind='status') == 0
+
+    @pytest.mark.parametrize('exc,kind', [
+        (requests.Timeout('slow'), 'timeout'),
+        (TimeoutError('slow'), 'timeout'),
+        (requests.ConnectionError('refused'), 'connection'),
+        (ConnectionRefusedError('refused'), 'connection'),
+        (ValueError('bad'), 'error'),
+    ])
+    def test_exception_counted_by_kind(self, exc, kind):
+        """Test a raised exception is counted by kind and re-raised"""
+        before = sample('homepage_api_upstream_errors_total', upstream='test-raise', kind=kind)
+
+        with pytest.raises(type(exc)):
+            with metrics.upstream_call('test-raise'):
+                raise exc
+
+        assert sample('homepage_api_upstream_errors_total', upstream='test-raise', kind=kind) == before + 1
+
+    def test_error_status_counted(self):
+        """Test a call that returns an error response is counted as a status error"""
+        with metrics.upstream_call('test-status') as call:
+            call.failed = True
+
+        assert sample('homepage_api_upstream_errors_total', upstream='test-status', kind='status') == 1
+
+
+class TestCacheGauges:
+    """Tests for copying cache counters into gauges"""
+
+    def test_ttl_cache(self):
+        """Test hits, misses and size are reported per cache"""
+        cache = TTLCache(60, name='metrics-test-ttl')
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+
+        metrics.update_cache_gauges()
+
+        assert sample('homepage_api_cache_hits', cache='metrics-test-ttl') == 1
+        assert sample('homepage_api_cache_misses', cache='metrics-test-ttl') == 1
+        assert sample('homepage_api_cache_entries', cache='metrics-test-ttl') == 1
+
+    def test_stale_while_revalidate(self):
+        """Test the served value's age and refresh failures are reported"""
+        refresher = StaleWhileRevalidate(lambda: 'value', ttl=60, name='metrics-test-swr')
+        refresher.get()
+        refresher.last_error = 'upstream down'
+
+        metrics.update_cache_gauges()
+
+        assert sample('homepage_api_cache_entries', cache='metrics-test-swr') == 1
+        assert 0 <= sample('homepage_api_cache_age_seconds', cache='metrics-test-swr') < 5
+        assert sample('homepage_api_cache_refresh_failing', cache='metrics-test-swr') == 1
+
+
+class TestMultiprocess:
+    """Tests for aggregating metrics written by several worker processes"""
+
+    def run(self, directory, code):
+        env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': str(directory)}
+        result = subprocess.run(
+            [sys.executable, '-c', textwrap.dedent(code)],
+            cwd=HERE, env=env, capture_output=True, text=True, timeout=60
+        )
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    def test_counts_summed_across_workers(self, tmp_path):
+        """Test a scrape from one process includes every worker's calls"""
+        for _ in range(2):
+            self.run(tmp_path, """
+                import metrics
+                for _ in range(3):
+                    with metrics.upstream_call('tomtom'):
+                        pass
+            """)
+
+        output = self.run(tmp_path, """
+            import metrics
+            print(metrics.render().decode())
+        """)
+
+        assert 'homepage_api_upstream_request_duration_seconds_count{upstream="tomtom"} 6.0' in output
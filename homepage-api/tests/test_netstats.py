@@ -0,0 +1,123 @@
+"""
+Unit tests for the sysfs interface throughput sampler
+"""
+import errno
+import os
+import pytest
+import shutil
+from unittest.mock import patch
+
+from netstats import COUNTERS, InterfaceSampler
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    """A fake /sys/class/net with a wg0 interface"""
+    (tmp_path / 'wg0' / 'statistics').mkdir(parents=True)
+    return tmp_path
+
+
+def write_counters(sysfs, rx_bytes, tx_bytes, errors=0):
+    values = {'rx_bytes': rx_bytes, 'tx_bytes': tx_bytes, 'rx_packets': rx_bytes // 100,
+              'tx_packets': tx_bytes // 100, 'rx_errors': errors, 'tx_errors': 0}
+    for counter in COUNTERS:
+        (sysfs / 'wg0' / 'statistics' / counter).write_text(f'{values[counter]}\n')
+
+
+def take_samples(sampler, sysfs, readings):
+    """Sample (time, rx_bytes, tx_bytes) readings at the given monotonic times"""
+    for when, rx_bytes, tx_bytes in readings:
+        write_counters(sysfs, rx_bytes, tx_bytes)
+        with patch('netstats.time.monotonic', return_value=when):
+            sampler.sample()
+
+
+class TestInterfaceSampler:
+    """Tests for sampling counters and computing rates"""
+
+    def test_missing_interface(self, tmp_path):
+        """Test no stats while the interface doesn't exist"""
+        sampler = InterfaceSampler('wg0', 1, sysfs=str(tmp_path))
+        sampler.sample()
+
+        assert sampler.stats() is None
+
+    def test_first_sample_has_totals_only(self, sysfs):
+        """Test a single sample gives counter totals but no rates yet"""
+        sampler = InterfaceSampler('wg0', 1, sysfs=str(sysfs))
+        take_samples(sampler, sysfs, [(100, 5000, 700)])
+
+        stats = sampler.stats()
+        assert stats['rx_bytes'] == 5000
+        assert stats['tx_packets'] == 7
+        assert stats['rx_rate'] is None
+        assert stats['rx_peak'] is None
+
+    def test_current_and_peak_rates(self, sysfs):
+        """Test the current rate is the latest interval and the peak the busiest"""
+        sampler = InterfaceSampler('wg0', 1, sysfs=str(sysfs))
+        take_samples(sampler, sysfs, [(100, 0, 0), (101, 5000, 100), (102, 6000, 300)])
+
+        stats = sampler.stats()
+        assert stats['rx_rate'] == 1000
+        assert stats['tx_rate'] == 200
+        assert stats['rx_peak'] == 5000
+        assert stats['tx_peak'] == 200
+
+    def test_window_averages(self, sysfs):
+        """Test 1/5/15 minute averages cover their own windows"""
+        sampler = InterfaceSampler('wg0', 10, sysfs=str(sysfs))
+        # 100 B/s for the first 10 minutes, then 1000 B/s for 5 minutes
+        readings = [(t, 100 * t, 0) for t in range(0, 601, 10)]
+        readings += [(t, 60000 + 1000 * (t - 600), 0) for t in range(610, 901, 10)]
+        take_samples(sampler, sysfs, readings)
+
+        averages = sampler.stats()['averages']
+        assert averages['1m']['rx'] == 1000
+        assert averages['5m']['rx'] == 1000
+        assert averages['15m']['rx'] == pytest.approx((60000 + 300000) / 900)
+
+    def test_ring_buffer_bounded(self, sysfs):
+        """Test the buffer only keeps enough samples for the longest window"""
+        sampler = InterfaceSampler('wg0', 60, sysfs=str(sysfs))
+        take_samples(sampler, sysfs, [(t, t, t) for t in range(0, 3600, 60)])
+
+        assert sampler.stats()['samples'] == 17
+
+    def test_files_opened_once(self, sysfs):
+        """Test counter files stay open and are re-read with pread"""
+        sampler = InterfaceSampler('wg0', 1, sysfs=str(sysfs))
+        write_counters(sysfs, 0, 0)
+
+        with patch('netstats.os.open', wraps=os.open) as mock_open:
+            for _ in range(5):
+                sampler.sample()
+
+        assert mock_open.call_count == len(COUNTERS)
+        sampler.close()
+
+    def test_counter_reset_starts_fresh(self, sysfs):
+        """Test counters going backwards (interface re-created) don't give negative rates"""
+        sampler = InterfaceSampler('wg0', 1, sysfs=str(sysfs))
+        take_samples(sampler, sysfs, [(100, 90000, 0), (101, 100000, 0), (102, 500, 0)])
+
+        stats = sampler.stats()
+        assert stats['samples'] == 1
+        assert stats['rx_rate'] is None
+
+    def test_interface_removed_and_recreated(self, sysfs):
+        """Test history is dropped when the interface goes and resumes when it's back"""
+        sampler = InterfaceSampler('wg0', 1, sysfs=str(sysfs))
+        take_samples(sampler, sysfs, [(100, 1000, 0), (101, 2000, 0)])
+
+        # Reading an open sysfs attribute of a deleted interface fails with ENODEV
+        shutil.rmtree(sysfs / 'wg0')
+        with patch('netstats.os.pread', side_effect=OSError(errno.ENODEV, 'No such device')):
+            sampler.sample()
+        assert sampler.stats() is None
+        sampler.sample()
+        assert sampler.stats() is None
+
+        (sysfs / 'wg0' / 'statistics').mkdir(parents=True)
+        take_samples(sampler, sysfs, [(110, 10, 0)])
+        assert sampler.stats()['rx_bytes'] == 10
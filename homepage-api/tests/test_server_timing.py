@@ -0,0 +1,138 @@
+"""
+Unit tests for Server-Timing request spans
+"""
+from concurrent.futures import ThreadPoolExecutor
+import re
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from flask import Flask, jsonify
+
+import server_timing
+
+
+class SlowSpans(dict):
+    """Spans dict whose iteration pauses between items, so other threads get to record mid-read"""
+
+    def items(self):
+        for item in super().items():
+            time.sleep(0.005)
+            yield item
+
+
+@pytest.fixture
+def timed_app():
+    """A bare Flask app with Server-Timing enabled"""
+    app = Flask(__name__)
+    app.late_stop = threading.Event()
+    server_timing.init_app(app)
+    pool = ThreadPoolExecutor(max_workers=2)
+
+    @app.route('/spans')
+    def spans():
+        with server_timing.span('parse'):
+            pass
+        with server_timing.span('parse'):
+            pass
+        server_timing.record('tomtom', 0.25)
+        return jsonify({'ok': True})
+
+    @app.route('/pool')
+    def in_pool():
+        record = server_timing.propagate(server_timing.record)
+        list(pool.map(record, ['geocode', 'geocode'], [0.1, 0.2]))
+        return jsonify({'ok': True})
+
+    @app.route('/late')
+    def late():
+        # Like a dashboard section that keeps loading after the response is sent
+        timings = server_timing._current.get()
+        timings.spans = SlowSpans(timings.spans)
+        server_timing.record('parse', 0.001)
+        record = server_timing.propagate(server_timing.record)
+
+        def keep_recording():
+            n = 0
+            while not app.late_stop.is_set():
+                record(f'late{n}', 0.001)
+                n += 1
+                time.sleep(0.001)
+        pool.submit(keep_recording)
+        time.sleep(0.01)
+        return jsonify({'ok': True})
+
+    yield app
+    app.late_stop.set()
+    pool.shutdown()
+
+
+def parse_header(value):
+    """Server-Timing header -> {name: (dur, desc)}"""
+    metrics = {}
+    for part in value.split(', '):
+        name, _, params = part.partition(';')
+        dur = re.search(r'dur=([\d.]+)', params)
+        desc = re.search(r'desc="([^"]*)"', params)
+        metrics[name] = (float(dur.group(1)), desc.group(1) if desc else None)
+    return metrics
+
+
+class TestServerTiming:
+    """Tests for collecting spans and emitting the header"""
+
+    def test_header(self, timed_app):
+        """Test spans, serialization and the total are reported"""
+        response = timed_app.test_client().get('/spans')
+
+        metrics = parse_header(response.headers['Server-Timing'])
+        assert list(metrics) == ['parse', 'tomtom', 'serialize', 'total']
+        assert metrics['parse'][1] == '2 calls'
+        assert metrics['tomtom'] == (250.0, None)
+        assert metrics['total'][0] >= metrics['serialize'][0]
+
+    def test_spans_from_pool_threads(self, timed_app):
+        """Test propagated work running in other threads adds to the request's spans"""
+        response = timed_app.test_client().get('/pool')
+
+        metrics = parse_header(response.headers['Server-Timing'])
+        assert metrics['geocode'] == (pytest.approx(300.0), '2 calls')
+
+    def test_requests_are_separate(self, timed_app):
+        """Test each request starts with no spans"""
+        client = timed_app.test_client()
+        client.get('/spans')
+
+        metrics = parse_header(client.get('/spans').headers['Server-Timing'])
+
+        assert metrics['tomtom'] == (250.0, None)
+
+    def test_outside_request(self):
+        """Test spans are a no-op outside a request"""
+        with server_timing.span('parse'):
+            pass
+        server_timing.record('tomtom', 1)
+
+        assert server_timing.propagate(len) is len
+
+    def test_log_line(self, timed_app, caplog):
+        """Test the optional structured log line"""
+        with patch.object(server_timing, 'LOG_SPANS', True):
+            with caplog.at_level('INFO', logger='server_timing'):
+                timed_app.test_client().get('/spans')
+
+        record = next(r for r in caplog.records if r.name == 'server_timing')
+        assert '"path": "/spans"' in record.getMessage()
+        assert '"tomtom": 250.0' in record.getMessage()
+
+    def test_spans_recorded_while_request_finishes(self, timed_app, caplog):
+        """Test the header and log line are safe while a pool thread is still adding spans"""
+        try:
+            with patch.object(server_timing, 'LOG_SPANS', True):
+                with caplog.at_level('INFO', logger='server_timing'):
+                    response = timed_app.test_client().get('/late')
+        finally:
+            timed_app.late_stop.set()
+
+        assert response.status_code == 200
+        assert 'parse;dur=' in response.headers['Server-Timing']
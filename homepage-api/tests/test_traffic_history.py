@@ -0,0 +1,106 @@
+"""
+Unit tests for the traffic travel time history
+"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from traffic_history import TrafficHistory, percentile
+
+# A Monday morning
+MONDAY_8AM = datetime(2025, 1, 6, 8, 0)
+
+
+@pytest.fixture
+def history(tmp_path):
+    return TrafficHistory(str(tmp_path / 'history.sqlite3'), bucket_minutes=15, retention_days=56)
+
+
+class TestPercentile:
+    """Tests for the nearest-rank percentile"""
+
+    def test_nearest_rank(self):
+        """Test percentiles pick an actual sample"""
+        values = list(range(1, 11))
+        assert percentile(values, 50) == 5
+        assert percentile(values, 90) == 9
+        assert percentile(values, 100) == 10
+
+    def test_single_and_empty(self):
+        """Test edge cases"""
+        assert percentile([7], 90) == 7
+        assert percentile([], 50) is None
+
+
+class TestTrafficHistory:
+    """Tests for recording samples and reading typical times"""
+
+    def test_typical_for_bucket(self, history):
+        """Test p50/p90 over the samples in the same weekday and bucket"""
+        for week in range(10):
+            when = MONDAY_8AM - timedelta(weeks=week) + timedelta(minutes=week)
+            history.record('home|work', 1200 + week * 60, week * 30, 20000, when=when)
+
+        typical = history.typical('home|work', MONDAY_8AM + timedelta(minutes=7))
+        assert typical['samples'] == 10
+        assert typical['p50TravelSeconds'] == 1440
+        assert typical['p90TravelSeconds'] == 1680
+        assert typical['p50DelaySeconds'] == 120
+
+    def test_other_buckets_and_routes_excluded(self, history):
+        """Test samples from another time, weekday or route don't count"""
+        history.record('home|work', 1200, 0, 20000, when=MONDAY_8AM)
+        history.record('home|work', 9999, 0, 20000, when=MONDAY_8AM + timedelta(minutes=15))
+        history.record('home|work', 9999, 0, 20000, when=MONDAY_8AM + timedelta(days=1))
+        history.record('home|gym', 9999, 0, 20000, when=MONDAY_8AM)
+
+        typical = history.typical('home|work', MONDAY_8AM)
+        assert typical['samples'] == 1
+        assert typical['p90TravelSeconds'] == 1200
+
+    def test_no_samples(self, history):
+        """Test None when a bucket has no history yet"""
+        assert history.typical('home|work', MONDAY_8AM) is None
+
+    def test_bucket_bounds(self, history):
+        """Test times are grouped into fixed time-of-day buckets"""
+        start, end = history.bucket(datetime(2025, 1, 6, 23, 52, 10))
+        assert start == datetime(2025, 1, 6, 23, 45)
+        assert end == datetime(2025, 1, 7, 0, 0)
+
+    def test_old_samples_pruned(self, history):
+        """Test samples older than the retention period are dropped on write"""
+        history.record('home|work', 1200, 0, 20000, when=MONDAY_8AM - timedelta(weeks=10))
+        history.record('home|work', 1300, 0, 20000, when=MONDAY_8AM)
+
+        with patch('traffic_history.time.time', return_value=MONDAY_8AM.timestamp()):
+            history.prune()
+
+        assert history.typical('home|work', MONDAY_8AM)['samples'] == 1
+
+    def test_prune_runs_periodically(self, history):
+        """Test record() prunes on its own so the file stays bounded"""
+        with patch.object(history, 'prune') as mock_prune:
+            for _ in range(TrafficHistory.PRUNE_EVERY):
+                history.record('home|work', 1200, 0, 20000)
+
+        assert mock_prune.call_count == 1
+
+    def test_shared_between_instances(self, history):
+        """Test samples written by one worker are read by another"""
+        history.record('home|work', 1200, 0, 20000, when=MONDAY_8AM)
+
+        assert TrafficHistory(history.path).typical('home|work', MONDAY_8AM)['samples'] == 1
+
+    def test_disabled_without_path(self):
+        """Test a history without a path records nothing"""
+        history = TrafficHistory(None)
+
+        assert not history.enabled
+        history.record('home|work', 1200, 0, 20000)
+        assert history.typical('home|work') is None
+
+    def test_disabled_when_directory_not_writable(self, tmp_path):
+        """Test an unusable data directory disables the history instead of failing"""
+        history = TrafficHistory(str(tmp_path / 'missing' / 'history.sqlite3'))
+        assert not history.enabled
@@ -3,7 +3,7 @@ Unit tests for traffic scheduler module
 """
 import pytest
 from unittest.mock import patch
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
 # Import after setting environment variables in conftest
@@ -209,3 +209,118 @@ class TestGetActiveRoutes:
         assert len(routes) == 1
         # Check that is_route_active was called with default schedule
         mock_is_active.assert_called_with('Daily 00:00-23:59')
+
+
+class TestGetConfiguredRoutes:
+    """Tests for get_configured_routes function"""
+
+    @patch.dict(os.environ, {
+        'TRAFFIC_ROUTE_1_NAME': 'Morning Commute',
+        'TRAFFIC_ROUTE_1_ORIGIN': 'Home',
+        'TRAFFIC_ROUTE_1_DESTINATION': 'Work',
+        'TRAFFIC_ROUTE_1_SCHEDULE': 'Mon-Fri 07:00-09:00',
+        'TRAFFIC_ROUTE_2_NAME': 'Evening Commute',
+        'TRAFFIC_ROUTE_2_ORIGIN': 'Work',
+        'TRAFFIC_ROUTE_2_DESTINATION': 'Home',
+    })
+    @patch('traffic_scheduler.is_route_active', return_value=False)
+    def test_returns_routes_regardless_of_schedule(self, mock_is_active):
+        """Test every configured route is returned, active or not"""
+        routes = traffic_scheduler.get_configured_routes()
+
+        assert [r['name'] for r in routes] == ['Morning Commute', 'Evening Commute']
+        assert routes[1]['schedule'] == 'Daily 00:00-23:59'
+        mock_is_active.assert_not_called()
+
+    @patch.dict(os.environ, {
+        'TRAFFIC_ROUTE_1_NAME': 'First',
+        'TRAFFIC_ROUTE_3_NAME': 'After a gap',
+    })
+    def test_stops_at_first_gap(self):
+        """Test numbering stops at the first missing route"""
+        routes = traffic_scheduler.get_configured_routes()
+
+        assert [r['name'] for r in routes] == ['First']
+
+
+class TestCompiledSchedule:
+    """Tests for compiled schedule lookups"""
+
+    @pytest.mark.parametrize('schedule', [
+        'Mon-Fri 07:00-09:00',
+        'Sat-Sun 10:00-18:00',
+        'Wed 23:30-23:59',
+        'Daily 00:00-23:59',
+        'Mon-Fri 17:00-08:00',  # start after end is never active
+    ])
+    def test_matches_string_comparison(self, schedule):
+        """Test the bitmap check agrees with comparing HH:MM strings"""
+        days, start, end = traffic_scheduler.parse_schedule(schedule)
+        compiled = traffic_scheduler.compile_schedule(schedule)
+
+        when = datetime(2025, 10, 27)  # Monday
+        while when < datetime(2025, 11, 3):
+            expected = when.weekday() in days and start <= when.strftime('%H:%M') <= end
+            assert compiled.is_active(when) == expected, when
+            when += timedelta(minutes=7)
+
+    def test_invalid_schedule_always_active(self):
+        """Test invalid or missing schedules compile to always active"""
+        for schedule in ('', 'Invalid Format'):
+            compiled = traffic_scheduler.compile_schedule(schedule)
+            assert compiled.is_active(datetime(2025, 10, 27, 3, 0))
+            assert compiled.next_transition(datetime(2025, 10, 27, 3, 0)) is None
+
+    def test_next_transition_end_of_window(self):
+        """Test the next change inside a window is the minute after it ends"""
+        compiled = traffic_scheduler.compile_schedule('Mon-Fri 07:00-09:00')
+
+        assert compiled.next_transition(datetime(2025, 10, 27, 8, 30, 15)) == datetime(2025, 10, 27, 9, 1)
+
+    def test_next_transition_wraps_weekend(self):
+        """Test the next change after Friday's window is Monday's start"""
+        compiled = traffic_scheduler.compile_schedule('Mon-Fri 07:00-09:00')
+
+        assert compiled.next_transition(datetime(2025, 10, 31, 12, 0)) == datetime(2025, 11, 3, 7, 0)
+
+    def test_next_transition_skips_midnight_between_full_days(self):
+        """Test consecutive all-day days don't report a change at midnight"""
+        compiled = traffic_scheduler.compile_schedule('Sat-Sun 00:00-23:59')
+
+        assert compiled.next_transition(datetime(2025, 11, 1, 12, 0)) == datetime(2025, 11, 3, 0, 0)
+
+    def test_daily_all_day_never_changes(self):
+        """Test a schedule covering the whole week has no transitions"""
+        compiled = traffic_scheduler.compile_schedule('Daily 00:00-23:59')
+
+        assert compiled.next_transition(datetime(2025, 10, 27, 12, 0)) is None
+
+
+class TestRouteTable:
+    """Tests for the compiled route table"""
+
+    @patch.dict(os.environ, {
+        'TRAFFIC_ROUTE_1_NAME': 'Morning Commute',
+        'TRAFFIC_ROUTE_1_SCHEDULE': 'Mon-Fri 07:00-09:00',
+        'TRAFFIC_ROUTE_2_NAME': 'Evening Commute',
+        'TRAFFIC_ROUTE_2_SCHEDULE': 'Mon-Fri 17:00-19:00',
+    })
+    def test_next_active_change_across_routes(self):
+        """Test the next change is the earliest change of any route"""
+        assert traffic_scheduler.next_active_change(datetime(2025, 10, 27, 10, 0)) == datetime(2025, 10, 27, 17, 0)
+        assert traffic_scheduler.next_active_change(datetime(2025, 10, 27, 18, 0)) == datetime(2025, 10, 27, 19, 1)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_no_routes_never_change(self):
+        """Test no configured routes means no next change"""
+        assert traffic_scheduler.next_active_change(datetime(2025, 10, 27, 10, 0)) is None
+
+    @patch.dict(os.environ, {'TRAFFIC_ROUTE_1_NAME': 'Morning Commute'})
+    def test_environment_read_once(self):
+        """Test routes are compiled once rather than re-read on every call"""
+        traffic_scheduler.get_active_routes()
+
+        with patch.dict(os.environ, {'TRAFFIC_ROUTE_2_NAME': 'Added later'}):
+            routes = traffic_scheduler.get_active_routes()
+
+        assert [r['name'] for r in routes] == ['Morning Commute']
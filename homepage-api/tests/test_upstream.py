@@ -0,0 +1,68 @@
+"""
+Unit tests for pooled upstream HTTP sessions
+"""
+import pytest
+from unittest.mock import patch
+
+import upstream
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    """Give every test its own session pools"""
+    upstream.close_all()
+    yield
+    upstream.close_all()
+
+
+class TestSessions:
+    """Tests for per-upstream session management"""
+
+    def test_session_reused_per_upstream(self):
+        """Test repeated lookups return the same pooled session"""
+        assert upstream.session('tfnsw') is upstream.session('tfnsw')
+
+    def test_sessions_separate_per_upstream(self):
+        """Test each upstream gets its own connection pool"""
+        assert upstream.session('tfnsw') is not upstream.session('tomtom')
+
+    def test_adapter_pool_and_retry_config(self):
+        """Test sessions keep connections alive and retry idempotent requests"""
+        adapter = upstream.session('tomtom').get_adapter('https://api.tomtom.com/')
+
+        assert adapter._pool_maxsize == upstream.POOL_MAXSIZE
+        retry = adapter.max_retries
+        assert retry.total == upstream.RETRIES
+        assert retry.backoff_factor == upstream.RETRY_BACKOFF
+        assert 503 in retry.status_forcelist
+        assert 429 not in retry.status_forcelist
+        assert 'GET' in retry.allowed_methods
+        assert 'POST' not in retry.allowed_methods
+
+    def test_no_retry_session(self):
+        """Test retry=False gives a separate pool with retries disabled"""
+        no_retry = upstream.session('tomtom', retry=False)
+
+        assert no_retry is not upstream.session('tomtom')
+        assert no_retry.get_adapter('https://api.tomtom.com/').max_retries.total == 0
+
+    def test_new_process_gets_new_sessions(self):
+        """Test a forked worker doesn't reuse its parent's connections"""
+        parent_session = upstream.session('tfnsw')
+
+        with patch('upstream.os.getpid', return_value=-1):
+            assert upstream.session('tfnsw') is not parent_session
+
+    def test_get_uses_upstream_session(self):
+        """Test get() goes through the named upstream's session"""
+        with patch.object(upstream.session('tfnsw'), 'get') as mock_get:
+            upstream.get('tfnsw', 'https://example.com/', timeout=5)
+
+        mock_get.assert_called_once_with('https://example.com/', timeout=5)
+
+    def test_post_uses_upstream_session(self):
+        """Test post() goes through the named upstream's session"""
+        with patch.object(upstream.session('tomtom'), 'post') as mock_post:
+            upstream.post('tomtom', 'https://example.com/', json={'a': 1})
+
+        mock_post.assert_called_once_with('https://example.com/', json={'a': 1})
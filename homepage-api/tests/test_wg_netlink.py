@@ -0,0 +1,153 @@
+"""
+Unit tests for the WireGuard generic netlink client
+Replies come from recorded netlink datagrams in fixtures/wg_netlink
+"""
+import base64
+import errno
+import os
+import struct
+import pytest
+
+import wg_netlink
+from wg_netlink import NetlinkError, WireGuardNetlink, iter_attrs, parse_device
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'wg_netlink')
+
+KEY_A = base64.b64encode(bytes([1]) * 32).decode()
+KEY_B = base64.b64encode(bytes([2]) * 32).decode()
+
+
+def load(name):
+    """Read a fixture as a list of datagrams"""
+    with open(os.path.join(FIXTURES, f'{name}.hex')) as f:
+        return [bytes.fromhex(line) for line in f.read().splitlines() if line and not line.startswith('#')]
+
+
+class FakeNetlinkSocket:
+    """Netlink socket that records what is sent and replies with queued datagrams"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.sent = []
+        self.bound = None
+        self.closed = False
+
+    def bind(self, address):
+        self.bound = address
+
+    def send(self, data):
+        self.sent.append(data)
+        return len(data)
+
+    def recv(self, size):
+        return self.replies.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+class TestParsing:
+    """Tests for decoding recorded dump replies"""
+
+    def test_device(self):
+        """Test device attributes are decoded"""
+        device = parse_device(load('wg0_dump'))
+
+        assert device['interface'] == 'wg0'
+        assert device['ifindex'] == 7
+        assert device['listen_port'] == 51820
+        assert device['public_key'] == base64.b64encode(bytes([9]) * 32).decode()
+
+    def test_peer_stats(self):
+        """Test handshake, endpoint and transfer totals for a peer"""
+        peer = parse_device(load('wg0_dump'))['peers'][0]
+
+        assert peer['public_key'] == KEY_A
+        assert peer['endpoint'] == '203.0.113.5:51820'
+        assert peer['last_handshake'] == 1700000000.5
+        assert peer['rx_bytes'] == 123456789
+        assert peer['tx_bytes'] == 987654321
+        assert peer['persistent_keepalive'] == 25
+        assert peer['allowed_ips'] == ['10.13.13.2/32']
+
+    def test_peer_never_connected(self):
+        """Test a zero handshake time and keepalive are reported as None"""
+        peer = parse_device(load('wg0_dump'))['peers'][1]
+
+        assert peer['endpoint'] == '[2001:db8::7]:40000'
+        assert peer['last_handshake'] is None
+        assert peer['persistent_keepalive'] is None
+
+    def test_peer_split_across_messages(self):
+        """Test a peer continued in the next message is merged, not duplicated"""
+        peers = parse_device(load('wg0_dump'))['peers']
+
+        assert [p['public_key'] for p in peers] == [KEY_A, KEY_B]
+        assert peers[1]['allowed_ips'] == ['10.13.13.3/32', 'fd00::3/128']
+        assert peers[1]['tx_bytes'] == 2048
+
+    def test_attributes_are_views(self):
+        """Test attribute payloads are slices of the received buffer, not copies"""
+        buffer = memoryview(load('wg0_dump')[0])
+        payload = buffer[wg_netlink.NLMSGHDR.size + wg_netlink.GENLMSGHDR.size:]
+
+        for _, value in iter_attrs(payload):
+            assert isinstance(value, memoryview)
+            assert value.obj is buffer.obj
+
+    def test_truncated_attribute(self):
+        """Test an attribute running past the buffer is rejected"""
+        with pytest.raises(ValueError):
+            list(iter_attrs(memoryview(struct.pack('=HH', 64, 1) + b'\0' * 4)))
+
+    def test_error_reply(self):
+        """Test an NLMSG_ERROR reply raises with its errno"""
+        with pytest.raises(NetlinkError) as e:
+            parse_device(load('wg0_enodev'))
+
+        assert e.value.errno == errno.ENODEV
+
+
+class TestWireGuardNetlink:
+    """Tests for the request/reply exchange with the kernel"""
+
+    def test_get_device(self):
+        """Test the family is resolved, then wg0 dumped in one request"""
+        sock = FakeNetlinkSocket(load('family') + load('wg0_dump'))
+        device = WireGuardNetlink(lambda: sock).get_device('wg0')
+
+        assert len(device['peers']) == 2
+        assert len(sock.sent) == 2
+        _, family, flags, _, _ = wg_netlink.NLMSGHDR.unpack_from(sock.sent[1])
+        assert family == 0x15
+        assert flags & wg_netlink.NLM_F_DUMP == wg_netlink.NLM_F_DUMP
+        assert b'wg0\0' in sock.sent[1]
+
+    def test_family_cached(self):
+        """Test the family id lookup happens once per socket"""
+        sock = FakeNetlinkSocket(load('family') + load('wg0_dump') + load('wg0_dump'))
+        client = WireGuardNetlink(lambda: sock)
+
+        client.get_device('wg0')
+        client.get_device('wg0')
+
+        assert len(sock.sent) == 3
+
+    def test_missing_interface(self):
+        """Test ENODEV is raised and the socket closed"""
+        sock = FakeNetlinkSocket(load('family') + load('wg0_enodev'))
+        client = WireGuardNetlink(lambda: sock)
+
+        with pytest.raises(NetlinkError) as e:
+            client.get_device('wg0')
+
+        assert e.value.errno == errno.ENODEV
+        assert sock.closed
+
+    def test_socket_unavailable(self):
+        """Test a socket that can't be opened surfaces as OSError"""
+        def refuse():
+            raise PermissionError(errno.EPERM, 'Operation not permitted')
+
+        with pytest.raises(PermissionError):
+            WireGuardNetlink(refuse).get_device('wg0')
@@ -0,0 +1,132 @@
+"""
+Travel time history for traffic routes
+Every fresh TomTom result is kept as a sample in SQLite on the /data volume,
+so the API can say what a route typically takes at this time of the week
+"""
+
+from datetime import datetime, timedelta
+import math
+import threading
+import time
+
+from cache import sqlite_connection, writable_path
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minute_of_week(when):
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list (None if it's empty)"""
+    if not values:
+        return None
+    return values[max(math.ceil(pct / 100 * len(values)) - 1, 0)]
+
+
+class TrafficHistory:
+    """
+    Append-only store of travel time samples per route
+
+    Samples are indexed by route and minute of the week, so typical() reads
+    only the rows for one time-of-day bucket on one weekday. Samples older
+    than retention_days are pruned as new ones are written, which bounds the
+    file to a few weeks of polls. Nothing is held in memory. If path is None,
+    or its directory isn't writable, recording is a no-op and typical()
+    returns None.
+    """
+
+    # Prune old samples every this many writes
+    PRUNE_EVERY = 100
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS samples ('
+        'route TEXT NOT NULL, ts INTEGER NOT NULL, minute_of_week INTEGER NOT NULL, '
+        'travel_seconds INTEGER NOT NULL, delay_seconds INTEGER NOT NULL, '
+        'length_meters INTEGER NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS samples_by_slot ON samples (route, minute_of_week)',
+        'CREATE INDEX IF NOT EXISTS samples_by_age ON samples (ts)',
+    )
+
+    def __init__(self, path, bucket_minutes=15, retention_days=56):
+        self.path = writable_path(path, 'Traffic history')
+        self.bucket_minutes = bucket_minutes
+        self.retention_days = retention_days
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def _conn(self):
+        return sqlite_connection(self._local, self.path, self.SCHEMA)
+
+    def record(self, route, travel_seconds, delay_seconds, length_meters, when=None):
+        """Store one sample for a route (when defaults to now, local time)"""
+        if not self.enabled:
+            return
+        when = when or datetime.now()
+        conn = self._conn()
+        conn.execute(
+            'INSERT INTO samples (route, ts, minute_of_week, travel_seconds, delay_seconds, length_meters) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (route, int(when.timestamp()), _minute_of_week(when),
+             int(travel_seconds), int(delay_seconds), int(length_meters))
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Delete samples older than the retention period"""
+        if self.enabled:
+            cutoff = time.time() - self.retention_days * 86400
+            self._conn().execute('DELETE FROM samples WHERE ts < ?', (int(cutoff),))
+
+    def bucket(self, when):
+        """
+        The time-of-day bucket containing a time
+
+        Returns:
+            tuple: (start, end) datetimes of the bucket
+        """
+        minute = (when.hour * 60 + when.minute) // self.bucket_minutes * self.bucket_minutes
+        start = when.replace(hour=minute // 60, minute=minute % 60, second=0, microsecond=0)
+        return start, start + timedelta(minutes=self.bucket_minutes)
+
+    def typical(self, route, when=None):
+        """
+        Typical travel time for a route in the weekday and time-of-day bucket of when
+
+        Returns:
+            dict: p50/p90 travel time and delay in seconds plus the sample
+            count, or None if there are no samples for that bucket
+        """
+        if not self.enabled:
+            return None
+        start, _ = self.bucket(when or datetime.now())
+        first = _minute_of_week(start)
+        rows = self._conn().execute(
+            'SELECT travel_seconds, delay_seconds FROM samples '
+            'WHERE route = ? AND minute_of_week >= ? AND minute_of_week < ?',
+            (route, first, first + self.bucket_minutes)
+        ).fetchall()
+        if not rows:
+            return None
+
+        travel = sorted(row[0] for row in rows)
+        delay = sorted(row[1] for row in rows)
+        return {
+            'p50TravelSeconds': percentile(travel, 50),
+            'p90TravelSeconds': percentile(travel, 90),
+            'p50DelaySeconds': percentile(delay, 50),
+            'p90DelaySeconds': percentile(delay, 90),
+            'samples': len(rows)
+        }
+
+    def clear(self):
+        """Remove every sample"""
+        if self.enabled:
+            self._conn().execute('DELETE FROM samples')
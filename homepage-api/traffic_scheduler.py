@@ -3,10 +3,19 @@ Traffic route scheduler for Homepage
 Determines which routes to show based on schedule configuration
 """
 
-from datetime import datetime
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
 import os
 import re
 
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Schedule format: "Mon-Fri 07:00-09:00" or "Daily 00:00-23:59"
+SCHEDULE_PATTERN = re.compile(r'([\w-]+)\s+(\d{2}:\d{2})-(\d{2}:\d{2})')
+DAY_INDEX = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+
 
 def parse_schedule(schedule_string):
     """
@@ -27,9 +36,7 @@ def parse_schedule(schedule_string):
     if not schedule_string:
         return None
 
-    # Parse format: "Mon-Fri 07:00-09:00" or "Daily 00:00-23:59"
-    pattern = r'([\w-]+)\s+(\d{2}:\d{2})-(\d{2}:\d{2})'
-    match = re.match(pattern, schedule_string)
+    match = SCHEDULE_PATTERN.match(schedule_string)
 
     if not match:
         return None
@@ -41,19 +48,92 @@ def parse_schedule(schedule_string):
         days = list(range(7))  # 0-6 (Monday-Sunday)
     elif '-' in days_str:
         # Parse "Mon-Fri"
-        day_map = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
         start_day, end_day = days_str.lower().split('-')
-        start_idx = day_map.get(start_day, 0)
-        end_idx = day_map.get(end_day, 4)
+        start_idx = DAY_INDEX.get(start_day, 0)
+        end_idx = DAY_INDEX.get(end_day, 4)
         days = list(range(start_idx, end_idx + 1))
     else:
         # Single day
-        day_map = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
-        days = [day_map.get(days_str.lower(), 0)]
+        days = [DAY_INDEX.get(days_str.lower(), 0)]
 
     return days, start_time, end_time
 
 
+def _minute_of_day(hhmm):
+    hours, minutes = hhmm.split(':')
+    return min(int(hours) * 60 + int(minutes), MINUTES_PER_DAY - 1)
+
+
+class Schedule:
+    """
+    A schedule compiled for fast lookups
+
+    Active minutes are held as one bitmap per weekday (bit n = minute n of
+    the day, end minute inclusive), so checking a time is a shift and a mask.
+    The minutes of the week at which the schedule switches on or off are kept
+    sorted, so the next change is a binary search.
+    """
+
+    __slots__ = ('day_masks', 'transitions')
+
+    def __init__(self, day_masks):
+        self.day_masks = tuple(day_masks)
+
+        # Candidate changes are the edges of each day's active range; keep the
+        # ones where the state really flips (e.g. not midnight between two
+        # all-day days)
+        candidates = set()
+        for day, mask in enumerate(self.day_masks):
+            if mask:
+                first = (mask & -mask).bit_length() - 1
+                candidates.add(day * MINUTES_PER_DAY + first)
+                candidates.add((day * MINUTES_PER_DAY + mask.bit_length()) % MINUTES_PER_WEEK)
+        self.transitions = tuple(sorted(
+            m for m in candidates if self._active_at(m) != self._active_at(m - 1)
+        ))
+
+    @classmethod
+    def compile(cls, schedule_string):
+        """Compile a schedule string; missing or invalid schedules are always active"""
+        parsed = parse_schedule(schedule_string)
+        if not parsed:
+            return cls([(1 << MINUTES_PER_DAY) - 1] * 7)
+
+        days, start_time, end_time = parsed
+        start, end = _minute_of_day(start_time), _minute_of_day(end_time)
+        mask = ((1 << (end - start + 1)) - 1) << start if start <= end else 0
+        return cls([mask if day in days else 0 for day in range(7)])
+
+    def _active_at(self, minute_of_week):
+        minute_of_week %= MINUTES_PER_WEEK
+        day, minute = divmod(minute_of_week, MINUTES_PER_DAY)
+        return (self.day_masks[day] >> minute) & 1 == 1
+
+    def is_active(self, when):
+        """Check whether the schedule includes a datetime (to the minute)"""
+        return (self.day_masks[when.weekday()] >> (when.hour * 60 + when.minute)) & 1 == 1
+
+    def next_transition(self, when):
+        """Get the datetime at which is_active() next changes, or None if it never does"""
+        return _next_transition(self.transitions, when)
+
+
+def _next_transition(transitions, when):
+    """Find the first of a sorted list of week-minute transitions after a datetime"""
+    if not transitions:
+        return None
+    now = when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+    i = bisect_right(transitions, now)
+    target = transitions[i] if i < len(transitions) else transitions[0] + MINUTES_PER_WEEK
+    return when.replace(second=0, microsecond=0) + timedelta(minutes=target - now)
+
+
+@lru_cache(maxsize=64)
+def compile_schedule(schedule_string):
+    """Get the compiled Schedule for a schedule string (compiled once per string)"""
+    return Schedule.compile(schedule_string)
+
+
 def is_route_active(schedule_string):
     """
     Check if route should be shown based on schedule
@@ -70,28 +150,77 @@ def is_route_active(schedule_string):
         >>> is_route_active("")  # No schedule = always active
         True
     """
-    if not schedule_string:
-        return True  # Always show if no schedule
+    return compile_schedule(schedule_string or '').is_active(datetime.now())
 
-    parsed = parse_schedule(schedule_string)
-    if not parsed:
-        return True
 
-    days, start_time, end_time = parsed
+def get_configured_routes():
+    """
+    Get every configured traffic route, regardless of schedule
 
-    now = datetime.now()
-    current_day = now.weekday()  # 0=Monday, 6=Sunday
-    current_time = now.strftime('%H:%M')
+    Returns:
+        list: List of route configuration dicts with keys:
+            - name: Route display name
+            - origin: Starting address
+            - destination: Ending address
+            - route_num: Route number (for reference)
+            - schedule: Schedule string (defaults to "Daily 00:00-23:59")
+    """
+    routes = []
+
+    # Routes are numbered from 1 with no gaps
+    route_num = 1
+    while True:
+        route_name = os.getenv(f'TRAFFIC_ROUTE_{route_num}_NAME')
+        if not route_name:
+            break
+
+        routes.append({
+            'name': route_name,
+            'origin': os.getenv(f'TRAFFIC_ROUTE_{route_num}_ORIGIN'),
+            'destination': os.getenv(f'TRAFFIC_ROUTE_{route_num}_DESTINATION'),
+            'route_num': route_num,
+            'schedule': os.getenv(f'TRAFFIC_ROUTE_{route_num}_SCHEDULE', 'Daily 00:00-23:59')
+        })
+
+        route_num += 1
 
-    # Check if current day is in schedule
-    if current_day not in days:
-        return False
+    return routes
 
-    # Check if current time is in range
-    if start_time <= current_time <= end_time:
-        return True
 
-    return False
+class RouteTable:
+    """Configured routes with their schedules compiled"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.schedules = [compile_schedule(route['schedule']) for route in routes]
+        self.transitions = tuple(sorted({t for sched in self.schedules for t in sched.transitions}))
+
+    def next_change(self, when):
+        """Get the datetime at which the set of active routes next changes, or None"""
+        return _next_transition(self.transitions, when)
+
+
+@lru_cache(maxsize=1)
+def load_route_table():
+    """
+    Get the configured routes and compiled schedules.
+    Read from the environment once; call load_route_table.cache_clear() to reload.
+    """
+    return RouteTable(get_configured_routes())
+
+
+def next_active_change(now=None):
+    """
+    Get when the set of active routes next changes
+
+    Args:
+        now: Time to search from (defaults to now)
+
+    Returns:
+        datetime: Start of the minute at which a route becomes active or
+        inactive, or None if no configured route ever changes state
+    """
+    return load_route_table().next_change(now or datetime.now())
 
 
 def get_active_routes():
@@ -99,12 +228,8 @@ def get_active_routes():
     Get list of active traffic routes based on schedule
 
     Returns:
-        list: List of route configuration dicts with keys:
-            - name: Route display name
-            - origin: Starting address
-            - destination: Ending address
-            - route_num: Route number (for reference)
-            - schedule: Schedule string
+        list: Route configuration dicts (see get_configured_routes) for the
+        routes whose schedule includes the current time
 
     Examples:
         Environment:
@@ -118,26 +243,4 @@ def get_active_routes():
               'destination': 'Work', 'route_num': 1,
               'schedule': 'Mon-Fri 07:00-09:00'}]
     """
-    active_routes = []
-
-    # Check each configured route
-    route_num = 1
-    while True:
-        route_name = os.getenv(f'TRAFFIC_ROUTE_{route_num}_NAME')
-        if not route_name:
-            break
-
-        schedule = os.getenv(f'TRAFFIC_ROUTE_{route_num}_SCHEDULE', 'Daily 00:00-23:59')
-
-        if is_route_active(schedule):
-            active_routes.append({
-                'name': route_name,
-                'origin': os.getenv(f'TRAFFIC_ROUTE_{route_num}_ORIGIN'),
-                'destination': os.getenv(f'TRAFFIC_ROUTE_{route_num}_DESTINATION'),
-                'route_num': route_num,
-                'schedule': schedule
-            })
-
-        route_num += 1
-
-    return active_routes
+    return [dict(route) for route in load_route_table().routes if is_route_active(route['schedule'])]
@@ -0,0 +1,89 @@
+"""
+Pooled HTTP sessions for upstream APIs (Transport NSW, TomTom)
+One keep-alive requests.Session per upstream and worker, so repeat calls
+reuse an open connection instead of paying a fresh TCP+TLS handshake
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+# Idle keep-alive connections kept per upstream host in each worker. Should
+# cover the threads that can call one upstream at once (batch fetches use 8).
+POOL_MAXSIZE = int(os.getenv('UPSTREAM_POOL_MAXSIZE', '8'))
+
+# Retries for idempotent requests on connection errors and 5xx responses
+RETRIES = int(os.getenv('UPSTREAM_RETRIES', '2'))
+RETRY_BACKOFF = float(os.getenv('UPSTREAM_RETRY_BACKOFF', '0.3'))
+
+# 429 is deliberately absent: retrying a quota error only burns more quota
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_sessions = {}
+_lock = threading.Lock()
+_pid = None
+
+
+def _new_session(retries=RETRIES):
+    retry = Retry(
+        total=retries,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False  # Hand the last response back for raise_for_status()
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def session(name, retry=True):
+    """
+    Get the pooled session for an upstream, creating it on first use
+
+    Sessions are per process: a worker forked from a parent that already
+    opened connections starts with fresh pools rather than sharing sockets.
+    retry=False gives a separate pool that never retries, for calls whose
+    timeout is what's left of a deadline and so can't afford a second attempt.
+    """
+    global _pid
+    with _lock:
+        if _pid != os.getpid():
+            _sessions.clear()
+            _pid = os.getpid()
+        key = (name, retry)
+        if key not in _sessions:
+            _sessions[key] = _new_session(RETRIES if retry else 0)
+        return _sessions[key]
+
+
+def get(name, url, retry=True, **kwargs):
+    """GET a URL through an upstream's pooled session (same arguments as requests.get)"""
+    with metrics.upstream_call(name) as call:
+        response = session(name, retry).get(url, **kwargs)
+        call.failed = not response.ok
+    return response
+
+
+def post(name, url, **kwargs):
+    """POST through an upstream's pooled session (never retried, same arguments as requests.post)"""
+    with metrics.upstream_call(name) as call:
+        response = session(name).post(url, **kwargs)
+        call.failed = not response.ok
+    return response
+
+
+def close_all():
+    """Close every pooled connection in this process"""
+    with _lock:
+        for pooled in _sessions.values():
+            pooled.close()
+        _sessions.clear()
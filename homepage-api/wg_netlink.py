@@ -0,0 +1,298 @@
+"""
+WireGuard peer stats over generic netlink
+Speaks the kernel's "wireguard" genetlink family directly, so peers can be
+listed without the wg CLI. One WG_CMD_GET_DEVICE dump returns every peer;
+replies are parsed in place over a memoryview rather than copying each
+attribute out.
+
+Reading a device needs CAP_NET_ADMIN in the network namespace that owns it.
+"""
+
+import base64
+import errno
+import ipaddress
+import os
+import socket
+import struct
+import threading
+
+NETLINK_GENERIC = 16
+
+# Netlink message types and flags
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+
+# Attribute type flags
+NLA_F_NESTED = 0x8000
+NLA_F_NET_BYTEORDER = 0x4000
+NLA_TYPE_MASK = ~(NLA_F_NESTED | NLA_F_NET_BYTEORDER)
+
+# Generic netlink controller, used to look up the wireguard family id
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+
+# include/uapi/linux/wireguard.h
+WG_GENL_NAME = 'wireguard'
+WG_GENL_VERSION = 1
+WG_CMD_GET_DEVICE = 0
+WGDEVICE_A_IFINDEX = 1
+WGDEVICE_A_IFNAME = 2
+WGDEVICE_A_PUBLIC_KEY = 4
+WGDEVICE_A_LISTEN_PORT = 6
+WGDEVICE_A_PEERS = 8
+WGPEER_A_PUBLIC_KEY = 1
+WGPEER_A_ENDPOINT = 4
+WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL = 5
+WGPEER_A_LAST_HANDSHAKE_TIME = 6
+WGPEER_A_RX_BYTES = 7
+WGPEER_A_TX_BYTES = 8
+WGPEER_A_ALLOWEDIPS = 9
+WGALLOWEDIP_A_FAMILY = 1
+WGALLOWEDIP_A_IPADDR = 2
+WGALLOWEDIP_A_CIDR_MASK = 3
+
+NLMSGHDR = struct.Struct('=IHHII')   # length, type, flags, sequence, port id
+GENLMSGHDR = struct.Struct('=BBH')   # command, version, reserved
+NLATTR = struct.Struct('=HH')        # length, type
+
+
+class NetlinkError(OSError):
+    """The kernel rejected a netlink request"""
+
+
+def _align(n):
+    return (n + 3) & ~3
+
+
+def iter_attrs(view):
+    """
+    Yield (type, payload) for each netlink attribute in a buffer
+
+    payload is a memoryview slice of view, so nothing is copied.
+    """
+    offset = 0
+    end = len(view)
+    while offset + NLATTR.size <= end:
+        length, attr_type = NLATTR.unpack_from(view, offset)
+        if length < NLATTR.size or offset + length > end:
+            raise ValueError(f'Malformed netlink attribute at offset {offset}')
+        yield attr_type & NLA_TYPE_MASK, view[offset + NLATTR.size:offset + length]
+        offset += _align(length)
+
+
+def iter_messages(view):
+    """
+    Yield (type, flags, payload) for each netlink message in a received buffer
+
+    Raises:
+        NetlinkError: For an NLMSG_ERROR message carrying a non-zero error
+    """
+    offset = 0
+    while offset + NLMSGHDR.size <= len(view):
+        length, msg_type, flags, _, _ = NLMSGHDR.unpack_from(view, offset)
+        if length < NLMSGHDR.size or offset + length > len(view):
+            raise ValueError(f'Malformed netlink message at offset {offset}')
+        payload = view[offset + NLMSGHDR.size:offset + length]
+        if msg_type == NLMSG_ERROR:
+            code = -struct.unpack_from('=i', payload)[0]
+            if code:
+                raise NetlinkError(code, os.strerror(code))
+        yield msg_type, flags, payload
+        offset += _align(length)
+
+
+def _attr(attr_type, data):
+    return NLATTR.pack(NLATTR.size + len(data), attr_type) + data + b'\0' * (_align(len(data)) - len(data))
+
+
+def _request(family, cmd, flags, seq, attrs, version=1):
+    payload = GENLMSGHDR.pack(cmd, version, 0) + attrs
+    return NLMSGHDR.pack(NLMSGHDR.size + len(payload), family, flags, seq, 0) + payload
+
+
+def _u16(view):
+    return struct.unpack_from('=H', view)[0]
+
+
+def _u64(view):
+    return struct.unpack_from('=Q', view)[0]
+
+
+def parse_endpoint(view):
+    """Decode a sockaddr_in / sockaddr_in6 endpoint to "host:port" (None if unset)"""
+    family = _u16(view)
+    port = struct.unpack_from('!H', view, 2)[0]
+    if family == socket.AF_INET and len(view) >= 8:
+        return f'{ipaddress.IPv4Address(bytes(view[4:8]))}:{port}'
+    if family == socket.AF_INET6 and len(view) >= 24:
+        return f'[{ipaddress.IPv6Address(bytes(view[8:24]))}]:{port}'
+    return None
+
+
+def _parse_allowed_ip(view):
+    family = address = cidr = None
+    for attr_type, value in iter_attrs(view):
+        if attr_type == WGALLOWEDIP_A_FAMILY:
+            family = _u16(value)
+        elif attr_type == WGALLOWEDIP_A_IPADDR:
+            address = bytes(value)
+        elif attr_type == WGALLOWEDIP_A_CIDR_MASK:
+            cidr = value[0]
+    if family == socket.AF_INET:
+        return f'{ipaddress.IPv4Address(address)}/{cidr}'
+    if family == socket.AF_INET6:
+        return f'{ipaddress.IPv6Address(address)}/{cidr}'
+    return None
+
+
+def _parse_peer(view):
+    peer = {}
+    allowed_ips = []
+    for attr_type, value in iter_attrs(view):
+        if attr_type == WGPEER_A_PUBLIC_KEY:
+            peer['public_key'] = base64.b64encode(value).decode()
+        elif attr_type == WGPEER_A_ENDPOINT:
+            peer['endpoint'] = parse_endpoint(value)
+        elif attr_type == WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL:
+            peer['persistent_keepalive'] = _u16(value) or None
+        elif attr_type == WGPEER_A_LAST_HANDSHAKE_TIME:
+            seconds, nanoseconds = struct.unpack_from('=qq', value)
+            peer['last_handshake'] = seconds + nanoseconds / 1e9 if seconds else None
+        elif attr_type == WGPEER_A_RX_BYTES:
+            peer['rx_bytes'] = _u64(value)
+        elif attr_type == WGPEER_A_TX_BYTES:
+            peer['tx_bytes'] = _u64(value)
+        elif attr_type == WGPEER_A_ALLOWEDIPS:
+            allowed_ips.extend(filter(None, (_parse_allowed_ip(entry) for _, entry in iter_attrs(value))))
+    peer['allowed_ips'] = allowed_ips
+    return peer
+
+
+def parse_device(buffers):
+    """
+    Merge the replies of a WG_CMD_GET_DEVICE dump into one device
+
+    The kernel splits devices with many peers (or peers with many allowed
+    IPs) over several messages, repeating the peer's public key in each
+    part; parts are merged per peer in order.
+
+    Args:
+        buffers: Received datagrams (bytes), each holding one or more messages
+
+    Returns:
+        dict: interface, ifindex, public_key, listen_port and peers
+    """
+    device = {'peers': []}
+    peers = {}
+    for buffer in buffers:
+        for msg_type, _, payload in iter_messages(memoryview(buffer)):
+            if msg_type == NLMSG_DONE or msg_type == NLMSG_ERROR:
+                continue
+            for attr_type, value in iter_attrs(payload[GENLMSGHDR.size:]):
+                if attr_type == WGDEVICE_A_IFNAME:
+                    device['interface'] = bytes(value).rstrip(b'\0').decode()
+                elif attr_type == WGDEVICE_A_IFINDEX:
+                    device['ifindex'] = struct.unpack_from('=I', value)[0]
+                elif attr_type == WGDEVICE_A_PUBLIC_KEY:
+                    device['public_key'] = base64.b64encode(value).decode()
+                elif attr_type == WGDEVICE_A_LISTEN_PORT:
+                    device['listen_port'] = _u16(value)
+                elif attr_type == WGDEVICE_A_PEERS:
+                    for _, entry in iter_attrs(value):
+                        part = _parse_peer(entry)
+                        peer = peers.get(part.get('public_key'))
+                        if peer is None:
+                            peers[part.get('public_key')] = part
+                            device['peers'].append(part)
+                        else:
+                            peer['allowed_ips'].extend(part.pop('allowed_ips'))
+                            peer.update(part)
+    return device
+
+
+class WireGuardNetlink:
+    """
+    Generic netlink client for the wireguard family
+
+    The socket and family id are set up on first use and kept; a failed
+    request closes the socket so the next one starts clean.
+    """
+
+    RECV_SIZE = 65536
+
+    def __init__(self, socket_factory=None):
+        self._socket_factory = socket_factory or (
+            lambda: socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        )
+        self._sock = None
+        self._family = None
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _transact(self, message_type, cmd, flags, attrs, version=1):
+        """Send one request and collect reply datagrams up to NLMSG_DONE (or the ack)"""
+        if self._sock is None:
+            self._sock = self._socket_factory()
+            self._sock.bind((0, 0))
+        self._seq += 1
+        self._sock.send(_request(message_type, cmd, flags, self._seq, attrs, version))
+
+        buffers = []
+        while True:
+            buffer = self._sock.recv(self.RECV_SIZE)
+            buffers.append(buffer)
+            done = False
+            for msg_type, msg_flags, _ in iter_messages(memoryview(buffer)):
+                if msg_type in (NLMSG_DONE, NLMSG_ERROR) or not msg_flags & NLM_F_MULTI:
+                    done = True
+            if done:
+                return buffers
+
+    def _family_id(self):
+        if self._family is None:
+            name = WG_GENL_NAME.encode() + b'\0'
+            buffers = self._transact(
+                GENL_ID_CTRL, CTRL_CMD_GETFAMILY, NLM_F_REQUEST, _attr(CTRL_ATTR_FAMILY_NAME, name)
+            )
+            for buffer in buffers:
+                for msg_type, _, payload in iter_messages(memoryview(buffer)):
+                    if msg_type != GENL_ID_CTRL:
+                        continue
+                    for attr_type, value in iter_attrs(payload[GENLMSGHDR.size:]):
+                        if attr_type == CTRL_ATTR_FAMILY_ID:
+                            self._family = _u16(value)
+            if self._family is None:
+                raise NetlinkError(errno.ENOENT, 'wireguard netlink family not available')
+        return self._family
+
+    def get_device(self, interface):
+        """
+        Dump a WireGuard interface and all of its peers
+
+        Raises:
+            NetlinkError: ENODEV if the interface doesn't exist, EPERM
+                without CAP_NET_ADMIN, ENOENT if WireGuard isn't loaded
+        """
+        with self._lock:
+            try:
+                buffers = self._transact(
+                    self._family_id(), WG_CMD_GET_DEVICE, NLM_F_REQUEST | NLM_F_ACK | NLM_F_DUMP,
+                    _attr(WGDEVICE_A_IFNAME, interface.encode() + b'\0'), version=WG_GENL_VERSION
+                )
+            except OSError:
+                self.close()
+                raise
+        return parse_device(buffers)
+
+    def close(self):
+        """Close the netlink socket"""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            self._family = None